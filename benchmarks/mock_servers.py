@@ -0,0 +1,478 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Mock servers
+# Purpose:      Local stand-ins of the GeoServer REST API and of the Isogeo
+#               API, serving generated catalogs with a configurable latency
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import json
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+from random import Random
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+# Python 3 backported
+from collections import OrderedDict
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+ATOM = "http://www.w3.org/2005/Atom"
+
+# REST class of a resource => (stores collection, store class, resources
+# collection, store type)
+KINDS = {"featureType": ("datastores", "dataStore", "featuretypes", "PostGIS"),
+         "coverage": ("coveragestores", "coverageStore", "coverages", "GeoTIFF")}
+STORES_TAGS = {"datastores": "dataStores",
+               "coveragestores": "coverageStores",
+               "wmsstores": "wmsStores"}
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class FakeCatalog(object):
+    """Generated GeoServer catalog: nb_layers layers spread over workspaces
+    and stores, 1 coverage out of 10. Always the same for the same
+    arguments.
+
+    nb_layers = number of layers
+    nb_workspaces = number of workspaces (default: 1 by 200 layers, max 50)
+    nb_stores = number of data stores by workspace
+    """
+
+    def __init__(self, nb_layers, nb_workspaces=None, nb_stores=5):
+        super(FakeCatalog, self).__init__()
+        nb_workspaces = nb_workspaces or max(1, min(50, nb_layers // 200))
+        self.workspaces = ["ws{:02d}".format(i) for i in range(nb_workspaces)]
+        # layer name => (workspace, store, resource class)
+        self.layers = OrderedDict()
+        # (workspace, resource class, store) => layers names
+        self.stores = OrderedDict()
+        for i in range(nb_layers):
+            ws = self.workspaces[i % nb_workspaces]
+            if i % 10 == 0:
+                res_class, store = "coverage", "cs{}".format(i // nb_workspaces)
+            else:
+                res_class, store = "featureType", "ds{}".format(i % nb_stores)
+            name = "lyr{:05d}".format(i)
+            self.layers[name] = (ws, store, res_class)
+            self.stores.setdefault((ws, res_class, store), []).append(name)
+        # layer name => metadata links written by PUT requests
+        self.links = {}
+        self.lock = threading.Lock()
+
+    def stores_of(self, ws, res_class):
+        return [st for (w, c, st) in self.stores if w == ws and c == res_class]
+
+
+class FakeIsogeo(object):
+    """Generated Isogeo share: nb_metadata metadata, the first ones having
+    the UUIDs given (e.g. those of the matching table)."""
+
+    def __init__(self, nb_metadata, uuids=()):
+        super(FakeIsogeo, self).__init__()
+        rand = Random("isogeo-{}".format(nb_metadata))
+        uuids = list(uuids)[:nb_metadata]
+        uuids += [uuid.UUID(int=rand.getrandbits(128), version=4).hex
+                  for i in range(nb_metadata - len(uuids))]
+        self.metadata = [{"_id": md_id,
+                          "_created": "2017-01-01T00:00:00+00:00",
+                          "_modified": "2017-06-01T00:00:00+00:00",
+                          "title": "Metadata {}".format(i),
+                          "name": "md_{}".format(i),
+                          "path": "/data/md_{}.shp".format(i),
+                          "abstract": "Abstract of the metadata {}".format(i),
+                          "type": "vectorDataset"}
+                         for i, md_id in enumerate(uuids)]
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # default is 5: too low for hundreds of concurrent clients
+    request_queue_size = 1024
+
+    def finish_request(self, request, client_address):
+        with self.connections_lock:
+            self.connections.add(request)
+        try:
+            HTTPServer.finish_request(self, request, client_address)
+        finally:
+            with self.connections_lock:
+                self.connections.discard(request)
+
+    def server_close(self):
+        """Also end the keep-alive connections still open, so their threads
+        stop with the server rather than at interpreter shutdown."""
+        HTTPServer.server_close(self)
+        with self.connections_lock:
+            for request in self.connections:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except (IOError, OSError):
+                    pass
+
+    def handle_error(self, request, client_address):
+        # clients dropping their keep-alive connections
+        if isinstance(sys.exc_info()[1], (IOError, OSError)):
+            return
+        HTTPServer.handle_error(self, request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Common plumbing: latency, request counting, responses."""
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately: without this, each response
+    # waits for the client delayed ACK (~40 ms) and that is all we measure
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, body, content_type="application/xml", status=200):
+        if not isinstance(body, bytes):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, obj, status=200):
+        self.send(json.dumps(obj), "application/json", status)
+
+    def not_found(self):
+        self.send("Not found", "text/plain", 404)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def parse_request(self):
+        # each request is counted and delayed, like a network round trip
+        self.server.stats["requests"] += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        return BaseHTTPRequestHandler.parse_request(self)
+
+
+class GeoServerHandler(_Handler):
+    """REST API used by gsconfig (XML) and by the async engine (JSON)."""
+    ROUTES = [
+        ("about", re.compile(r"^/about/version\.(xml|json)$")),
+        ("workspaces", re.compile(r"^/workspaces\.(xml|json)$")),
+        ("workspace", re.compile(r"^/workspaces/([^/]+)\.(xml|json)$")),
+        ("stores", re.compile(r"^/workspaces/([^/]+)/(datastores|coveragestores|wmsstores)\.(xml|json)$")),
+        ("store", re.compile(r"^/workspaces/([^/]+)/(datastores|coveragestores)/([^/]+)\.(xml|json)$")),
+        ("resources", re.compile(r"^/workspaces/([^/]+)/(datastores|coveragestores)/([^/]+)/(featuretypes|coverages)\.(xml|json)$")),
+        ("resource", re.compile(r"^/workspaces/([^/]+)/(datastores|coveragestores)/([^/]+)/(featuretypes|coverages)/([^/]+)\.(xml|json)$")),
+        ("layers", re.compile(r"^/layers\.(xml|json)$")),
+        ("layer", re.compile(r"^/layers/(?:[^/:]+:)?([^/]+)\.(xml|json)$")),
+    ]
+
+    def route(self):
+        path = urlparse(self.path).path
+        if not path.startswith(self.server.root):
+            return None, None
+        path = path[len(self.server.root):]
+        for name, regex in self.ROUTES:
+            match = regex.match(path)
+            if match:
+                return name, match.groups()
+        return None, None
+
+    def href(self, path, fmt):
+        return "http://{}:{}{}{}.{}".format(self.server.server_address[0],
+                                            self.server.server_address[1],
+                                            self.server.root, path, fmt)
+
+    # -- GET ------------------------------------------------------------------
+    def do_GET(self):
+        name, args = self.route()
+        if name is None:
+            return self.not_found()
+        fmt = args[-1]
+        content = getattr(self, "get_" + name)(*args[:-1])
+        if content is None:
+            return self.not_found()
+        elif fmt == "json":
+            self.send_json(content[1])
+        else:
+            self.send(content[0])
+
+    def get_about(self):
+        return ("<about><resource name=\"GeoServer\"><Version>2.12.0</Version>"
+                "</resource></about>",
+                {"about": {"resource": [{"@name": "GeoServer",
+                                         "Version": "2.12.0"}]}})
+
+    def get_workspaces(self):
+        cat = self.server.catalog
+        xml = "".join("<workspace><name>{0}</name>{1}</workspace>"
+                      .format(ws, self.atom("/workspaces/" + ws))
+                      for ws in cat.workspaces)
+        return (self.wrap("workspaces", xml),
+                {"workspaces": {"workspace": [{"name": ws,
+                                               "href": self.href("/workspaces/" + ws, "json")}
+                                              for ws in cat.workspaces]}})
+
+    def get_workspace(self, ws):
+        if ws not in self.server.catalog.workspaces:
+            return None
+        return ("<workspace><name>{}</name></workspace>".format(ws),
+                {"workspace": {"name": ws}})
+
+    def get_stores(self, ws, collection):
+        res_class = self.res_class(collection)
+        stores = self.server.catalog.stores_of(ws, res_class) if res_class else []
+        singular = KINDS[res_class][1] if res_class else "wmsStore"
+        xml = "".join("<{0}><name>{1}</name>{2}</{0}>"
+                      .format(singular, st,
+                              self.atom("/workspaces/{}/{}/{}".format(ws, collection, st)))
+                      for st in stores)
+        return (self.wrap(STORES_TAGS[collection], xml),
+                {collection: {singular: [{"name": st,
+                                          "href": self.href("/workspaces/{}/{}/{}".format(ws, collection, st), "json")}
+                                         for st in stores]} if stores else ""})
+
+    def get_store(self, ws, collection, st):
+        res_class = self.res_class(collection)
+        if (ws, res_class, st) not in self.server.catalog.stores:
+            return None
+        singular, store_type = KINDS[res_class][1], KINDS[res_class][3]
+        return ("<{0}><name>{1}</name><type>{2}</type><enabled>true</enabled>"
+                "<workspace><name>{3}</name>{4}</workspace>"
+                "<connectionParameters/></{0}>"
+                .format(singular, st, store_type, ws, self.atom("/workspaces/" + ws)),
+                {singular: {"name": st, "type": store_type, "enabled": True,
+                            "workspace": {"name": ws}}})
+
+    def get_resources(self, ws, collection, st, res_collection):
+        res_class = self.res_class(collection)
+        names = self.server.catalog.stores.get((ws, res_class, st))
+        if names is None:
+            return None
+        base = "/workspaces/{}/{}/{}/{}/".format(ws, collection, st, res_collection)
+        xml = "".join("<{0}><name>{1}</name>{2}</{0}>"
+                      .format(res_class, name, self.atom(base + name))
+                      for name in names)
+        return (self.wrap(res_collection, xml),
+                {res_collection: {res_class: [{"name": name,
+                                               "href": self.href(base + name, "json")}
+                                              for name in names]}})
+
+    def get_resource(self, ws, collection, st, res_collection, name):
+        cat = self.server.catalog
+        if cat.layers.get(name, (None, None))[:2] != (ws, st):
+            return None
+        res_class = cat.layers.get(name)[2]
+        with cat.lock:
+            links = list(cat.links.get(name, []))
+        store_path = "/workspaces/{}/{}/{}".format(ws, collection, st)
+        xml_links = "".join("<metadataLink><type>{}</type><metadataType>{}"
+                            "</metadataType><content>{}</content></metadataLink>"
+                            .format(*[escape(v) for v in link])
+                            for link in links)
+        xml = ("<{0}><name>{1}</name><nativeName>{1}</nativeName>"
+               "<namespace><name>{2}</name></namespace>"
+               "<title>Title of {1}</title><abstract>Abstract of {1}</abstract>"
+               "<keywords><string>{2}</string></keywords>"
+               "<srs>EPSG:2154</srs><enabled>true</enabled>"
+               "<metadataLinks>{3}</metadataLinks>"
+               "<store class=\"{4}\"><name>{5}</name>{6}</store></{0}>"
+               .format(res_class, name, ws, xml_links, KINDS[res_class][1],
+                       st, self.atom(store_path)))
+        return (xml,
+                {res_class: {"name": name,
+                             "nativeName": name,
+                             "namespace": {"name": ws},
+                             "title": "Title of {}".format(name),
+                             "abstract": "Abstract of {}".format(name),
+                             "srs": "EPSG:2154",
+                             "enabled": True,
+                             "metadatalinks": {"metadataLink": [
+                                 {"type": t, "metadataType": m, "content": c}
+                                 for t, m, c in links]} if links else "",
+                             "store": {"@class": KINDS[res_class][1],
+                                       "name": "{}:{}".format(ws, st),
+                                       "href": self.href(store_path, "json")}}})
+
+    def get_layers(self):
+        cat = self.server.catalog
+        xml = "".join("<layer><name>{0}</name>{1}</layer>"
+                      .format(name, self.atom("/layers/" + name))
+                      for name in cat.layers)
+        return (self.wrap("layers", xml),
+                {"layers": {"layer": [{"name": "{}:{}".format(ws, name),
+                                       "href": self.href("/layers/" + name, "json")}
+                                      for name, (ws, st, c) in cat.layers.items()]}})
+
+    def get_layer(self, name):
+        cat = self.server.catalog
+        if name not in cat.layers:
+            return None
+        ws, st, res_class = cat.layers.get(name)
+        collection, _, res_collection, _ = KINDS[res_class]
+        res_path = "/workspaces/{}/{}/{}/{}/{}".format(ws, collection, st,
+                                                       res_collection, name)
+        lyr_type = "RASTER" if res_class == "coverage" else "VECTOR"
+        return ("<layer><name>{0}</name><type>{1}</type>"
+                "<defaultStyle><name>point</name></defaultStyle>"
+                "<resource class=\"{2}\"><name>{0}</name>{3}</resource>"
+                "<enabled>true</enabled></layer>"
+                .format(name, lyr_type, res_class, self.atom(res_path)),
+                {"layer": {"name": name,
+                           "type": lyr_type,
+                           "resource": {"@class": res_class,
+                                        "name": "{}:{}".format(ws, name),
+                                        "href": self.href(res_path, "json")}}})
+
+    # -- PUT ------------------------------------------------------------------
+    def do_PUT(self):
+        name, args = self.route()
+        body = self.read_body()
+        if name != "resource":
+            return self.not_found()
+        self.server.stats["writes"] += 1
+        if args[-1] == "json":
+            content = list(json.loads(body.decode("utf-8")).values())[0]
+            links = (content.get("metadataLinks") or {}).get("metadataLink") or []
+            links = [(l.get("type"), l.get("metadataType"), l.get("content"))
+                     for l in links]
+        else:
+            dom = ElementTree.fromstring(body)
+            links = [(l.findtext("type"), l.findtext("metadataType"),
+                      l.findtext("content"))
+                     for l in dom.findall("metadataLinks/metadataLink")]
+        with self.server.catalog.lock:
+            self.server.catalog.links[args[4]] = links
+        self.send("", "text/plain")
+
+    # -- HELPERS --------------------------------------------------------------
+    def atom(self, path):
+        return ("<atom:link xmlns:atom=\"{}\" rel=\"alternate\" href=\"{}\""
+                " type=\"application/xml\"/>".format(ATOM, self.href(path, "xml")))
+
+    @staticmethod
+    def wrap(tag, xml):
+        return "<{0}>{1}</{0}>".format(tag, xml)
+
+    @staticmethod
+    def res_class(collection):
+        for res_class, kind in KINDS.items():
+            if kind[0] == collection:
+                return res_class
+        return None
+
+
+class IsogeoHandler(_Handler):
+    """Authentication and search of the Isogeo API."""
+
+    def do_POST(self):
+        self.read_body()
+        if urlparse(self.path).path != "/oauth/token":
+            return self.not_found()
+        self.send_json({"access_token": uuid.uuid4().hex,
+                        "token_type": "Bearer",
+                        "expires_in": 3600})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/resources/search":
+            return self.not_found()
+        if not self.headers.get("Authorization"):
+            return self.send_json({"error": "unauthorized"}, 401)
+        query = parse_qs(url.query)
+        limit = int(query.get("_limit", ["100"])[0])
+        offset = int(query.get("_offset", ["0"])[0])
+        metadata = self.server.share.metadata
+        self.send_json({"total": len(metadata),
+                        "offset": offset,
+                        "limit": limit,
+                        "results": metadata[offset:offset + limit]})
+
+
+class IsogeoClient(object):
+    """Client of the Isogeo stand-in, with the methods of the SDK used by
+    the tool (connect, search), since the SDK targets the real API hosts."""
+
+    def __init__(self, api_url, session):
+        super(IsogeoClient, self).__init__()
+        self.api_url = api_url
+        self.session = session
+
+    def connect(self):
+        response = self.session.post(self.api_url + "/oauth/token",
+                                     data={"grant_type": "client_credentials"})
+        response.raise_for_status()
+        return response.json().get("access_token")
+
+    def search(self, token, page_size=100, offset=0, **kwargs):
+        response = self.session.get(self.api_url + "/resources/search",
+                                    params={"_limit": page_size,
+                                            "_offset": offset},
+                                    headers={"Authorization": "Bearer " + token})
+        response.raise_for_status()
+        return response.json()
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def start_server(handler, latency=0, **attributes):
+    """Start a server on a free local port in a background thread. Extra
+    attributes (catalog, share...) are available to the handler."""
+    server = _Server(("127.0.0.1", 0), handler)
+    server.connections = set()
+    server.connections_lock = threading.Lock()
+    server.latency = latency
+    server.stats = {"requests": 0, "writes": 0}
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def start_geoserver(catalog, latency=0, root="/geoserver/rest"):
+    """Start a GeoServer stand-in. Return the server and its REST URL."""
+    server = start_server(GeoServerHandler, latency, catalog=catalog, root=root)
+    return server, "http://127.0.0.1:{}{}".format(server.server_address[1], root)
+
+
+def start_isogeo(share, latency=0):
+    """Start an Isogeo stand-in. Return the server and its API URL."""
+    server = start_server(IsogeoHandler, latency, share=share)
+    return server, "http://127.0.0.1:{}".format(server.server_address[1])
@@ -0,0 +1,272 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Benchmark
+# Purpose:      Time the matching load, GeoServer read, metadata links
+#               write, Isogeo search and export phases against local
+#               stand-in servers, and keep the results run over run
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import argparse
+import io
+import json
+import logging
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from os import path
+from random import Random
+
+# Python 3 backported
+from collections import OrderedDict
+
+# the tool modules, from the repository root
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+# 3rd party libraries
+import requests
+
+# submodules
+from modules.exporter import Exporter, layer_record, metadata_record
+from modules.gs_sync import geoserver_job, read_geoserver
+from modules.isogeo_search import search_all
+from modules.isogeo_token import TokenStore
+from modules.layer_record import LinkTemplates
+from modules.matching import load_matching
+
+from mock_servers import (FakeCatalog, FakeIsogeo, IsogeoClient,
+                          start_geoserver, start_isogeo)
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+SIZES = (100, 1000, 10000, 50000)
+URL_BASE = "https://portal.example.com"
+
+# progress and results of the benchmark (see main for the levels)
+logger = logging.getLogger("benchmark")
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def write_matching(catalog, dest_path, ratio=0.8):
+    """Write a matching CSV giving an UUID to ratio of the layers. Return
+    the UUIDs, in the layers order."""
+    rand = Random(len(catalog.layers))
+    uuids = []
+    with io.open(dest_path, "w", encoding="utf-8") as out_csv:
+        out_csv.write("GS_WORKSPACE;GS_DATASTORE_NAME;GS_DATASTORE_TYPE;"
+                      "GS_SOURCE_TYPE;GS_NOM;GS_TITRE;ISOGEO_UUID\n")
+        for name, (ws, store, res_class) in catalog.layers.items():
+            if rand.random() > ratio:
+                continue
+            md_id = uuid.UUID(int=rand.getrandbits(128), version=4).hex
+            uuids.append(md_id)
+            out_csv.write("{};{};;{};{};;{}\n".format(ws, store, res_class,
+                                                      name, md_id))
+    return uuids
+
+
+def timed(phases, name, servers, func):
+    """Run func and store its wall time and requests counts in phases."""
+    before = [dict(server.stats) for server in servers]
+    start = time.time()
+    result = func()
+    phases[name] = OrderedDict([("seconds", round(time.time() - start, 3))])
+    for server, stats in zip(servers, before):
+        for key in ("requests", "writes"):
+            delta = server.stats[key] - stats[key]
+            if delta:
+                phases[name]["{}_{}".format(server.label, key)] = delta
+    logger.info("{:>7} | {:<8} | {:>8.3f} s".format(len(servers[0].catalog.layers),
+                                                    name,
+                                                    phases[name]["seconds"]))
+    return result
+
+
+def run_size(nb_layers, args, work_dir):
+    """Run every phase on a generated catalog of nb_layers layers."""
+    catalog = FakeCatalog(nb_layers)
+    matching_path = path.join(work_dir, "matching_{}.csv".format(nb_layers))
+    uuids = write_matching(catalog, matching_path)
+
+    gs_server, gs_url = start_geoserver(catalog, latency=args.latency)
+    gs_server.label = "geoserver"
+    isogeo_server, isogeo_url = start_isogeo(FakeIsogeo(nb_layers, uuids),
+                                             latency=args.latency)
+    isogeo_server.label = "isogeo"
+    servers = (gs_server, isogeo_server)
+
+    gs_opts = {"gs_url": gs_url,
+               "gs_user": "admin",
+               "gs_pswd": "geoserver",
+               "gs_ssl_off": "0",
+               "read_engine": args.engine,
+               "max_workers": args.workers,
+               "async_concurrency": args.concurrency,
+               "write_workers": args.write_workers,
+               "write_rate": args.write_rate}
+    phases = OrderedDict()
+    try:
+        dict_match_gs_md = timed(phases, "matching", servers,
+                                 lambda: load_matching(matching_path))
+
+        def sync(dry_run):
+            job = geoserver_job("bench", gs_opts, URL_BASE,
+                                dict_match_gs_md=dict_match_gs_md,
+                                csw_share=("share", "token"),
+                                dry_run=dry_run)
+            result = read_geoserver(job)
+            if result.get("error"):
+                raise RuntimeError(result.get("error"))
+            return result
+
+        # read only, then first sync writing every link, then nothing to do
+        timed(phases, "read", servers, lambda: sync(True))
+        timed(phases, "write", servers, lambda: sync(False))
+        gs_result = timed(phases, "resync", servers, lambda: sync(False))
+
+        session = requests.Session()
+        isogeo = IsogeoClient(isogeo_url, session)
+        token_store = TokenStore("bench", isogeo_url)
+        search_results = timed(phases, "search", servers,
+                               lambda: token_store.with_token(isogeo,
+                                                              lambda token: search_all(isogeo,
+                                                                                       token,
+                                                                                       max_workers=args.search_workers)))
+        session.close()
+
+        def export():
+            templates = LinkTemplates(URL_BASE, "share", "token")
+            exporter = Exporter(path.join(work_dir, "bench_{}".format(nb_layers)),
+                                args.formats)
+            for lyr, layer in gs_result.get("dico_gs").get("layers").items():
+                exporter.write("layers", layer_record(lyr, layer))
+            for md in search_results:
+                exporter.write("metadata", metadata_record(md, templates))
+            return exporter.close()
+
+        timed(phases, "export", servers, export)
+        phases["total"] = {"seconds": round(sum(p.get("seconds")
+                                                for p in phases.values()), 3)}
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+    return phases
+
+
+def previous_run(runs, options):
+    """Last stored run made with the same options."""
+    for run in reversed(runs):
+        if run.get("options") == options:
+            return run
+    return None
+
+
+def compare(run, previous):
+    """Log the wall time of each phase compared with the previous run."""
+    if previous is None:
+        return
+    for size, phases in run.get("results").items():
+        before = previous.get("results").get(size)
+        if not before:
+            continue
+        for name, phase in phases.items():
+            if name in before and before[name].get("seconds"):
+                ratio = phase.get("seconds") / before[name].get("seconds") - 1
+                logger.info("{:>7} | {:<8} | {:>+7.1%} vs {}"
+                            .format(size, name, ratio, previous.get("date")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the GeoServer read,"
+                                                 " metadata links write,"
+                                                 " Isogeo search and exports"
+                                                 " against local stand-ins.")
+    parser.add_argument("--layers", type=int, nargs="+", default=list(SIZES[:2]),
+                        help="catalog sizes to run (default: 100 1000;"
+                             " reference sizes: 100 1000 10000 50000)")
+    parser.add_argument("--latency", type=float, default=0.005,
+                        help="seconds added to every request (default: 0.005)")
+    parser.add_argument("--engine", default="catalog",
+                        choices=("catalog", "bulk", "async"),
+                        help="GeoServer read engine (default: catalog)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="threads reading layers (default: 1)")
+    parser.add_argument("--concurrency", type=int, default=100,
+                        help="requests in flight with the async engine")
+    parser.add_argument("--write-workers", type=int, default=0,
+                        help="threads writing metadata links (default: inline)")
+    parser.add_argument("--write-rate", type=float, default=0,
+                        help="maximum of links writes by second (default: none)")
+    parser.add_argument("--search-workers", type=int, default=4,
+                        help="Isogeo pages requested at the same time")
+    parser.add_argument("--formats", nargs="+", default=["xlsx"],
+                        help="export formats (default: xlsx)")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="JSON file where runs are appended")
+    args = parser.parse_args(argv)
+
+    # per layer messages of the tool would dominate the timings: only its
+    # warnings are shown, with the results of the benchmark
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger.setLevel(logging.INFO)
+
+    options = OrderedDict([("latency", args.latency),
+                           ("engine", args.engine),
+                           ("workers", args.workers),
+                           ("concurrency", args.concurrency),
+                           ("write_workers", args.write_workers),
+                           ("write_rate", args.write_rate),
+                           ("search_workers", args.search_workers),
+                           ("formats", args.formats)])
+    run = OrderedDict([("date", datetime.now().isoformat()),
+                       ("python", platform.python_version()),
+                       ("options", options),
+                       ("results", OrderedDict())])
+
+    work_dir = tempfile.mkdtemp(prefix="i2gs_bench_")
+    try:
+        for nb_layers in args.layers:
+            run["results"][str(nb_layers)] = run_size(nb_layers, args, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    runs = []
+    if path.isfile(args.output):
+        with io.open(args.output, "r", encoding="utf-8") as in_json:
+            runs = json.load(in_json, object_pairs_hook=OrderedDict)
+    compare(run, previous_run(runs, json.loads(json.dumps(options))))
+    runs.append(run)
+    with io.open(args.output, "wb") as out_json:
+        out_json.write(json.dumps(runs, indent=2).encode("utf-8"))
+    logger.info("Results added to {}".format(args.output))
+    return run
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+
+if __name__ == '__main__':
+    main()
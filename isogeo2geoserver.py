@@ -17,28 +17,53 @@ from __future__ import (absolute_import, print_function, unicode_literals)
 # ##################################
 
 # Standard
+import argparse
+import hashlib
+import io
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import signal
+import threading
+import time
+from os import path
 
-# Python 3 backported
+try:
+    from ConfigParser import SafeConfigParser as ConfigParser
+except ImportError:
+    from configparser import ConfigParser
 
+# Python 3 backported
+from collections import OrderedDict
 
 # 3rd party
+# geoserver (gsconfig), isogeo_pysdk, openpyxl and requests are imported by
+# the steps needing them only: see gs_sync.reader_class, connect_isogeo,
+# exporter and transport_settings
 
+# submodules
+from modules.exporter import Exporter, layer_record, metadata_record
+from modules.gs_sync import (geoserver_job, geoservers_settings,
+                             stream_geoservers, sync_geoservers)
+from modules.isogeo_search import search_all, search_since
+from modules.isogeo_token import TokenStore
+from modules.journal import clear_journal
+from modules.layer_record import LinkTemplates
+from modules.log_setup import setup_logging
+from modules.matching import load_matching
+from modules.md_links import save_plan
+from modules.metrics import RunMetrics
+from modules.reconcile import RECONCILE_SPEC, log_counts, reconcile
+from modules.stages import Stages
+from modules.sync_state import (LAYER_KEYS, SIDES, SyncState, layer_entry,
+                                links_signature)
 
 # ##############################################################################
 # ############ Globals ############
 # #################################
 
-# LOG
+# LOG (handlers set by main, see setup_logging)
 logger = logging.getLogger("isogeo2geoserver")
-logging.captureWarnings(True)
-logger.setLevel(logging.INFO)  # all errors will be get
-log_form = logging.Formatter("%(asctime)s || %(levelname)s || %(module)s || %(message)s")
-logfile = RotatingFileHandler("LOG_i2gs.log", "a", 5000000, 1)
-logfile.setLevel(logging.INFO)
-logfile.setFormatter(log_form)
-logger.addHandler(logfile)
 
 # ##############################################################################
 # ########## Classes ###############
@@ -46,46 +71,568 @@ logger.addHandler(logfile)
 
 
 class IsogeoToGeoServer(object):
-    """IsogeoToDocx class."""
+    """Set Isogeo metadata links on GeoServer layers and export both
+    catalogs, step by step (read, link, search, export), all at once (sync)
+    or on a schedule (watch).
+
+    Between cycles of the watch mode, everything stays in memory: the
+    matching table (reloaded only when its file changes), the Isogeo
+    token, the pooled HTTP connections and the sync state. Each cycle
+    only applies what changed, and exports are regenerated only when
+    their inputs changed.
 
-    def __init__(self, lang="FR"):
+    settings_path = ini file of the settings (see settings_TPL.ini)
+    lang = language of the Isogeo API
+    servers = names of the GeoServer instances to process (default: all)
+    workspaces = names of the GeoServer workspaces to process (default: all)
+    """
+
+    def __init__(self, settings_path="settings.ini", lang="FR", servers=None,
+                 workspaces=None):
         """Instanciating class."""
         super(IsogeoToGeoServer, self).__init__()
 
         # ------------ VARIABLES ---------------------
+        self.settings = read_settings(settings_path)
+        self.lang = self.settings.get("isogeo", {}).get("app_lang") or lang
+        self.servers = servers
+        self.workspaces = workspaces
+        sync_opts = self.settings.get("sync", {})
+        self.state = SyncState(sync_opts.get("state_file") or None)
+        self.full_every = float(sync_opts.get("full_every") or 0)
+        self.journal_dir = sync_opts.get("journal_dir")
+        self.isogeo = None
+        self.token_store = None
+        self.metrics = RunMetrics()
+        self._matching = None
+        self._matching_stamp = None
+        self._exports_sign = None
+        self._stop = threading.Event()
+
+    # -- INPUTS ---------------------------------------------------------------
+    def matching(self):
+        """Matching table, loaded again only if its file changed."""
+        input_opts = self.settings.get("input", {})
+        in_path = input_opts.get("in_matching")
+        stat = os.stat(in_path)
+        stamp = (stat.st_mtime, stat.st_size)
+        if stamp != self._matching_stamp:
+            with self.metrics.phase("matching"):
+                self._matching = load_matching(in_path,
+                                               cache_dir=input_opts.get("in_matching_cache") or None)
+            self._matching_stamp = stamp
+        return self._matching
+
+    def connect_isogeo(self):
+        """Isogeo client and token store, created once."""
+        if self.isogeo is not None:
+            return self.isogeo
+        from isogeo_pysdk import Isogeo
+        from modules.transport import get_transport
+
+        isogeo_opts = self.settings.get("isogeo", {})
+        self.isogeo = Isogeo(client_id=isogeo_opts.get("app_id"),
+                             client_secret=isogeo_opts.get("app_secret"),
+                             lang=self.lang)
+        get_transport(**self.transport_settings()).configure_isogeo(self.isogeo)
+        # the SDK HTTP layer is not reachable: its calls are measured instead
+        self.isogeo.connect = self.wrap_call(self.isogeo.connect, "isogeo connect")
+        self.isogeo.search = self.wrap_call(self.isogeo.search, "isogeo search")
+        self.token_store = TokenStore(isogeo_opts.get("app_id"),
+                                      "{}://v1.api.isogeo.com".format(isogeo_opts.get("app_prot")),
+                                      cache_path=isogeo_opts.get("token_cache") or None)
+        return self.isogeo
+
+    def transport_settings(self):
+        """Options of the HTTP transport shared by GeoServer and Isogeo."""
+        from modules.transport import transport_settings
+        return transport_settings(self.settings)
+
+    def links_settings(self):
+        """Portal URL and CSW share (id, token) the links are built from."""
+        isogeo_opts = self.settings.get("isogeo", {})
+        return (self.settings.get("output", {}).get("url_base"),
+                (isogeo_opts.get("csw_share_id"), isogeo_opts.get("csw_share_token")))
+
+    def journal_path(self, gs_name):
+        """Journal of a GeoServer instance, None if not enabled."""
+        if not self.journal_dir:
+            return None
+        return path.join(self.journal_dir, "{}.journal".format(gs_name))
+
+    # -- STEPS ----------------------------------------------------------------
+    def read_geoservers(self, full=False, dry_run=False, resume=False, sink=None):
+        """Read the GeoServer instances and set the metadata links of the
+        layers changed since the last run (all of them if full). In dry run,
+        the change plan of each instance is stored in a JSON file.
+
+        sink = function called with instance name, layer name and LayerRecord
+               as soon as each layer is read. Layers are then streamed, not
+               kept in the results (see stream_geoservers).
+        """
+        gs_opts = self.settings.get("geoserver", {})
+        out_prefix = self.settings.get("output", {}).get("out_prefix")
+        url_base, csw_share = self.links_settings()
+        links_sign = links_signature(url_base, csw_share)
+        dict_match_gs_md = self.matching()
+        geoservers = geoservers_settings(self.settings)
+        transport = self.transport_settings()
+        if self.servers:
+            geoservers = [(gs_name, opts) for gs_name, opts in geoservers.items()
+                          if gs_name in self.servers]
+        else:
+            geoservers = geoservers.items()
+
+        # one job by GeoServer instance, read concurrently with isolated results
+        li_jobs = [geoserver_job(gs_name,
+                                 opts,
+                                 url_base,
+                                 dict_match_gs_md=dict_match_gs_md,
+                                 csw_share=csw_share,
+                                 dry_run=dry_run,
+                                 transport=transport,
+                                 known=None if full
+                                 else self.state.known_layers(gs_name, links_sign),
+                                 journal=self.journal_path(gs_name),
+                                 resume=resume,
+                                 only_workspaces=self.workspaces)
+                   for gs_name, opts in geoservers]
+        # streamed layers as stored in the state, and as read, by instance
+        dict_entries = {}
+        dict_read = {}
+        with self.metrics.phase("geoserver"):
+            if sink is None:
+                li_gs_results = sync_geoservers(li_jobs,
+                                                mode=gs_opts.get("sync_mode", "thread"),
+                                                max_parallel=gs_opts.get("sync_max_parallel"))
+            else:
+                li_gs_results = []
+                for gs_name, lyr_name, item in stream_geoservers(li_jobs,
+                                                                 max_parallel=gs_opts.get("sync_max_parallel"),
+                                                                 buffer_size=int(gs_opts.get("stream_buffer", 100))):
+                    if lyr_name is None:
+                        li_gs_results.append(item)
+                        continue
+                    dict_read.setdefault(gs_name, []).append((item.get("workspace"),
+                                                              lyr_name,
+                                                              item.get("md_id_matching")))
+                    if not dry_run:
+                        dict_entries.setdefault(gs_name, OrderedDict())[lyr_name] = layer_entry(item)
+                    sink(gs_name, lyr_name, item)
+                # instances end in any order: back to the jobs one
+                li_names = [job[0] for job in li_jobs]
+                li_gs_results.sort(key=lambda gs_result: li_names.index(gs_result.get("name")))
+
+        for gs_result in li_gs_results:
+            # layers as (workspace, name, UUID), streamed or not
+            gs_result["read"] = dict_read.get(gs_result.get("name")) or \
+                [(layer.get("workspace"), lyr, layer.get("md_id_matching"))
+                 for lyr, layer in gs_result.get("dico_gs").get("layers", {}).items()]
+            logger.info("GeoServer {} - {} layers, metadata links: {}"
+                        .format(gs_result.get("name"),
+                                len(gs_result.get("read")),
+                                gs_result.get("counts")))
+            # instances are read concurrently: their own durations, not phases
+            self.metrics.count("geoserver_{}_seconds".format(gs_result.get("name")),
+                               round(gs_result.get("seconds"), 3))
+            self.metrics.count("geoserver_{}_link_write_seconds".format(gs_result.get("name")),
+                               round(gs_result.get("link_write"), 3))
+            self.metrics.http.merge(gs_result.get("http"))
+            if dry_run:
+                save_plan(gs_result.get("plan"),
+                          "{}_{}_md_links_plan.json".format(out_prefix,
+                                                            gs_result.get("name")))
+            elif not gs_result.get("error"):
+                self.state.update_layers(gs_result.get("name"), links_sign, gs_result,
+                                         merge=bool(self.workspaces),
+                                         entries=dict_entries.get(gs_result.get("name")))
+
+        layers = ((workspace, name) for gs_result in li_gs_results
+                  for workspace, name, md_uuid in gs_result.get("read"))
+        counts = dict_match_gs_md.summary(layers if self.read_complete(li_gs_results)
+                                          else None)
+        for problem, count in counts.items():
+            self.metrics.count("matching_{}".format(problem), count)
+        return li_gs_results
+
+    def search_isogeo(self, full=False):
+        """Metadata of the Isogeo share, only the ones modified since the
+        last run being requested unless full."""
+        isogeo = self.connect_isogeo()
+        isogeo_opts = self.settings.get("isogeo", {})
+        page_size = int(isogeo_opts.get("search_page_size", 100))
+        search_results = None
+        with self.metrics.phase("isogeo_search"):
+            if not full and self.state.metadata:
+                search_results = self.token_store.with_token(isogeo,
+                                                             lambda token: search_since(isogeo,
+                                                                                        token,
+                                                                                        self.state.metadata,
+                                                                                        self.state.modified_since(),
+                                                                                        page_size=page_size))
+            if search_results is None:
+                search_results = self.token_store.with_token(isogeo,
+                                                             lambda token: search_all(isogeo,
+                                                                                      token,
+                                                                                      page_size=page_size,
+                                                                                      max_workers=int(isogeo_opts.get("search_workers", 4))))
+        self.state.update_metadata(search_results)
+        return search_results
+
+    def read_and_search(self, full=False, dry_run=False, resume=False, sink=None):
+        """Read GeoServer (see read_geoservers) and search Isogeo (see
+        search_isogeo) at the same time, unless overlap_stages is off.
+        Return the GeoServer results and the metadata."""
+        stages = Stages(concurrent=self.settings.get("sync", {})
+                        .get("overlap_stages", "1") == "1")
+        # the matching table is loaded while Isogeo is searched
+        stages.add("matching", self.matching)
+        stages.add("geoserver", lambda matching: self.read_geoservers(full=full,
+                                                                      dry_run=dry_run,
+                                                                      resume=resume,
+                                                                      sink=sink),
+                   needs=("matching", ))
+        stages.add("isogeo", lambda: self.search_isogeo(full=full))
+        results = stages.run()
+        return results.get("geoserver"), results.get("isogeo")
+
+    def write_exports(self, li_gs_results, search_results):
+        """Write the exports of read results. Return the paths written."""
+        exporters = self.exporters()
+        for gs_result in li_gs_results:
+            prefix, exporter = self.exporter(exporters, gs_result.get("name"))
+            with self.metrics.phase("export_build {}".format(path.basename(prefix))):
+                for lyr, layer in gs_result.get("dico_gs").get("layers", {}).items():
+                    exporter.write("layers", layer_record(lyr, layer))
+        return self.close_exports(exporters, search_results) + \
+            self.write_reconciliation(li_gs_results, search_results)
+
+    def stream_exports(self, full=False, dry_run=False, resume=False):
+        """Read GeoServer, each layer being written into the exports as soon
+        as it is read, while Isogeo is searched, then write the metadata.
+        Return the GeoServer results, the metadata and the paths written."""
+        exporters = self.exporters()
+
+        def sink(gs_name, lyr_name, layer):
+            exporter = self.exporter(exporters, gs_name)[1]
+            exporter.write("layers", layer_record(lyr_name, layer))
+
+        li_gs_results, search_results = self.read_and_search(full=full, dry_run=dry_run,
+                                                             resume=resume, sink=sink)
+        # instances without any layer get their export too
+        for gs_result in li_gs_results:
+            self.exporter(exporters, gs_result.get("name"))
+        li_paths = self.close_exports(exporters, search_results) + \
+            self.write_reconciliation(li_gs_results, search_results)
+        return li_gs_results, search_results, li_paths
+
+    def exporters(self):
+        """Exporters by export prefix: the single one is created at once,
+        those by instance on first use (see exporter)."""
+        exporters = OrderedDict()
+        if self.settings.get("output", {}).get("out_per_server", "0") != "1":
+            self.exporter(exporters, None)
+        return exporters
+
+    def exporter(self, exporters, gs_name):
+        """Return the export prefix and the exporter of an instance."""
+        out_opts = self.settings.get("output", {})
+        prefix = out_opts.get("out_prefix")
+        if out_opts.get("out_per_server", "0") == "1":
+            prefix = "{}_{}".format(prefix, gs_name)
+        if prefix not in exporters:
+            out_formats = [fmt.strip() for fmt in out_opts.get("out_formats", "xlsx").split(",")]
+            exporters[prefix] = Exporter(prefix, out_formats, metrics=self.metrics)
+        return prefix, exporters[prefix]
+
+    def close_exports(self, exporters, search_results):
+        """Write the metadata into each export, then save them. Return the
+        paths written."""
+        url_base, csw_share = self.links_settings()
+        link_templates = LinkTemplates(url_base, *csw_share)
+        li_paths = []
+        for prefix, exporter in exporters.items():
+            with self.metrics.phase("export_build {}".format(path.basename(prefix))):
+                for md in search_results:
+                    exporter.write("metadata", metadata_record(md, link_templates))
+            with self.metrics.phase("export_save"):
+                li_paths.extend(exporter.close())
+        logger.info("{} GENERATED. OVER.".format(self.settings.get("output", {})
+                                                 .get("out_formats", "xlsx").upper()))
+        return li_paths
+
+    def write_reconciliation(self, li_gs_results, search_results):
+        """Write the reconciliation report of the layers, the matching
+        table and the metadata. Return the paths written."""
+        out_opts = self.settings.get("output", {})
+        out_formats = [fmt.strip() for fmt in out_opts.get("out_formats", "xlsx").split(",")]
+        counts = {}
+        with self.metrics.phase("reconcile"):
+            exporter = Exporter(out_opts.get("out_prefix"), out_formats,
+                                spec=RECONCILE_SPEC, metrics=self.metrics)
+            for rec in reconcile(li_gs_results, self.matching(), search_results,
+                                 orphans=self.read_complete(li_gs_results)):
+                counts[rec.get("status")] = counts.get(rec.get("status"), 0) + 1
+                exporter.write("reconciliation", rec)
+            li_paths = exporter.close()
+        log_counts(counts)
+        for status, count in counts.items():
+            self.metrics.count("reconcile_{}".format(status), count)
+        return li_paths
+
+    def read_all(self):
+        """True if every instance and workspace is read (no --server nor
+        --workspace filter)."""
+        return not self.servers and not self.workspaces
+
+    def read_complete(self, li_gs_results):
+        """True if every layer has been read: no workspace filter and no
+        instance failed. Else matching rows can not be told orphans."""
+        return not self.workspaces and not any(gs_result.get("error")
+                                               for gs_result in li_gs_results)
+
+    def clear_journals(self, li_gs_results):
+        """Remove the journals of the instances read to the end."""
+        for gs_result in li_gs_results:
+            if not gs_result.get("error"):
+                clear_journal(self.journal_path(gs_result.get("name")))
+
+    # -- COMMANDS -------------------------------------------------------------
+    def read(self):
+        """Read GeoServer and store the metadata links to change, without
+        writing them."""
+        self.metrics = RunMetrics()
+        li_gs_results = self.read_geoservers(full=True, dry_run=True)
+        self.save_reports()
+        return li_gs_results
+
+    def link(self, full=False, resume=False):
+        """Read GeoServer and set the metadata links, without Isogeo nor
+        exports."""
+        self.metrics = RunMetrics()
+        full = full or self.state.needs_full(self.full_every, sides=("geoserver", ))
+        li_gs_results = self.read_geoservers(full=full, resume=resume)
+        # Isogeo was not read: only the GeoServer side is full
+        self.state.save(full=("geoserver", ) if full and self.read_all() else ())
+        self.clear_journals(li_gs_results)
+        self.save_reports()
+        return li_gs_results
+
+    def search(self, full=False, output=None):
+        """Search the Isogeo share, results stored in output JSON if set."""
+        self.metrics = RunMetrics()
+        search_results = self.search_isogeo(full=full)
+        self.state.save(full=("isogeo", ) if full else ())
+        if output:
+            with io.open(output, "wb") as out_json:
+                out_json.write(json.dumps(search_results, indent=2).encode("utf-8"))
+            logger.info("Isogeo search - {} metadata saved: {}"
+                        .format(len(search_results), output))
+        self.save_reports()
+        return search_results
+
+    def export(self, full=False):
+        """Read GeoServer without writing links, search Isogeo and export."""
+        self.metrics = RunMetrics()
+        if self.streaming():
+            li_paths = self.stream_exports(full=full, dry_run=True)[2]
+        else:
+            li_gs_results, search_results = self.read_and_search(full=full, dry_run=True)
+            li_paths = self.write_exports(li_gs_results, search_results)
+        self.state.save()
+        self.save_reports()
+        return li_paths
+
+    def sync(self, full=False, dry_run=False, resume=False, stream=True):
+        """Run every step: GeoServer, Isogeo, then exports. Return the
+        exports paths.
+
+        stream = if True (and possible, see streaming), layers are exported
+                 while being read. Else exports are written after the read,
+                 only if their inputs changed since the last sync (empty
+                 paths if unchanged).
+        """
+        self.metrics = RunMetrics()
+        full = full or self.state.needs_full(self.full_every)
+        logger.info("Sync - {} run".format("full" if full else "incremental"))
+
+        if stream and self.streaming():
+            li_gs_results, search_results, li_paths = self.stream_exports(full=full,
+                                                                          dry_run=dry_run,
+                                                                          resume=resume)
+            self._exports_sign = None
+        else:
+            li_gs_results, search_results = self.read_and_search(full=full, dry_run=dry_run,
+                                                                 resume=resume)
+            li_paths = []
+            exports_sign = exports_signature(li_gs_results, search_results)
+            if exports_sign != self._exports_sign:
+                li_paths = self.write_exports(li_gs_results, search_results)
+                self._exports_sign = exports_sign
+            else:
+                logger.info("Exports - inputs unchanged, not regenerated")
+
+        # a dry run synchronized nothing
+        if not dry_run:
+            self.state.save(full=SIDES if full and self.read_all()
+                            else ("isogeo", ) if full else ())
+            self.clear_journals(li_gs_results)
+        self.save_reports()
+        return li_paths
+
+    def watch(self, interval=60, full=False, dry_run=False, resume=False):
+        """Run sync every interval seconds until stop() is called or
+        SIGTERM/SIGINT is received. A failed cycle is logged and the next
+        one runs as planned.
+
+        full, resume = options of the first cycle only
+        dry_run = option of every cycle
+        """
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                signal.signal(sig, lambda signum, frame: self.stop())
+            except ValueError:
+                # not the main thread: stop() only
+                pass
+        logger.info("Watch - a cycle every {} seconds".format(interval))
+        while not self._stop.is_set():
+            start = time.time()
+            try:
+                # read first: exports are compared with the last ones
+                self.sync(full=full, dry_run=dry_run, resume=resume, stream=False)
+            except Exception as e:
+                logger.error("Watch - cycle failed: {}".format(e))
+            full = resume = False
+            self._stop.wait(max(interval - (time.time() - start), 0))
+        logger.info("Watch - stopped")
+
+    def stop(self):
+        self._stop.set()
+
+    def streaming(self):
+        """True if layers can be streamed from the readers to the exports:
+        readers run in threads of this process."""
+        return self.settings.get("geoserver", {}).get("sync_mode", "thread") == "thread"
+
+    # -- MEASURES -------------------------------------------------------------
+    def wrap_call(self, func, family):
+        """func recorded into the metrics of the running command."""
+        def wrapped(*args, **kwargs):
+            return self.metrics.wrap_call(func, family)(*args, **kwargs)
+        return wrapped
+
+    def save_reports(self):
+        """Store the run report of the last command, if set in [output]."""
+        out_opts = self.settings.get("output", {})
+        if out_opts.get("report_json"):
+            logger.info("Run report - {}".format(self.metrics.save_json(out_opts.get("report_json"))))
+        if out_opts.get("report_prom"):
+            logger.info("Run report - {}".format(self.metrics.save_prometheus(out_opts.get("report_prom"))))
+
+# ##############################################################################
+# ########## Functions #############
+# ##################################
+
 
+def read_settings(settings_path):
+    """Sections of an ini file as a dictionary of dictionaries."""
+    config = ConfigParser()
+    config.read(settings_path)
+    return {s: dict(config.items(s)) for s in config.sections()}
 
 
-    def function(self):
-        # method ending
-        return
+def exports_signature(li_gs_results, search_results):
+    """Hash of what the exports are built from: the layers and the
+    metadata, as identified by their _modified stamp."""
+    layers = [[gs_result.get("name"), lyr] + [layer.get(key) for key in LAYER_KEYS]
+              for gs_result in li_gs_results
+              for lyr, layer in gs_result.get("dico_gs").get("layers", {}).items()]
+    metadata = [[md.get("_id"), md.get("_modified")] for md in search_results]
+    return hashlib.sha1(json.dumps([layers, metadata]).encode("utf-8")).hexdigest()
 
-    def function(self):
-        # method ending
-        return
 
-    def function(self):
-        # method ending
-        return
+def main(argv=None):
+    """Command line: isogeo2geoserver.py [--settings ini] command [options]"""
+    parser = argparse.ArgumentParser(description="Synchronize Isogeo metadata"
+                                                 " links on GeoServer and"
+                                                 " export both catalogs.")
+    parser.add_argument("--settings", default="settings.ini",
+                        help="settings file (default: settings.ini)")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
 
-    def function(self):
-        # method ending
-        return
+    # options of the commands reading GeoServer
+    gs_parser = argparse.ArgumentParser(add_help=False)
+    gs_parser.add_argument("--server", action="append",
+                           help="GeoServer instance to process, repeatable"
+                                " (default: all)")
+    gs_parser.add_argument("--workspace", action="append",
+                           help="GeoServer workspace to process, repeatable"
+                                " (default: all)")
+    full_parser = argparse.ArgumentParser(add_help=False)
+    full_parser.add_argument("--full", action="store_true",
+                             help="process everything, whatever the sync state")
 
-    def function(self):
-        # method ending
-        return
+    subparsers.add_parser("read", parents=[gs_parser],
+                          help="read GeoServer and store the metadata links"
+                               " to change in JSON plans, writing nothing")
+    link = subparsers.add_parser("link", parents=[gs_parser, full_parser],
+                                 help="set the metadata links on GeoServer")
+    link.add_argument("--resume", action="store_true",
+                      help="skip the layers already processed by a run"
+                           " which stopped midway (see journal_dir)")
+    search = subparsers.add_parser("search", parents=[full_parser],
+                                   help="search the Isogeo share")
+    search.add_argument("--output",
+                        help="JSON file where the metadata are stored")
+    subparsers.add_parser("export", parents=[gs_parser, full_parser],
+                          help="export GeoServer layers and Isogeo metadata,"
+                               " writing no metadata links")
+    sync = subparsers.add_parser("sync", parents=[gs_parser, full_parser],
+                                 help="link, search and export")
+    sync.add_argument("--dry-run", action="store_true",
+                      help="compare metadata links but do not write them:"
+                           " the change plan is stored in a JSON file")
+    sync.add_argument("--resume", action="store_true",
+                      help="skip the layers already processed by a run"
+                           " which stopped midway (see journal_dir)")
+    sync.add_argument("--watch", action="store_true",
+                      help="keep running, a sync every --interval seconds")
+    sync.add_argument("--interval", type=float,
+                      help="seconds between two syncs of the watch mode"
+                           " (default: [daemon] poll_interval or 60)")
+    args = parser.parse_args(argv)
 
-    def function(self):
-        # method ending
-        return
+    log_opts = read_settings(args.settings).get("log", {})
+    setup_logging(log_opts.get("log_file", "LOG_i2gs.log"),
+                  level=log_opts.get("log_level") or "INFO",
+                  json_lines=log_opts.get("log_json", "0") == "1",
+                  max_bytes=log_opts.get("log_max_bytes") or 5000000,
+                  backup_count=log_opts.get("log_backups") or 1)
+    i2gs = IsogeoToGeoServer(args.settings,
+                             servers=getattr(args, "server", None),
+                             workspaces=getattr(args, "workspace", None))
+    if args.command == "read":
+        return i2gs.read()
+    elif args.command == "link":
+        return i2gs.link(full=args.full, resume=args.resume)
+    elif args.command == "search":
+        return i2gs.search(full=args.full, output=args.output)
+    elif args.command == "export":
+        return i2gs.export(full=args.full)
+    elif args.watch:
+        interval = args.interval
+        if interval is None:
+            interval = float(i2gs.settings.get("daemon", {}).get("poll_interval") or 60)
+        return i2gs.watch(interval, full=args.full, dry_run=args.dry_run,
+                          resume=args.resume)
+    else:
+        return i2gs.sync(full=args.full, dry_run=args.dry_run, resume=args.resume)
 
 # ############################################################################
 # ##### Stand alone program ########
 # ##################################
 
 if __name__ == '__main__':
-    u"""Standalone execution for tests."""
-    # ------------ Specific imports ---------------------
-    i2gs = IsogeoToGeoServer()
-    print(dir(i2gs))
+    u"""Standalone execution."""
+    main()
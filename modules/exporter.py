@@ -0,0 +1,440 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Exporter
+# Purpose:      Export GeoServer layers and Isogeo metadata into the
+#               tables expected by the portal (XLSX, CSV, JSON Lines or
+#               Parquet), from a declarative spec
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import csv
+import io
+import json
+import logging
+import sys
+from os import path
+
+# Python 3 backported
+from collections import OrderedDict
+
+# submodules
+from .metrics import timed_phase
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    text_type = unicode  # noqa: F821
+else:
+    text_type = str
+
+# ############################################################################
+# ######### Columns #############
+# ###############################
+
+
+def field(name, default=None):
+    """Column value read from a record field."""
+    return lambda rec: rec.get(name, default)
+
+
+def template(tpl):
+    """Column value formatted from record fields."""
+    return lambda rec: tpl.format(**rec)
+
+
+def const(value):
+    """Column value which is always the same."""
+    return lambda rec: value
+
+
+def link_columns(label, kind, url_field, action, kind_header="KIND"):
+    """Columns shared by every sheet of links to a GeoServer layer."""
+    return (("TITRE GEOSERVER", field("title")),
+            ("INTITULE", template(label)),
+            (kind_header, const(kind)),
+            ("URL", field(url_field)),
+            ("ACTION", const(action)),
+            ("ASSOCIER_A", field("md_id_matching")),
+            ("GS_DATASTORE_TYPE", field("store_type")),
+            ("GS_SOURCE_TYPE", field("lyr_type")),
+            ("GS_WORKSPACE", field("workspace")),
+            ("GS_DATASTORE_NAME", field("store_name")))
+
+
+# ############################################################################
+# ######### Spec ################
+# ###############################
+
+# output suffix => sheets as (records source, sheet title, columns)
+EXPORT_SPEC = OrderedDict([
+    ("gs_full", (
+        ("layers", "GEOSERVER - FULL", (
+            ("GS_WORKSPACE", field("workspace")),
+            ("GS_DATASTORE_NAME", field("store_name")),
+            ("GS_DATASTORE_TYPE", field("store_type")),
+            ("GS_SOURCE_TYPE", field("lyr_type")),
+            ("GS_NOM", field("name")),
+            ("GS_TITRE", field("title")),
+            ("MD_UUID", field("md_id_matching")))),
+    )),
+    ("wms_OC", (
+        ("layers", "WMS", link_columns("Couche WMS - {short_title}", "wms",
+                                       "md_link_oc_wms", "view",
+                                       kind_header="TYPE")),
+    )),
+    ("wfs_OC", (
+        ("layers", "WFS", link_columns("Couche WFS - {short_title}", "wfs",
+                                       "md_link_oc_wfs", "view",
+                                       kind_header="TYPE")),
+    )),
+    ("download_wfs", (
+        ("layers", "DOWNLOAD", link_columns("Extraire - {short_title}", "data",
+                                            "md_link_dl", "download")),
+    )),
+    ("mapfish", (
+        ("layers", "MAPFISH - WMS", link_columns("Visualiseur - {short_title} (WMS)",
+                                                 "url", "md_link_mapfish_wms",
+                                                 "view")),
+        ("layers", "MAPFISH - WFS", link_columns("Visualiseur - {short_title} (WFS)",
+                                                 "url", "md_link_mapfish_wfs",
+                                                 "view")),
+    )),
+    ("cswquerier", (
+        ("layers", "CSW QUERIER - WMS", link_columns("{name}", "wms",
+                                                     "md_link_csw_wms", "view")),
+        ("layers", "CSW QUERIER - WFS", link_columns("{name}", "wfs",
+                                                     "md_link_csw_wfs",
+                                                     "[view,download]")),
+    )),
+    ("srv_md", (
+        ("metadata", "GEOSERVER_METADATA", (
+            ("UUID_METADATA", field("_id")),
+            ("ISOGEO_NOM", field("title", "")),
+            ("ISOGEO_TITRE", field("name", "")),
+            ("ISOGEO_CHEMIN", field("path", "")),
+            ("ISOGEO_RESUME", field("abstract", "")),
+            ("URL_HTML", field("srv_link_html")),
+            ("URL_XML", field("srv_link_xml")))),
+    )),
+    ("md_external", (
+        ("metadata", "METADATA_DIRECT_LINK", (
+            ("URL_HTML", field("srv_link_html")),
+            ("INTITULE", template("Voir la métadonnée originale - {title}")),
+            ("KIND", const("url")),
+            ("ACTION", const("other")),
+            ("ASSOCIER_A", field("_id")))),
+    )),
+])
+
+# ############################################################################
+# ######### Records #############
+# ###############################
+
+
+def layer_record(lyr_name, layer):
+    """Return the export record of a GeoServer layer."""
+    rec = dict(layer)
+    rec["name"] = lyr_name
+    rec["short_title"] = layer.get("title").rsplit(" -")[0]
+    return rec
+
+
+def metadata_record(md, templates):
+    """Return the export record of an Isogeo metadata.
+
+    templates = LinkTemplates of the portal
+    """
+    rec = dict(md)
+    rec.setdefault("title", "")
+    rec["srv_link_html"] = templates.srv_link_html(md.get("_id"))
+    rec["srv_link_xml"] = templates.srv_link_xml(md.get("_id"))
+    return rec
+
+# ############################################################################
+# ######### Backends ############
+# ###############################
+
+
+class XlsxBackend(object):
+    """Write each output into a write-only workbook: {out_prefix}_{suffix}.xlsx"""
+    metrics = None
+
+    def __init__(self, out_prefix):
+        super(XlsxBackend, self).__init__()
+        self.out_prefix = out_prefix
+        self.workbooks = OrderedDict()
+        self.tables = []
+
+    def open_table(self, suffix, name, title, headers):
+        """Add a sheet to the workbook of suffix and write headers."""
+        from openpyxl import Workbook
+        if suffix not in self.workbooks:
+            self.workbooks[suffix] = Workbook(write_only=True)
+        ws = self.workbooks.get(suffix).create_sheet(title=title)
+        self.tunning_worksheet(ws)
+        table = _XlsxTable(ws, headers)
+        self.tables.append(table)
+        return table
+
+    def close(self):
+        """Enable filters then save workbooks. Return the files paths."""
+        for table in self.tables:
+            table.close()
+
+        li_dest = []
+        for suffix, wb in self.workbooks.items():
+            dest = "{}_{}.xlsx".format(self.out_prefix, suffix)
+            with timed_phase(self.metrics, "export_save {}".format(path.basename(dest))):
+                wb.save(filename=dest)
+            li_dest.append(dest)
+        return li_dest
+
+    @staticmethod
+    def tunning_worksheet(sheet):
+        """CLEAN UP & TUNNING a write-only worksheet, before any row."""
+        # Freezing panes
+        sheet.freeze_panes = "B2"
+
+        # Print properties
+        sheet.print_options.horizontalCentered = True
+        sheet.print_options.verticalCentered = True
+        sheet.page_setup.fitToWidth = 1
+        sheet.page_setup.orientation = "landscape"
+
+        # Others properties
+        sheet.sheet_properties.filterMode = True
+
+
+class _XlsxTable(object):
+    """Write-only worksheet keeping its rows count."""
+
+    def __init__(self, ws, headers):
+        self.ws = ws
+        self.width = len(headers)
+        self.rows = 0
+        self.append(headers)
+
+    def append(self, row):
+        self.ws.append(row)
+        self.rows += 1
+
+    def close(self):
+        from openpyxl.utils import get_column_letter
+        self.ws.auto_filter.ref = "A1:{}{}".format(get_column_letter(self.width),
+                                                   self.rows)
+
+
+class CsvBackend(object):
+    """Write each table into a UTF-8 CSV file: {out_prefix}_{table}.csv"""
+    extension = "csv"
+
+    def __init__(self, out_prefix):
+        super(CsvBackend, self).__init__()
+        self.out_prefix = out_prefix
+        self.tables = []
+
+    def open_table(self, suffix, name, title, headers):
+        """Create the file of the table and write headers."""
+        dest = "{}_{}.{}".format(self.out_prefix, name, self.extension)
+        table = self.table_class(dest, headers)
+        self.tables.append(table)
+        return table
+
+    def close(self):
+        """Close files. Return their paths."""
+        for table in self.tables:
+            table.close()
+        return [table.dest for table in self.tables]
+
+    @property
+    def table_class(self):
+        return _CsvTable
+
+
+class _CsvTable(object):
+    """CSV file written row by row."""
+
+    def __init__(self, dest, headers):
+        self.dest = dest
+        if PY2:
+            self.out = io.open(dest, "wb")
+        else:
+            self.out = io.open(dest, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.out, delimiter=str(";"))
+        self.append(headers)
+
+    def append(self, row):
+        if PY2:
+            row = [v.encode("utf-8") if isinstance(v, text_type) else v
+                   for v in row]
+        self.writer.writerow(row)
+
+    def close(self):
+        self.out.close()
+
+
+class JsonLinesBackend(CsvBackend):
+    """Write each table into a JSON Lines file: {out_prefix}_{table}.jsonl"""
+    extension = "jsonl"
+
+    @property
+    def table_class(self):
+        return _JsonLinesTable
+
+
+class _JsonLinesTable(object):
+    """JSON Lines file, one object per row, keyed by headers."""
+
+    def __init__(self, dest, headers):
+        self.dest = dest
+        self.headers = headers
+        self.out = io.open(dest, "wb")
+
+    def append(self, row):
+        line = json.dumps(OrderedDict(zip(self.headers, row)), default=str)
+        self.out.write(line.encode("utf-8") + b"\n")
+
+    def close(self):
+        self.out.close()
+
+
+class ParquetBackend(CsvBackend):
+    """Write each table into a Parquet file: {out_prefix}_{table}.parquet
+
+    Rows are buffered then flushed as row groups, so memory stays bounded.
+    Requires pyarrow.
+    """
+    extension = "parquet"
+
+    def __init__(self, out_prefix):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            logging.error("Parquet output requires pyarrow: pip install pyarrow")
+            raise
+        super(ParquetBackend, self).__init__(out_prefix)
+
+    @property
+    def table_class(self):
+        return _ParquetTable
+
+
+class _ParquetTable(object):
+    """Parquet file written by row groups of string columns."""
+    ROW_GROUP_SIZE = 10000
+
+    def __init__(self, dest, headers):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.dest = dest
+        self.headers = headers
+        self.schema = pa.schema([pa.field(h, pa.string()) for h in headers])
+        self.writer = pq.ParquetWriter(dest, self.schema)
+        self.buffer = []
+
+    def append(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        columns = [[None if v is None else "{}".format(v) for v in col]
+                   for col in zip(*self.buffer)] or [[] for h in self.headers]
+        arrays = [self.pa.array(col, type=self.pa.string()) for col in columns]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays,
+                                                          schema=self.schema))
+        self.buffer = []
+
+    def close(self):
+        if self.buffer:
+            self.flush()
+        self.writer.close()
+
+
+BACKENDS = OrderedDict([("xlsx", XlsxBackend),
+                        ("csv", CsvBackend),
+                        ("jsonl", JsonLinesBackend),
+                        ("parquet", ParquetBackend)])
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class Exporter(object):
+    """Stream records into the tables described by a spec, for every
+    output format.
+
+    out_prefix = prefix of the output files
+    formats = output formats, among BACKENDS keys
+    spec = ordered mapping of suffix => sheets (see EXPORT_SPEC)
+    metrics = RunMetrics timing the save of each output
+    """
+
+    def __init__(self, out_prefix, formats=("xlsx", ), spec=EXPORT_SPEC,
+                 metrics=None):
+        super(Exporter, self).__init__()
+        self.metrics = metrics
+        self.backends = []
+        for fmt in formats:
+            if fmt not in BACKENDS:
+                raise ValueError("Unknown output format: {}. Choose among: {}"
+                                 .format(fmt, ", ".join(BACKENDS)))
+            self.backends.append(BACKENDS.get(fmt)(out_prefix))
+
+        # records source => list of (tables, columns)
+        self.sheets = {}
+        for suffix, sheets in spec.items():
+            for source, title, columns in sheets:
+                name = table_name(suffix, title, len(sheets))
+                headers = [header for header, getter in columns]
+                tables = [backend.open_table(suffix, name, title, headers)
+                          for backend in self.backends]
+                self.sheets.setdefault(source, []).append((tables, columns))
+
+    def write(self, source, rec):
+        """Append a record to every table fed by source."""
+        for tables, columns in self.sheets.get(source, []):
+            row = [getter(rec) for header, getter in columns]
+            for table in tables:
+                table.append(row)
+
+    def close(self):
+        """Flush and close every output. Return the files paths."""
+        li_dest = []
+        for backend in self.backends:
+            backend.metrics = self.metrics
+            li_dest.extend(backend.close())
+        for dest in li_dest:
+            logging.info("Export - {} saved".format(dest))
+        return li_dest
+
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def table_name(suffix, title, nb_sheets):
+    """Name of a logical table: the output suffix, completed by the sheet
+    title when the output has several sheets (i.e. mapfish_wms)."""
+    if nb_sheets == 1:
+        return suffix
+    else:
+        return "{}_{}".format(suffix, title.rsplit(" - ")[-1].lower())
@@ -0,0 +1,318 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         GeoServer asynchronous reader
+# Purpose:      Read a GeoServer catalog through its REST JSON API with many
+#               requests in flight, over a shared connection pool
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       3.7+ (asyncio, aiohttp)
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+
+# 3rd party libraries
+import aiohttp
+
+# submodules
+from .journal import RunJournal
+from .layer_record import LayerRecord, LinkTemplates
+from .matching import MatchingTable
+from .md_links import MetadataLinksWriter
+from .metrics import HttpStats, endpoint_family
+from .sync_state import reusable_layer
+from .transport import ssl_off
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# resource class in the REST API => source type, as named by ReadGeoServer
+RESOURCE_TYPES = {"featureType": "vector",
+                  "coverage": "coverage"}
+
+# a progress line every PROGRESS layers, the others are logged as DEBUG
+PROGRESS = 1000
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class AsyncMetadataLinksWriter(MetadataLinksWriter):
+    """MetadataLinksWriter working on REST JSON resources: links are PUT
+    through the reader session, only when they differ.
+
+    reader = AsyncReadGeoServer owning the session
+    dry_run = if True, nothing is written: only the change plan is built
+    """
+
+    def __init__(self, reader, dry_run=False):
+        super(AsyncMetadataLinksWriter, self).__init__(None, dry_run=dry_run)
+        self.reader = reader
+
+    async def update(self, lyr_name, store_name, links, resource=None):
+        """Set links on the resource if they are not already the same.
+
+        resource = tuple like (resource href, resource class, JSON content)
+        """
+        href, res_class, content = resource
+        current = self.normalize((link.get("type"),
+                                  link.get("metadataType"),
+                                  link.get("content"))
+                                 for link in metadata_links(content))
+
+        if current == self.normalize(links):
+            return self._track(lyr_name, store_name, current, links, self.SKIPPED)
+        if self.dry_run:
+            return self._track(lyr_name, store_name, current, links, self.PLANNED)
+
+        body = {res_class: {"metadataLinks": {"metadataLink": [
+            {"type": mime, "metadataType": md_type, "content": url}
+            for mime, md_type, url in links]}}}
+        try:
+            start = time.time()
+            await self.reader.put(href, body)
+        except Exception as e:
+            logging.error("Metadata links - saving {} failed: {}"
+                          .format(lyr_name, e))
+            return self._track(lyr_name, store_name, current, links, self.FAILED)
+
+        self.write_seconds += time.time() - start
+        return self._track(lyr_name, store_name, current, links, self.WRITTEN)
+
+
+class AsyncReadGeoServer(object):
+    def __init__(self, gs_axx, dico_gs, tipo, txt='',
+                 url_base="", dict_match_gs_md=None, csw_share=("", ""),
+                 concurrency=100, dry_run=False, timeout=60, transport=None,
+                 known=None, journal=None, resume=False, only_workspaces=None):
+        """Fill dico_gs like ReadGeoServer, reading the REST API with up to
+        concurrency requests in flight instead of one.
+
+        gs_axx = tuple like (url of the GeoServer REST API, user, password,
+                 SSL verification disabled)
+        dico_gs = dictionary to store
+        tipo = format
+        text = dictionary of text in the selected language
+        url_base = base URL of the portal used to build links
+        dict_match_gs_md = MatchingTable of GeoServer layer name (or
+                           workspace:layer name) => Isogeo UUID
+        csw_share = tuple like (Isogeo CSW share id, share token)
+        concurrency = maximum of requests in flight
+        dry_run = if True, metadata links are compared but never written
+        timeout = seconds before a request is abandoned
+        transport = dictionary of Transport options: only the proxy applies
+        known = layers synchronized by the last run (see SyncState): those
+                whose matched UUID and workspace did not change are neither
+                read nor written again
+        journal = file recording each layer once processed (see RunJournal),
+                  not used in dry run
+        resume = if True, the layers recorded in journal by a previous run
+                 are not processed again
+        only_workspaces = names of the workspaces whose layers are read and
+                          written, the others being ignored (default: all)
+        """
+        self.gs_axx = gs_axx
+        self.rest_url = gs_axx[0].rstrip("/")
+        self.concurrency = max(int(concurrency), 1)
+        self.timeout = timeout
+        self.proxy = ((transport or {}).get("proxies") or {}).get("https")
+        self.dict_match_gs_md = dict_match_gs_md or MatchingTable([])
+        self.templates = LinkTemplates(url_base, *csw_share,
+                                       hyphenated=self.dict_match_gs_md.hyphenated)
+        self.journal = RunJournal(journal, resume) if journal and not dry_run else None
+        self.only_workspaces = only_workspaces
+        self.known = dict(known or {})
+        if self.journal:
+            self.known.update(self.journal.done)
+        self.md_writer = AsyncMetadataLinksWriter(self, dry_run=dry_run)
+        self.http_stats = HttpStats()
+        self.session = None
+        self._semaphore = None
+        self._stores = {}
+
+        asyncio.run(self.read(dico_gs))
+
+    async def read(self, dico_gs):
+        """Read workspaces, layers, resources and stores into dico_gs."""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency,
+                                         ssl=False if ssl_off(self.gs_axx[3]) else None)
+        async with aiohttp.ClientSession(
+                connector=connector,
+                auth=aiohttp.BasicAuth(self.gs_axx[1] or "", self.gs_axx[2] or ""),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Accept": "application/json"}) as self.session:
+            # -- WORKSPACES ---------------------------------------------------
+            workspaces = await self.get("{}/workspaces.json".format(self.rest_url))
+            for wk in listing(workspaces, "workspaces", "workspace"):
+                dico_gs[wk.get("name")] = wk.get("href"), {}
+
+            # -- LAYERS -------------------------------------------------------
+            layers = listing(await self.get("{}/layers.json".format(self.rest_url)),
+                             "layers", "layer")
+            logging.info("{} layers found".format(len(layers)))
+            # prefixed names tell the workspace, others are read to know it
+            if self.only_workspaces:
+                layers = [lyr for lyr in layers
+                          if ":" not in lyr.get("name")
+                          or lyr.get("name").split(":")[0] in self.only_workspaces]
+            # unchanged since the last run: kept as they are
+            reused = {}
+            for lyr in layers:
+                wk_name, _, lyr_name = lyr.get("name").rpartition(":")
+                cached = reusable_layer(self.known, lyr_name,
+                                        self.dict_match_gs_md, wk_name)
+                if cached:
+                    reused[lyr.get("href")] = cached
+            if self.known:
+                logging.info("{} layers unchanged since the last run"
+                             .format(len(reused)))
+            results = await asyncio.gather(*[self.read_layer(lyr.get("href"))
+                                             for lyr in layers
+                                             if lyr.get("href") not in reused])
+
+        if self.journal:
+            self.journal.close()
+        results = iter(results)
+        dico_layers = OrderedDict()
+        for idx, lyr in enumerate(layers):
+            if idx and not idx % PROGRESS:
+                logging.info("%s/%s layers read", idx, len(layers))
+            if lyr.get("href") in reused:
+                cached = reused.get(lyr.get("href"))
+                if self.only_workspaces and cached[2] not in self.only_workspaces:
+                    continue
+                dico_layers[cached[0]] = LayerRecord(self.templates, *cached)
+                continue
+            resolved = next(results)
+            # not in the workspaces read
+            if resolved is None:
+                continue
+            lyr_name, lyr_title, lyr_wkspace, lyr_store, lyr_store_type, lyr_type, md_uuid_pure = resolved
+            logging.debug("%s | %s | %s | %s", idx, lyr_type, lyr_name, lyr_title)
+            dico_layers[lyr_name] = LayerRecord(self.templates,
+                                                lyr_name,
+                                                lyr_title,
+                                                lyr_wkspace,
+                                                lyr_store,
+                                                lyr_store_type,
+                                                lyr_type,
+                                                md_uuid_pure)
+
+        dico_gs["layers"] = dico_layers
+        self.md_writer.summary()
+
+    async def read_layer(self, href):
+        """Return a tuple with name, title, workspace, store name, store type,
+        source type and matched UUID of a layer, its links being updated.
+        None if the layer is not in the workspaces read."""
+        layer = (await self.get(href)).get("layer", {})
+        res_ref = layer.get("resource", {})
+        res_class = res_ref.get("@class")
+        resource = (await self.get(res_ref.get("href"))).get(res_class, {})
+
+        lyr_name = resource.get("name") or layer.get("name").split(":")[-1]
+        lyr_wkspace = resource.get("namespace", {}).get("name") \
+            or res_ref.get("name", "").split(":")[0]
+        if self.only_workspaces and lyr_wkspace not in self.only_workspaces:
+            return None
+        store_ref = resource.get("store", {})
+        lyr_store = store_ref.get("name", "").split(":")[-1]
+        lyr_store_type = await self.store_type(store_ref.get("href"),
+                                               store_ref.get("@class"))
+
+        # Metadata links (service => metadata), workspace-qualified first
+        md_uuid_pure = self.dict_match_gs_md.lookup(lyr_name, lyr_wkspace)
+        if md_uuid_pure:
+            links = MetadataLinksWriter.expected_links(self.templates.srv_link_html(md_uuid_pure),
+                                                       self.templates.srv_link_xml(md_uuid_pure))
+            status = await self.md_writer.update(lyr_name,
+                                                 lyr_store,
+                                                 links,
+                                                 resource=(res_ref.get("href"), res_class, resource))
+        else:
+            logging.debug("Service without metadata: %s", lyr_name)
+            md_uuid_pure = ""
+            status = None
+
+        resolved = (lyr_name,
+                    resource.get("title"),
+                    lyr_wkspace,
+                    lyr_store,
+                    lyr_store_type,
+                    RESOURCE_TYPES.get(res_class, res_class),
+                    md_uuid_pure)
+        # failed ones are processed again on resume
+        if self.journal and status != MetadataLinksWriter.FAILED:
+            self.journal.layer_done(lyr_name, resolved[1:])
+        return resolved
+
+    async def store_type(self, href, store_class):
+        """Type of a store, fetched once whatever the number of its layers."""
+        if not href:
+            return None
+        if href not in self._stores:
+            self._stores[href] = asyncio.ensure_future(self.get(href))
+        store = await self._stores[href]
+        return store.get(store_class, {}).get("type")
+
+    async def get(self, url):
+        """GET a JSON document."""
+        async with self._semaphore:
+            start = time.time()
+            async with self.session.get(url, proxy=self.proxy) as response:
+                content = await response.read()
+            self.http_stats.record(endpoint_family(url, "GET"),
+                                   time.time() - start,
+                                   len(content),
+                                   response.status)
+            response.raise_for_status()
+            return json.loads(content.decode("utf-8"))
+
+    async def put(self, url, body):
+        """PUT a JSON document."""
+        async with self._semaphore:
+            start = time.time()
+            async with self.session.put(url, json=body, proxy=self.proxy) as response:
+                await response.read()
+            self.http_stats.record(endpoint_family(url, "PUT"),
+                                   time.time() - start,
+                                   0,
+                                   response.status)
+            response.raise_for_status()
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def listing(content, plural, singular):
+    """Items of a REST list, which is an empty string when there is none."""
+    items = (content.get(plural) or {}).get(singular) or []
+    if isinstance(items, dict):
+        return [items]
+    return items
+
+
+def metadata_links(resource):
+    """Metadata links of a REST resource, as a list of dicts."""
+    links = resource.get("metadatalinks") or resource.get("metadataLinks") or {}
+    links = links.get("metadataLink") or []
+    if isinstance(links, dict):
+        return [links]
+    return links
@@ -19,34 +19,105 @@ from __future__ import (absolute_import, print_function, unicode_literals)
 
 # Standard library
 import logging
+import threading
+from multiprocessing.pool import ThreadPool
 
 # Python 3 backported
-from collections import OrderedDict
+from collections import OrderedDict, deque
 
 # 3rd party libraries
 from geoserver.catalog import Catalog
 from geoserver.resource import Coverage, FeatureType
 
+# submodules
+from .http_cache import install_cache
+from .journal import RunJournal
+from .layer_record import LayerRecord, LinkTemplates
+from .matching import MatchingTable
+from .md_links import MetadataLinksWriter
+from .metrics import HttpStats, InstrumentedHttp
+from .sync_state import reusable_layer
+from .transport import get_transport, install_transport, ssl_off
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# layers resolved ahead of the consumer, by worker thread
+WINDOW = 4
+
+# a progress line every PROGRESS layers, the others are logged as DEBUG
+PROGRESS = 1000
+
 # ############################################################################
 # ######### Classes #############
 # ###############################
 
 
 class ReadGeoServer():
-    def __init__(self, gs_axx, dico_gs, tipo, txt=''):
+    def __init__(self, gs_axx, dico_gs, tipo, txt='',
+                 url_base="", dict_match_gs_md=None, csw_share=("", ""),
+                 max_workers=1, dry_run=False, http_cache=None, bulk=False,
+                 transport=None, write_workers=0, write_rate=0, known=None,
+                 journal=None, resume=False, only_workspaces=None, stream=False):
         """Use OGR functions to extract basic informations about geoserver.
 
         gs_axx = tuple like {url of a geoserver, user, password)
         dico_gs = dictionary to store
         tipo = format
         text = dictionary of text in the selected language
+        url_base = base URL of the portal used to build links
+        dict_match_gs_md = MatchingTable of GeoServer layer name (or
+                           workspace:layer name) => Isogeo UUID
+        csw_share = tuple like (Isogeo CSW share id, share token)
+        max_workers = number of threads resolving layers concurrently
+        dry_run = if True, metadata links are compared but never written
+        http_cache = dictionary of HttpCache options (cache_dir, ttl, max_size)
+                     to keep REST responses on disk between runs
+        bulk = if True, stores and resources are listed by workspace then
+               joined to layers instead of being resolved layer by layer
+        transport = dictionary of Transport options (see transport_settings)
+                    to share pooled connections between catalogs
+        write_workers = threads saving metadata links in background while
+                        reading. If 0: saved inline
+        write_rate = maximum of metadata links saves by second (0 = unlimited)
+        known = layers synchronized by the last run (see SyncState): those
+                whose matched UUID did not change are neither read nor
+                written again
+        journal = file recording each layer once processed (see RunJournal),
+                  not used in dry run
+        resume = if True, the layers recorded in journal by a previous run
+                 are not processed again
+        only_workspaces = names of the workspaces whose layers are read and
+                          written, the others being ignored (default: all)
+        stream = if True, layers are not stored into dico_gs: they are read
+                 while the reader is iterated, then close() must be called
         """
+        self.gs_axx = gs_axx
+        self.http_cache = http_cache
+        self.transport = transport
+        self.http_stats = HttpStats()
+        self.max_workers = max(int(max_workers), 1)
+        self._local = threading.local()
+        dict_match_gs_md = dict_match_gs_md or MatchingTable([])
+        self.templates = LinkTemplates(url_base, *csw_share,
+                                       hyphenated=dict_match_gs_md.hyphenated)
+        self.journal = RunJournal(journal, resume) if journal and not dry_run else None
+        # layers waiting for their metadata links => attributes to journal
+        self._unsaved = {}
+        if self.journal and self.journal.done:
+            known = dict(known or {})
+            known.update(self.journal.done)
+
         # connection
-        cat = Catalog(gs_axx[0], gs_axx[1], gs_axx[2],
-                      disable_ssl_certificate_validation=gs_axx[3])
+        self.cat = cat = self.connect()
         # print(dir(cat))
-
-
+        self.md_writer = MetadataLinksWriter(cat,
+                                             dry_run=dry_run,
+                                             write_workers=write_workers,
+                                             write_rate=write_rate,
+                                             connect=self.connect,
+                                             on_done=self.journal_layer)
 
         # -- WORKSPACES -------------------------------------------------------
         workspaces = cat.get_workspaces()
@@ -69,165 +140,295 @@ class ReadGeoServer():
         #     dico_gs.get(st.workspace.name)[1][st.name] = {"ds_type": st.type,
         #                                                   "ds_url": url}
 
-        # print(dir(st))
-        # print(st.url)
-        # print(st.workspace)
-        # print(dir(st.workspace))
-        # print(st.workspace.name)
-
         # -- LAYERS -----------------------------------------------------------
         # resources_target = cat.get_resources(workspace='ayants-droits')
+        self.layers = self.iter_layers(workspaces, dict_match_gs_md, known=known,
+                                       bulk=bulk, only_workspaces=only_workspaces)
+        if stream:
+            # the caller iterates the reader, then calls close()
+            return
+        dico_gs["layers"] = OrderedDict(self.layers)
+        self.close()
+
+    def __iter__(self):
+        """Yield (layer name, LayerRecord) as soon as each layer is read and
+        its metadata links are updated (or queued)."""
+        return self.layers
+
+    def iter_layers(self, workspaces, dict_match_gs_md, known=None, bulk=False,
+                    only_workspaces=None):
+        """Generator behind __iter__: see __init__ for the options."""
+        cat = self.cat
+        templates = self.templates
         layers = cat.get_layers()
         logging.info("{} layers found".format(len(layers)))
-        dico_layers = OrderedDict()
-        for layer in layers:
-            # print(layer.resource_type)
-            lyr_title = layer.resource.title
-            lyr_name = layer.name
-            lyr_wkspace = layer.resource._workspace.name
-            if type(layer.resource) is Coverage:
-                lyr_type = "coverage"
-            elif type(layer.resource) is FeatureType:
-                lyr_type = "vector"
+        # only the layers named like a resource of the workspaces
+        if only_workspaces:
+            workspaces = [wk for wk in workspaces if wk.name in only_workspaces]
+            index = self.index_resources(cat, workspaces)
+            layers = [layer for layer in layers if layer.name in index]
+            logging.info("{} layers in {}".format(len(layers),
+                                                  ", ".join(only_workspaces)))
+        else:
+            index = None
+        # unchanged since the last run: kept as they are
+        reused = OrderedDict()
+        if known:
+            # listed once, for the workspaces of the layers and the join
+            if bulk and index is None:
+                index = self.index_resources(cat, workspaces)
+            for layer in layers:
+                cached = reusable_layer(known, layer.name, dict_match_gs_md,
+                                        workspace=self.layer_workspace(layer.name, index))
+                if cached:
+                    reused[layer.name] = cached
+            layers_read = [layer for layer in layers if layer.name not in reused]
+            logging.info("{} layers unchanged since the last run"
+                         .format(len(reused)))
+        else:
+            layers_read = layers
+
+        if not layers_read:
+            resolved_layers = []
+        elif bulk:
+            resolved_layers = self.resolve_layers_bulk(cat, layers_read, workspaces,
+                                                       index=index)
+        else:
+            resolved_layers = self.resolve_layers(cat, layers_read)
+        resolved_layers = iter(resolved_layers)
+        for idx, layer in enumerate(layers):
+            if idx and not idx % PROGRESS:
+                logging.info("%s/%s layers read", idx, len(layers))
+            if layer.name in reused:
+                resolved = reused.get(layer.name)
             else:
-                lyr_type = type(layer.resource)
+                resolved = next(resolved_layers)
+            # same name in another workspace
+            if only_workspaces and resolved[2] not in only_workspaces:
+                continue
+            if layer.name in reused:
+                yield layer.name, LayerRecord(templates, *resolved)
+                continue
+            lyr_name, lyr_title, lyr_wkspace, lyr_store, lyr_store_type, lyr_type, rzourc = resolved
 
             # a log handshake
-            logging.info("{} | {} | {} | {}".format(layers.index(layer),
-                                                    lyr_type,
-                                                    lyr_name,
-                                                    lyr_title))
-
-            # # METADATA LINKS #
-            # download link
-            md_link_dl = "{0}/geoserver/{1}/ows?request=GetFeature"\
-                         "&service=WFS&typeName={1}%3A{2}&version=2.0.0"\
-                         "&outputFormat=SHAPE-ZIP"\
-                         .format(url_base,
-                                 lyr_wkspace,
-                                 lyr_name)
-
-            # mapfish links
-            md_link_mapfish_wms = "{0}/mapfishapp/?layername={1}"\
-                                  "&owstype=WMSLayer&owsurl={0}/"\
-                                  "geoserver/{2}/ows"\
-                                  .format(url_base,
-                                          lyr_name,
-                                          lyr_wkspace)
-
-            md_link_mapfish_wfs = "{0}/mapfishapp/?layername={1}"\
-                                  "&owstype=WFSLayer&owsurl={0}/"\
-                                  "geoserver/{2}/ows"\
-                                  .format(url_base,
-                                          lyr_name,
-                                          lyr_wkspace)
-
-            md_link_mapfish_wcs = "{0}/mapfishapp/?cache=PreferNetwork"\
-                                  "&crs=EPSG:2154&format=GeoTIFF"\
-                                  "&identifier={1}:{2}"\
-                                  "&url={0}/geoserver/ows?"\
-                                  .format(url_base,
-                                          lyr_wkspace,
-                                          lyr_name)
-
-            # OC links
-            md_link_oc_wms = "{0}/geoserver/{1}/wms?layers={1}:{2}"\
-                             .format(url_base,
-                                     lyr_wkspace,
-                                     lyr_name)
-            md_link_oc_wfs = "{0}/geoserver/{1}/ows?typeName={1}:{2}"\
-                             .format(url_base,
-                                     lyr_wkspace,
-                                     lyr_name)
-
-            md_link_oc_wcs = "{0}/geoserver/{1}/ows?typeName={1}:{2}"\
-                             .format(url_base,
-                                     lyr_wkspace,
-                                     lyr_name)
-
-            # CSW Querier links
-            md_link_csw_wms = "{0}/geoserver/ows?service=wms&version=1.3.0"\
-                              "&request=GetCapabilities".format(url_base)
-
-            md_link_csw_wfs = "{0}/geoserver/ows?service=wfs&version=2.0.0"\
-                              "&request=GetCapabilities".format(url_base)
-
-            # # # SERVICE LINKS #
-            # GeoServer Edit links
-            gs_link_edit = "{}/geoserver/web/?wicket:bookmarkablePage="\
-                           ":org.geoserver.web.data.resource."\
-                           "ResourceConfigurationPage"\
-                           "&name={}"\
-                           "&wsName={}".format(url_base,
-                                               lyr_wkspace,
-                                               lyr_name)
-
-            # Metadata links (service => metadata)
-            if is_uuid(dict_match_gs_md.get(lyr_name)):
-                # HTML metadata
-                md_uuid_pure = dict_match_gs_md.get(lyr_name)
-                srv_link_html = "{}/portail/geocatalogue?uuid={}"\
-                                .format(url_base, md_uuid_pure)
-
-                # XML metadata
-                md_uuid_formatted = "{}-{}-{}-{}-{}".format(md_uuid_pure[:8],
-                                                            md_uuid_pure[8:12],
-                                                            md_uuid_pure[12:16],
-                                                            md_uuid_pure[16:20],
-                                                            md_uuid_pure[20:])
-                srv_link_xml = "http://services.api.isogeo.com/ows/s/"\
-                               "{1}/{2}?"\
-                               "service=CSW&version=2.0.2&request=GetRecordById"\
-                               "&id=urn:isogeo:metadata:uuid:{0}&"\
-                               "elementsetname=full&outputSchema="\
-                               "http://www.isotc211.org/2005/gmd"\
-                               .format(md_uuid_formatted,
-                                       csw_share_id,
-                                       csw_share_token)
-                # add to GeoServer layer
-                rzourc = cat.get_resource(lyr_name,
-                                          store=layer.resource._store.name)
-                rzourc.metadata_links = [('text/html', 'ISO19115:2003', srv_link_html),
-                                         ('text/xml', 'ISO19115:2003', srv_link_xml),
-                                         ('text/html', 'TC211', srv_link_html),
-                                         ('text/xml', 'TC211', srv_link_xml)]
-                # rzourc.metadata_links.append(('text/html', 'other', 'hohoho'))
-                cat.save(rzourc)
-
+            logging.debug("%s | %s | %s | %s", idx, lyr_type, lyr_name, lyr_title)
+
+            # Metadata links (service => metadata), workspace-qualified first
+            md_uuid_pure = dict_match_gs_md.lookup(lyr_name, lyr_wkspace)
+            if md_uuid_pure:
+                # add to GeoServer layer, only if links changed
+                links = MetadataLinksWriter.expected_links(templates.srv_link_html(md_uuid_pure),
+                                                           templates.srv_link_xml(md_uuid_pure))
+                self._unsaved[lyr_name] = (lyr_title, lyr_wkspace, lyr_store,
+                                           lyr_store_type, lyr_type, md_uuid_pure)
+                self.md_writer.update(lyr_name,
+                                      lyr_store,
+                                      links,
+                                      resource=rzourc)
             else:
-                logging.info("Service without metadata: {} ({})".format(lyr_name,
-                                                                        dict_match_gs_md.get(lyr_name)))
-                pass
-
-            dico_layers[layer.name] = {"title": lyr_title,
-                                       "workspace": lyr_wkspace,
-                                       "store_name": layer.resource._store.name,
-                                       "store_type": layer.resource._store.type,
-                                       "lyr_type": lyr_type,
-                                       "md_link_dl": md_link_dl,
-                                       "md_link_mapfish": md_link_mapfish_wms,
-                                       "md_link_mapfish_wms": md_link_mapfish_wms,
-                                       "md_link_mapfish_wfs": md_link_mapfish_wfs,
-                                       "md_link_mapfish_wcs": md_link_mapfish_wcs,
-                                       "md_link_oc_wms": md_link_oc_wms,
-                                       "md_link_oc_wfs": md_link_oc_wfs,
-                                       "md_link_oc_wcs": md_link_oc_wcs,
-                                       "md_link_csw_wms": md_link_csw_wms,
-                                       "md_link_csw_wfs": md_link_csw_wfs,
-                                       "gs_link_edit": gs_link_edit,
-                                       "srv_link_html": srv_link_html,
-                                       "srv_link_xml": srv_link_xml,
-                                       "md_id_matching": md_uuid_pure
-                                       }
-
-            # mem clean up
-            # del dico_layer
-
-        # print(dico_gs.get(layer.resource._workspace.name)[1][layer.resource._store.name])
-        # print(dir(layer.resource))
-        # print(dir(layer.resource.writers))
-        # print(dir(layer.resource.writers.get("metadataLinks").func_dict))
-        # print(layer.resource.metadata)
-        # print(layer.resource.metadata_links)
-
-        dico_gs["layers"] = dico_layers
\ No newline at end of file
+                logging.debug("Service without metadata: %s", lyr_name)
+                md_uuid_pure = ""
+                if self.journal:
+                    self.journal.layer_done(lyr_name, (lyr_title, lyr_wkspace, lyr_store,
+                                                       lyr_store_type, lyr_type, md_uuid_pure))
+
+            yield lyr_name, LayerRecord(templates,
+                                        lyr_name,
+                                        lyr_title,
+                                        lyr_wkspace,
+                                        lyr_store,
+                                        lyr_store_type,
+                                        lyr_type,
+                                        md_uuid_pure)
+
+
+    def close(self):
+        """Wait for the queued metadata links saves, then log the summary."""
+        self.md_writer.close()
+        if self.journal:
+            self.journal.close()
+        self.md_writer.summary()
+        if self.http_cache:
+            logging.info("HTTP cache - {}".format(self.cat.http.stats()))
+
+    def journal_layer(self, lyr_name, status):
+        """Journal a layer once its metadata links are set (see on_done of
+        MetadataLinksWriter). Failed ones are processed again on resume."""
+        attrs = self._unsaved.pop(lyr_name, None)
+        if self.journal and attrs and status in (MetadataLinksWriter.WRITTEN,
+                                                 MetadataLinksWriter.SKIPPED):
+            self.journal.layer_done(lyr_name, attrs)
+
+    def connect(self):
+        """Return a new Catalog, on the shared transport and with the HTTP
+        cache plugged if enabled."""
+        cat = Catalog(self.gs_axx[0], self.gs_axx[1], self.gs_axx[2],
+                      disable_ssl_certificate_validation=self.gs_axx[3])
+        if self.transport:
+            install_transport(cat,
+                              get_transport(**self.transport),
+                              self.gs_axx[1],
+                              self.gs_axx[2],
+                              verify=not ssl_off(self.gs_axx[3]))
+        # under the cache: only the requests really sent are measured
+        cat.http = InstrumentedHttp(cat.http, self.http_stats)
+        if self.http_cache:
+            install_cache(cat, **self.http_cache)
+        return cat
+
+    def resolve_layers(self, cat, layers):
+        """Yield resolved layers attributes, in the same order as layers.
+
+        With more than one worker, layers are resolved by a pool of threads,
+        each one using its own Catalog since the HTTP client is not
+        thread-safe.
+        """
+        return self._map(self._resolve_threaded, layers)
+
+    def resolve_layers_bulk(self, cat, layers, workspaces, index=None):
+        """Same as resolve_layers, but stores and resources are listed by
+        workspace and store then joined to layers by name.
+
+        Listing costs 1 request by workspace and 2 by store, then only the
+        resource of each layer is fetched (for its title and metadata links)
+        instead of the layer, the stores of its workspace and its store.
+        Layers missing from the lists are resolved one by one.
+
+        index = resources of the workspaces if already listed (see
+                index_resources)
+        """
+        if index is None:
+            index = self.index_resources(cat, workspaces)
+
+        # -- JOIN -------------------------------------------------------------
+        joined = [(layer, index.get(layer.name)) for layer in layers]
+        logging.info("{} layers joined to listed resources"
+                     .format(sum(1 for _, entry in joined if entry)))
+        return self._map(self._resolve_joined, joined)
+
+    def index_resources(self, cat, workspaces):
+        """Return the resources of the workspaces by workspace:resource and
+        resource names, as tuples like (resource, store name, store type).
+        A resource name found in several workspaces maps to None."""
+        # -- STORES -----------------------------------------------------------
+        stores = []
+        for wk in workspaces:
+            stores.extend(cat.get_stores(workspace=wk))
+        logging.info("{} stores found".format(len(stores)))
+
+        # -- RESOURCES --------------------------------------------------------
+        # workspace:resource and resource names => (resource, store name, type)
+        index = {}
+        li_ambiguous = set()
+        for store, store_type, resources in self._map(self._list_store, stores):
+            for resource in resources:
+                entry = (resource, store.name, store_type)
+                index["{}:{}".format(store.workspace.name, resource.name)] = entry
+                if resource.name in index:
+                    li_ambiguous.add(resource.name)
+                index[resource.name] = entry
+        # same name in several workspaces: let GeoServer tell which one
+        for name in li_ambiguous:
+            index[name] = None
+        return index
+
+    def resolve_layer(self, layer):
+        """Return a tuple with name, title, workspace, store name, store type,
+        source type and resource of a layer.
+
+        Each REST call (layer, resource, store) is done only once.
+        """
+        resource = layer.resource
+        store = resource._store
+        return (layer.name,
+                resource.title,
+                resource._workspace.name,
+                store.name,
+                store.type,
+                self.resource_type(resource),
+                resource)
+
+    @staticmethod
+    def layer_workspace(lyr_name, index=None):
+        """Workspace of a layer, from its workspace-qualified name or from
+        the listed resources (see index_resources). None if unknown."""
+        if ":" in lyr_name:
+            return lyr_name.split(":")[0]
+        entry = index.get(lyr_name) if index else None
+        if entry is None:
+            return None
+        return entry[0]._workspace.name
+
+    @staticmethod
+    def resource_type(resource):
+        """Source type of a resource: vector or coverage."""
+        if type(resource) is Coverage:
+            return "coverage"
+        elif type(resource) is FeatureType:
+            return "vector"
+        else:
+            return type(resource)
+
+    def _catalog(self):
+        """Catalog of the current thread: the main one if not threaded."""
+        if self.max_workers == 1:
+            return self.cat
+        if not hasattr(self._local, "cat"):
+            self._local.cat = self.connect()
+        return self._local.cat
+
+    def _map(self, func, items):
+        """Yield func(item) for each item, in the items order, through a pool
+        of threads if more than one worker is allowed.
+
+        At most WINDOW results by worker are computed ahead of the consumer,
+        so a slow consumer does not make them pile up in memory.
+        """
+        if self.max_workers == 1 or len(items) < 2:
+            for item in items:
+                yield func(item)
+            return
+
+        pool = ThreadPool(min(self.max_workers, len(items)))
+        window = self.max_workers * WINDOW
+        pending = deque()
+        try:
+            # results are taken in the input order whatever the completion one
+            for item in items:
+                pending.append(pool.apply_async(func, (item, )))
+                if len(pending) >= window:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.close()
+            pool.join()
+
+    def _resolve_threaded(self, layer):
+        """Resolve a layer using the catalog dedicated to the current thread."""
+        layer.catalog = self._catalog()
+        return self.resolve_layer(layer)
+
+    def _list_store(self, store):
+        """Return a store with its type and its resources."""
+        store.catalog = self._catalog()
+        return store, store.type, store.get_resources()
+
+    def _resolve_joined(self, joined):
+        """Resolve a layer from its listed resource: only the resource itself
+        is fetched."""
+        layer, entry = joined
+        if entry is None:
+            logging.debug("%s not listed, resolved alone", layer.name)
+            return self._resolve_threaded(layer)
+
+        resource, store_name, store_type = entry
+        resource.catalog = self._catalog()
+        return (layer.name,
+                resource.title,
+                resource._workspace.name,
+                store_name,
+                store_type,
+                self.resource_type(resource),
+                resource)
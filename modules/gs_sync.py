@@ -0,0 +1,271 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         GeoServers synchronization
+# Purpose:      Read and sync several GeoServer instances at the same time,
+#               each one in its own thread or process
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+try:
+    from Queue import Empty, Full, Queue
+except ImportError:
+    from queue import Empty, Full, Queue
+
+# Python 3 backported
+from collections import OrderedDict
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def geoservers_settings(settings):
+    """Return an ordered dict of GeoServer name => options.
+
+    The [geoserver] section is the "default" instance if it has a gs_url.
+    Each [geoserver.<name>] section is another instance, inheriting the
+    options it does not set from [geoserver].
+    """
+    base = settings.get("geoserver", {})
+    servers = OrderedDict()
+    if base.get("gs_url"):
+        servers["default"] = dict(base)
+    for section in sorted(settings):
+        if section.startswith("geoserver."):
+            opts = dict(base)
+            opts.update(settings.get(section))
+            servers[section.split(".", 1)[1]] = opts
+    return servers
+
+
+def geoserver_job(name, opts, url_base, **kwargs):
+    """Build the job of a GeoServer instance for sync_geoservers.
+
+    name = name of the instance
+    opts = options of the instance (see geoservers_settings)
+    url_base = portal URL, unless the instance sets its own
+    kwargs = other ReadGeoServer options shared by every instance
+    """
+    gs_axx = (opts.get("gs_url"),
+              opts.get("gs_user"),
+              opts.get("gs_pswd"),
+              opts.get("gs_ssl_off"))
+    if opts.get("http_cache_dir"):
+        http_cache = {"cache_dir": opts.get("http_cache_dir"),
+                      "ttl": int(opts.get("http_cache_ttl", 300)),
+                      "max_size": int(opts.get("http_cache_size", 100)) * 1024 * 1024}
+    else:
+        http_cache = None
+
+    kwargs.update(url_base=opts.get("url_base") or url_base)
+    engine = read_engine(opts)
+    if engine == "async":
+        kwargs.update(engine=engine,
+                      concurrency=int(opts.get("async_concurrency", 100)))
+    else:
+        kwargs.update(max_workers=int(opts.get("max_workers", 1)),
+                      bulk=engine == "bulk",
+                      http_cache=http_cache,
+                      write_workers=int(opts.get("write_workers", 0)),
+                      write_rate=float(opts.get("write_rate", 0)))
+    return name, gs_axx, kwargs
+
+
+def read_engine(opts):
+    """Name of the engine reading the layers of an instance:
+    catalog (layer by layer), bulk (listing stores and resources) or async
+    (REST JSON API with many requests in flight, Python 3.7+)."""
+    engine = opts.get("read_engine") or "catalog"
+    if engine not in ("catalog", "bulk", "async"):
+        raise ValueError("Unknown read engine: {}. Choose among: catalog, bulk, async"
+                         .format(engine))
+    elif engine == "async" and sys.version_info < (3, 7):
+        raise ValueError("The async read engine requires Python 3.7+")
+    return engine
+
+
+def reader_class(engine):
+    """GeoServer reader class of an engine, imported only when used."""
+    if engine == "async":
+        from .gs_async import AsyncReadGeoServer
+        return AsyncReadGeoServer
+    else:
+        from .gs_reader import ReadGeoServer
+        return ReadGeoServer
+
+
+def read_geoserver(job):
+    """Read (and sync) one GeoServer instance. Return its isolated results:
+    dictionary with name, dico_gs, metadata links counts and plan, error,
+    and the measures: seconds, link_write (seconds spent saving links),
+    http (see HttpStats.as_dict)."""
+    name, gs_axx, kwargs = job
+    kwargs = dict(kwargs)
+    logging.info("GeoServer {} - reading {}".format(name, gs_axx[0]))
+    dico_gs = OrderedDict()
+    start = time.time()
+    try:
+        reader_cls = reader_class(kwargs.pop("engine", "catalog"))
+        reader = reader_cls(gs_axx, dico_gs, 'GeoServer', **kwargs)
+    except Exception as e:
+        return failed_result(name, dico_gs, e, start)
+    return reader_result(name, dico_gs, reader, start)
+
+
+def stream_geoserver(job, put):
+    """Same as read_geoserver, but each layer is passed to put(layer name,
+    LayerRecord) as soon as it is read, instead of being kept in dico_gs.
+
+    The async engine reads every layer before the first one is passed: its
+    event loop runs apart from the caller.
+    """
+    name, gs_axx, kwargs = job
+    kwargs = dict(kwargs)
+    engine = kwargs.pop("engine", "catalog")
+    if engine == "async":
+        result = read_geoserver(job)
+        for lyr_name, layer in result.get("dico_gs").pop("layers", {}).items():
+            put(lyr_name, layer)
+        return result
+
+    logging.info("GeoServer {} - streaming {}".format(name, gs_axx[0]))
+    dico_gs = OrderedDict()
+    start = time.time()
+    reader = None
+    try:
+        reader = reader_class(engine)(gs_axx, dico_gs, 'GeoServer',
+                                      stream=True, **kwargs)
+        for lyr_name, layer in reader:
+            put(lyr_name, layer)
+    except Exception as e:
+        return failed_result(name, dico_gs, e, start)
+    finally:
+        # queued links saves and journal, even if the read stopped midway
+        if reader is not None:
+            reader.close()
+    return reader_result(name, dico_gs, reader, start)
+
+
+def stream_geoservers(jobs, max_parallel=None, buffer_size=100):
+    """Read every job concurrently like sync_geoservers (threads only) and
+    yield (instance name, layer name, LayerRecord) as layers are read, then
+    (instance name, None, results of read_geoserver) when an instance is
+    over. Layers of the instances come mixed, in the order they are read.
+
+    max_parallel = maximum of instances read at the same time (default: all)
+    buffer_size = layers read ahead of the consumer, by instance read at
+                  the same time: readers wait when it is reached
+    """
+    if not jobs:
+        return
+    size = min(int(max_parallel or len(jobs)), len(jobs))
+    queue = Queue(maxsize=max(int(buffer_size), 1) * size)
+    stopped = threading.Event()
+
+    def put(item):
+        """Wait for room in the queue, unless the consumer left."""
+        while not stopped.is_set():
+            try:
+                return queue.put(item, timeout=0.5)
+            except Full:
+                pass
+        raise RuntimeError("stream closed by the consumer")
+
+    def produce(job):
+        name = job[0]
+        start = time.time()
+        try:
+            result = stream_geoserver(job, lambda lyr_name, layer: put((name, lyr_name, layer)))
+        except Exception as e:
+            result = failed_result(name, OrderedDict(), e, start)
+        try:
+            put((name, None, result))
+        except RuntimeError:
+            pass
+
+    pool = ThreadPool(size)
+    try:
+        producers = pool.map_async(produce, jobs, chunksize=1)
+        running = len(jobs)
+        while running:
+            try:
+                name, lyr_name, item = queue.get(timeout=0.5)
+            except Empty:
+                # a producer which died before its end marker
+                if producers.ready():
+                    producers.get()
+                    raise RuntimeError("GeoServer stream - readers over,"
+                                       " {} instances missing".format(running))
+                continue
+            if lyr_name is None:
+                running -= 1
+            yield name, lyr_name, item
+    finally:
+        stopped.set()
+        pool.close()
+        pool.join()
+
+
+def failed_result(name, dico_gs, error, start):
+    """Results of an instance whose read failed."""
+    logging.error("GeoServer {} - failed: {}".format(name, error))
+    return {"name": name, "dico_gs": dico_gs, "counts": {}, "plan": [],
+            "error": "{}".format(error), "seconds": time.time() - start,
+            "link_write": 0, "http": {}}
+
+
+def reader_result(name, dico_gs, reader, start):
+    """Results of an instance read to the end (see read_geoserver)."""
+    return {"name": name,
+            "dico_gs": dico_gs,
+            "counts": dict(reader.md_writer.counts),
+            "plan": reader.md_writer.plan,
+            "error": None,
+            "seconds": time.time() - start,
+            "link_write": reader.md_writer.write_seconds,
+            "http": reader.http_stats.as_dict()}
+
+
+def sync_geoservers(jobs, mode="thread", max_parallel=None):
+    """Run read_geoserver on every job concurrently. Return the results in
+    the jobs order.
+
+    jobs = list of jobs built with geoserver_job
+    mode = "thread" or "process"
+    max_parallel = maximum of instances read at the same time (default: all)
+    """
+    if len(jobs) < 2:
+        return [read_geoserver(job) for job in jobs]
+
+    size = min(int(max_parallel or len(jobs)), len(jobs))
+    if mode == "process":
+        pool = multiprocessing.Pool(size)
+    elif mode == "thread":
+        pool = ThreadPool(size)
+    else:
+        raise ValueError("Unknown sync mode: {}. Choose among: thread, process"
+                         .format(mode))
+    try:
+        return pool.map(read_geoserver, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,234 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         HTTP cache
+# Purpose:      Persistent cache of GeoServer REST responses, revalidated
+#               with conditional requests
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from os import makedirs, path
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# resources: their metadata links are compared before being written, so
+# they are never served from the ttl window
+RESOURCE_URLS = re.compile(r"/(featuretypes|coverages)/[^/]+$")
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class CachedResponse(dict):
+    """Minimal httplib2-like response built from a cache entry."""
+
+    def __init__(self, headers, status=200):
+        super(CachedResponse, self).__init__(headers)
+        self.status = status
+        self.reason = "OK"
+        self.fromcache = True
+        self["status"] = str(status)
+
+
+class HttpCache(object):
+    """Wrap an httplib2.Http-like client (the `http` attribute of a gsconfig
+    Catalog) to store GET responses on disk, keyed by URL.
+
+    Entries with an ETag or a Last-Modified header are revalidated with a
+    conditional request. Entries without any of them are served as long as
+    they are younger than ttl, except URLs matching revalidate, fetched
+    again each time. Least recently used entries are evicted once the
+    cache weighs more than max_size.
+
+    http = client to wrap
+    cache_dir = folder where the cache database is stored
+    ttl = lifetime (in seconds) of entries without validators
+    max_size = maximum size (in bytes) of the cached bodies
+    revalidate = regular expression of the URLs never served from the ttl
+                 window (default: resources, see RESOURCE_URLS)
+    """
+    DB_NAME = "http_cache.sqlite"
+
+    def __init__(self, http, cache_dir, ttl=300, max_size=100 * 1024 * 1024,
+                 revalidate=RESOURCE_URLS):
+        super(HttpCache, self).__init__()
+        self.http = http
+        self.ttl = ttl
+        self.max_size = max_size
+        self.revalidate = revalidate
+        self.hits = self.revalidated = self.misses = 0
+        self._lock = threading.Lock()
+
+        if not path.isdir(cache_dir):
+            makedirs(cache_dir)
+        self.db = sqlite3.connect(path.join(cache_dir, self.DB_NAME),
+                                  timeout=30,
+                                  check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS entries ("
+                        "url TEXT PRIMARY KEY, "
+                        "etag TEXT, "
+                        "last_modified TEXT, "
+                        "headers TEXT, "
+                        "body BLOB, "
+                        "size INTEGER, "
+                        "stored REAL, "
+                        "accessed REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_accessed "
+                        "ON entries (accessed)")
+        self.db.commit()
+
+    def __getattr__(self, name):
+        """Everything else (credentials, authorizations...) is delegated."""
+        if name == "http":
+            raise AttributeError(name)
+        return getattr(self.http, name)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        """Same signature and return as httplib2.Http.request."""
+        if method != "GET":
+            response = self.http.request(uri, method, body, headers, **kwargs)
+            self.invalidate(uri)
+            return response
+
+        entry = self._get(uri)
+        now = time.time()
+        headers = dict(headers or {})
+        if entry is None:
+            self._count("misses")
+        elif entry.get("etag") or entry.get("last_modified"):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry.get("etag")
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry.get("last_modified")
+        elif now - entry.get("stored") < self.ttl and not self._revalidated(uri):
+            self._count("hits")
+            self._touch(uri, now)
+            return CachedResponse(entry.get("headers")), entry.get("body")
+        else:
+            self._count("misses")
+
+        response, content = self.http.request(uri, method, body, headers, **kwargs)
+        if response.status == 304 and entry is not None:
+            self._count("revalidated")
+            self._touch(uri, now)
+            return CachedResponse(entry.get("headers")), entry.get("body")
+        elif response.status == 200:
+            self._store(uri, response, content, now)
+
+        return response, content
+
+    def invalidate(self, uri):
+        """Remove an URL from the cache, e.g. after the resource changed."""
+        with self._lock:
+            self.db.execute("DELETE FROM entries WHERE url = ?", (uri, ))
+            self.db.commit()
+
+    def stats(self):
+        """Return hits, revalidations and misses counts."""
+        with self._lock:
+            return {"hits": self.hits,
+                    "revalidated": self.revalidated,
+                    "misses": self.misses}
+
+    def _count(self, counter):
+        """Increment a counter: the cache is shared by the reading threads."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _revalidated(self, uri):
+        """True if the URL must not be served from the ttl window."""
+        return bool(self.revalidate) and self.revalidate.search(uri.split("?")[0]) is not None
+
+    def _get(self, uri):
+        """Return the cache entry of an URL or None."""
+        with self._lock:
+            row = self.db.execute("SELECT etag, last_modified, headers, body, "
+                                  "stored FROM entries WHERE url = ?",
+                                  (uri, )).fetchone()
+        if row is None:
+            return None
+        else:
+            return {"etag": row[0],
+                    "last_modified": row[1],
+                    "headers": json.loads(row[2]),
+                    "body": bytes(row[3]),
+                    "stored": row[4]}
+
+    def _touch(self, uri, now):
+        """Refresh last access time of an entry (LRU)."""
+        with self._lock:
+            self.db.execute("UPDATE entries SET accessed = ? WHERE url = ?",
+                            (now, uri))
+            self.db.commit()
+
+    def _store(self, uri, response, content, now):
+        """Store a response then evict least recently used entries."""
+        size = len(content)
+        if size > self.max_size:
+            return
+        headers = dict((k, v) for k, v in response.items() if k != "status")
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO entries VALUES "
+                            "(?, ?, ?, ?, ?, ?, ?, ?)",
+                            (uri,
+                             response.get("etag"),
+                             response.get("last-modified"),
+                             json.dumps(headers),
+                             sqlite3.Binary(content),
+                             size,
+                             now,
+                             now))
+            self._evict()
+            self.db.commit()
+
+    def _evict(self):
+        """Delete least recently used entries until max_size is respected."""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) "
+                                "FROM entries").fetchone()[0]
+        if total <= self.max_size:
+            return
+        rows = self.db.execute("SELECT url, size FROM entries "
+                               "ORDER BY accessed ASC").fetchall()
+        for url, size in rows:
+            if total <= self.max_size:
+                break
+            self.db.execute("DELETE FROM entries WHERE url = ?", (url, ))
+            total -= size
+        logging.debug("HTTP cache - evicted down to {} bytes".format(total))
+
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def install_cache(cat, cache_dir, ttl=300, max_size=100 * 1024 * 1024):
+    """Plug an HttpCache under the HTTP client of a gsconfig Catalog."""
+    if not hasattr(cat, "http"):
+        logging.warning("HTTP cache - unsupported Catalog client: disabled.")
+        return cat
+    elif isinstance(cat.http, HttpCache):
+        return cat
+    else:
+        cat.http = HttpCache(cat.http, cache_dir, ttl=ttl, max_size=max_size)
+    return cat
@@ -0,0 +1,139 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Isogeo search
+# Purpose:      Fetch every metadata of an Isogeo share, page by page,
+#               with a bounded number of concurrent requests
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import logging
+from multiprocessing.pool import ThreadPool
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# maximum number of metadata returned by a search request
+MAX_PAGE_SIZE = 100
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def search_all(isogeo, token, page_size=100, max_workers=4, **kwargs):
+    """Return all the results of an Isogeo search, in the API order.
+
+    The first page gives the total and the real size of the pages, the
+    remaining pages are requested concurrently then merged by offset.
+
+    isogeo = authenticated Isogeo SDK instance
+    token = token returned by isogeo.connect()
+    page_size = number of metadata by request (see MAX_PAGE_SIZE)
+    max_workers = number of pages requested at the same time
+    kwargs = other parameters passed to isogeo.search (query, share...)
+    """
+    page_size = max(min(int(page_size), MAX_PAGE_SIZE), 1)
+    # whole_share=False: the SDK would otherwise fetch every page itself,
+    # one after the other
+    first = isogeo.search(token, page_size=page_size, offset=0,
+                          whole_share=False, **kwargs)
+    total = first.get("total", 0)
+    results = list(first.get("results", []))
+    # the API may return less than requested: the next pages neither
+    page_size = len(results) or page_size
+    logging.info("Isogeo search - {} metadata in {} pages of {}"
+                 .format(total, -(-total // page_size), page_size))
+
+    offsets = list(range(len(results), total, page_size))
+    if offsets:
+        def fetch(offset):
+            page = isogeo.search(token, page_size=page_size, offset=offset,
+                                 whole_share=False, **kwargs)
+            return page.get("results", [])
+
+        pool = ThreadPool(max(min(int(max_workers), len(offsets)), 1))
+        try:
+            # imap keeps the offsets order whatever the completion order is
+            for page in pool.imap(fetch, offsets):
+                results.extend(page)
+        finally:
+            pool.close()
+            pool.join()
+
+    # records may move between pages if the share changes during the search
+    uniques = []
+    li_ids = set()
+    for md in results:
+        if md.get("_id") not in li_ids:
+            li_ids.add(md.get("_id"))
+            uniques.append(md)
+
+    if len(uniques) != total:
+        logging.warning("Isogeo search - {} metadata retrieved instead of {}"
+                        .format(len(uniques), total))
+    return uniques
+
+
+def search_since(isogeo, token, known, since, page_size=100, **kwargs):
+    """Return all the results of an Isogeo search, requesting only the
+    metadata modified after since. The others are taken from known.
+
+    The API has no modified-since filter: results are requested by
+    descending _modified, page after page, until a page reaches since.
+    Return None if metadata were added, or if the known ones do not match
+    the share total (e.g. metadata deleted or unshared): a complete search
+    is then needed.
+
+    isogeo = authenticated Isogeo SDK instance
+    token = token returned by isogeo.connect()
+    known = dictionary of metadata id => metadata of the last search
+    since = _modified stamp of the most recent known metadata
+    page_size = number of metadata by request (see MAX_PAGE_SIZE)
+    kwargs = other parameters passed to isogeo.search (query, share...)
+    """
+    page_size = max(min(int(page_size), MAX_PAGE_SIZE), 1)
+    changed = []
+    total = offset = 0
+    while True:
+        page = isogeo.search(token, page_size=page_size, offset=offset,
+                             order_by="_modified", order_dir="desc",
+                             whole_share=False, **kwargs)
+        total = page.get("total", 0)
+        results = page.get("results", [])
+        changed.extend(md for md in results if (md.get("_modified") or "") > since)
+        offset += len(results)
+        if not results or offset >= total or (results[-1].get("_modified") or "") <= since:
+            break
+
+    # a metadata unshared while another one was added keeps the count: the
+    # known ids are only trusted if none was added
+    news = [md for md in changed if md.get("_id") not in known]
+    if news:
+        logging.info("Isogeo search - {} metadata added since {}:"
+                     " complete search needed".format(len(news), since))
+        return None
+    if len(known) != total:
+        logging.info("Isogeo search - {} metadata known instead of {}:"
+                     " complete search needed".format(len(known), total))
+        return None
+
+    logging.info("Isogeo search - {} metadata modified since {}"
+                 .format(len(changed), since))
+    # same order as the last search
+    merged = dict(known)
+    for md in changed:
+        merged[md.get("_id")] = md
+    return [merged.get(md_id) for md_id in known]
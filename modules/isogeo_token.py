@@ -0,0 +1,179 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Isogeo token store
+# Purpose:      Reuse Isogeo API tokens across runs until they expire
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# codes of the OAuth2 errors (oauthlib) raised for a rejected token
+OAUTH_TOKEN_ERRORS = ("invalid_token", "token_expired")
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class TokenStore(object):
+    """Keep the token returned by Isogeo.connect() until shortly before it
+    expires, in memory or in a JSON file shared by successive runs.
+
+    Tokens are keyed by application id and API base, so one file can serve
+    several applications or platforms.
+
+    app_id = Isogeo application id
+    api_base = Isogeo API base URL
+    cache_path = JSON file where tokens are stored. If None: memory only
+    margin = seconds before expiry when the token is renewed
+    ttl = token lifetime (in seconds) when the SDK does not give it
+    """
+    _memory = {}
+    _memory_lock = threading.Lock()
+
+    def __init__(self, app_id, api_base, cache_path=None, margin=60, ttl=3600):
+        super(TokenStore, self).__init__()
+        self.key = "{}|{}".format(app_id, api_base)
+        self.cache_path = cache_path
+        self.margin = margin
+        self.ttl = ttl
+
+    def get(self, isogeo):
+        """Return a valid token, connecting only if none is stored."""
+        with self._locked():
+            tokens = self._load()
+            entry = tokens.get(self.key)
+            if entry and entry.get("expires") - self.margin > time.time():
+                logging.debug("Isogeo token - reused")
+                return self._decode(entry)
+
+            token = isogeo.connect()
+            tokens[self.key] = self._encode(token)
+            self._dump(tokens)
+            logging.info("Isogeo token - renewed")
+            return token
+
+    def invalidate(self):
+        """Forget the stored token, e.g. after it has been rejected."""
+        with self._locked():
+            tokens = self._load()
+            tokens.pop(self.key, None)
+            self._dump(tokens)
+
+    def with_token(self, isogeo, func):
+        """Call func(token). If the API answers 401, renew the token and
+        retry once."""
+        try:
+            return func(self.get(isogeo))
+        except Exception as e:
+            if not is_unauthorized(e):
+                raise
+            logging.warning("Isogeo token - rejected, renewing it: {}".format(e))
+            self.invalidate()
+            return func(self.get(isogeo))
+
+    # -- STORAGE ----------------------------------------------------------
+    def _encode(self, token):
+        """Serializable entry from the SDK token: a string or a tuple like
+        (token, expiry datetime) depending on the SDK version."""
+        if isinstance(token, (tuple, list)) and isinstance(token[-1], datetime):
+            expires = time.mktime(token[-1].timetuple()) + \
+                token[-1].microsecond / 1e6
+            return {"token": list(token[:-1]), "expires": expires, "dated": True}
+        else:
+            return {"token": token, "expires": time.time() + self.ttl}
+
+    def _decode(self, entry):
+        """SDK token from a stored entry."""
+        if entry.get("dated"):
+            return tuple(entry.get("token")) + \
+                (datetime.fromtimestamp(entry.get("expires")), )
+        else:
+            return entry.get("token")
+
+    def _load(self):
+        if self.cache_path is None:
+            return TokenStore._memory
+        elif not os.path.isfile(self.cache_path):
+            return {}
+        try:
+            with io.open(self.cache_path, "r", encoding="utf-8") as in_json:
+                return json.load(in_json)
+        except ValueError:
+            logging.warning("Isogeo token - corrupted cache ignored: {}"
+                            .format(self.cache_path))
+            return {}
+
+    def _dump(self, tokens):
+        if self.cache_path is None:
+            return
+        # readable by the owner only
+        fd = os.open(self.cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with io.open(fd, "wb") as out_json:
+            out_json.write(json.dumps(tokens).encode("utf-8"))
+
+    @contextmanager
+    def _locked(self):
+        """Lock the cache between processes (file) or threads (memory)."""
+        if self.cache_path is None:
+            with TokenStore._memory_lock:
+                yield
+            return
+
+        with io.open(self.cache_path + ".lock", "ab") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def is_unauthorized(error):
+    """True if an exception raised by the SDK means the token is invalid:
+    HTTP error with a 401 status, or OAuth2 error of a rejected token."""
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 401:
+        return True
+    return getattr(error, "status_code", None) == 401 or \
+        getattr(error, "error", None) in OAUTH_TOKEN_ERRORS
@@ -0,0 +1,97 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Run journal
+# Purpose:      Record each layer completely processed by a run, so that a
+#               run stopped midway can be resumed where it failed
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+import logging
+import os
+import threading
+
+# Python 3 backported
+from collections import OrderedDict
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class RunJournal(object):
+    """Append-only journal of the layers of a GeoServer instance whose
+    processing is over: read, and metadata links written or already set.
+
+    One JSON line by layer, flushed at once: if the process dies, every
+    line but maybe the last one is kept, and the last one is ignored.
+    Layers are stored like in SyncState (name => attributes, see
+    LAYER_KEYS), so the done ones can be reused the same way.
+
+    journal_path = file of the journal
+    resume = if True, the layers done by the previous run are loaded and
+             the journal goes on. Else it is started again empty.
+    """
+
+    def __init__(self, journal_path, resume=False):
+        super(RunJournal, self).__init__()
+        self.journal_path = journal_path
+        self.done = OrderedDict()
+        self._lock = threading.Lock()
+        self._torn = False
+        if resume:
+            self.load()
+        self._file = io.open(journal_path, "ab" if resume else "wb")
+        # next lines must not be glued to a line cut by the failure
+        if self._torn:
+            self._file.write(b"\n")
+
+    def load(self):
+        if not os.path.isfile(self.journal_path):
+            return
+        with io.open(self.journal_path, "rb") as in_journal:
+            for line in in_journal:
+                self._torn = not line.endswith(b"\n")
+                try:
+                    entry = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    # line cut by the failure
+                    continue
+                self.done[entry.get("layer")] = entry.get("attrs")
+        logging.info("Run journal - {} layers already done: {}"
+                     .format(len(self.done), self.journal_path))
+
+    def layer_done(self, lyr_name, attrs):
+        """Record a layer with its attributes (see LAYER_KEYS)."""
+        line = json.dumps({"layer": lyr_name, "attrs": list(attrs)})
+        with self._lock:
+            self._file.write((line + "\n").encode("utf-8"))
+            self._file.flush()
+            self.done[lyr_name] = list(attrs)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def clear_journal(journal_path):
+    """Remove the journal of a run which went to the end."""
+    if journal_path and os.path.isfile(journal_path):
+        os.remove(journal_path)
@@ -0,0 +1,191 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Layer record
+# Purpose:      Compact storage of GeoServer layers, with links computed
+#               on access from templates shared by every layer
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# package
+from .matching import hyphenate
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# names repeated on many layers (workspaces, stores, types) are stored once
+_interned = {}
+
+
+def intern_name(name):
+    """Return the shared instance of a string (works with unicode on 2.7)."""
+    return _interned.setdefault(name, name)
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class LinkTemplates(object):
+    """Links templates of a portal, formatted once with its base URL and the
+    Isogeo CSW share then shared by every layer.
+
+    url_base = base URL of the portal
+    csw_share_id = Isogeo CSW share id
+    csw_share_token = Isogeo CSW share token
+    hyphenated = dictionary of UUID => hyphenated form, already computed
+                 (see MatchingTable). Others are formatted on the fly.
+    """
+    __slots__ = ("templates", "csw_wms", "csw_wfs", "xml", "hyphenated")
+
+    def __init__(self, url_base, csw_share_id="", csw_share_token="",
+                 hyphenated=None):
+        super(LinkTemplates, self).__init__()
+        self.hyphenated = hyphenated or {}
+        # {ws} = workspace, {name} = layer name, {uuid} = metadata UUID
+        base = url_base.replace("{", "{{").replace("}", "}}")
+        self.templates = {
+            "md_link_dl": base + "/geoserver/{ws}/ows?request=GetFeature"
+                                 "&service=WFS&typeName={ws}%3A{name}"
+                                 "&version=2.0.0&outputFormat=SHAPE-ZIP",
+            "md_link_mapfish": base + "/mapfishapp/?layername={name}"
+                                      "&owstype=WMSLayer&owsurl=" + base +
+                                      "/geoserver/{ws}/ows",
+            "md_link_mapfish_wms": base + "/mapfishapp/?layername={name}"
+                                          "&owstype=WMSLayer&owsurl=" + base +
+                                          "/geoserver/{ws}/ows",
+            "md_link_mapfish_wfs": base + "/mapfishapp/?layername={name}"
+                                          "&owstype=WFSLayer&owsurl=" + base +
+                                          "/geoserver/{ws}/ows",
+            "md_link_mapfish_wcs": base + "/mapfishapp/?cache=PreferNetwork"
+                                          "&crs=EPSG:2154&format=GeoTIFF"
+                                          "&identifier={ws}:{name}"
+                                          "&url=" + base + "/geoserver/ows?",
+            "md_link_oc_wms": base + "/geoserver/{ws}/wms?layers={ws}:{name}",
+            "md_link_oc_wfs": base + "/geoserver/{ws}/ows?typeName={ws}:{name}",
+            "md_link_oc_wcs": base + "/geoserver/{ws}/ows?typeName={ws}:{name}",
+            # mind the original order: name = workspace, wsName = layer
+            "gs_link_edit": base + "/geoserver/web/?wicket:bookmarkablePage="
+                                   ":org.geoserver.web.data.resource."
+                                   "ResourceConfigurationPage"
+                                   "&name={ws}&wsName={name}",
+            "srv_link_html": base + "/portail/geocatalogue?uuid={uuid}",
+        }
+        # CSW Querier links are the same for every layer
+        self.csw_wms = "{}/geoserver/ows?service=wms&version=1.3.0"\
+                       "&request=GetCapabilities".format(url_base)
+        self.csw_wfs = "{}/geoserver/ows?service=wfs&version=2.0.0"\
+                       "&request=GetCapabilities".format(url_base)
+        # CSW GetRecordById, around the hyphenated metadata UUID
+        self.xml = ("http://services.api.isogeo.com/ows/s/{}/{}?"
+                    "service=CSW&version=2.0.2&request=GetRecordById"
+                    "&id=urn:isogeo:metadata:uuid:".format(csw_share_id,
+                                                           csw_share_token),
+                    "&elementsetname=full&outputSchema="
+                    "http://www.isotc211.org/2005/gmd")
+
+    def link(self, key, ws, name, uuid):
+        """Return the link key of a layer."""
+        if key == "md_link_csw_wms":
+            return self.csw_wms
+        elif key == "md_link_csw_wfs":
+            return self.csw_wfs
+        elif key == "srv_link_html":
+            return self.srv_link_html(uuid)
+        elif key == "srv_link_xml":
+            return self.srv_link_xml(uuid)
+        else:
+            return self.templates[key].format(ws=ws, name=name)
+
+    def srv_link_html(self, uuid):
+        """Link to the metadata on the portal. Empty without UUID."""
+        if not uuid:
+            return ""
+        return self.templates.get("srv_link_html").format(uuid=uuid)
+
+    def srv_link_xml(self, uuid):
+        """Link to the ISO 19139 metadata via the Isogeo CSW. Empty without
+        UUID."""
+        if not uuid:
+            return ""
+        uuid_formatted = self.hyphenated.get(uuid) or hyphenate(uuid)
+        return self.xml[0] + uuid_formatted + self.xml[1]
+
+
+class LayerRecord(object):
+    """GeoServer layer read-only record, usable as the former layer dict:
+    rec.get("title"), rec["md_link_oc_wms"], dict(rec)...
+
+    Only the layer attributes are stored, links are computed on access.
+    """
+    __slots__ = ("name", "title", "workspace", "store_name", "store_type",
+                 "lyr_type", "md_id_matching", "templates")
+
+    STORED = ("title", "workspace", "store_name", "store_type", "lyr_type")
+    LINKS = ("md_link_dl", "md_link_mapfish", "md_link_mapfish_wms",
+             "md_link_mapfish_wfs", "md_link_mapfish_wcs", "md_link_oc_wms",
+             "md_link_oc_wfs", "md_link_oc_wcs", "md_link_csw_wms",
+             "md_link_csw_wfs", "gs_link_edit", "srv_link_html", "srv_link_xml")
+    KEYS = STORED + LINKS + ("md_id_matching", )
+    _KEYS_SET = frozenset(KEYS)
+    _LINKS_SET = frozenset(LINKS)
+
+    def __init__(self, templates, name, title, workspace, store_name,
+                 store_type, lyr_type, md_id_matching=""):
+        self.templates = templates
+        self.name = name
+        self.title = title
+        self.workspace = intern_name(workspace)
+        self.store_name = intern_name(store_name)
+        self.store_type = intern_name(store_type)
+        self.lyr_type = lyr_type
+        self.md_id_matching = md_id_matching or ""
+
+    def __getitem__(self, key):
+        if key in self._LINKS_SET:
+            return self.templates.link(key,
+                                        self.workspace,
+                                        self.name,
+                                        self.md_id_matching)
+        elif key in self._KEYS_SET:
+            return getattr(self, key)
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self._KEYS_SET
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def keys(self):
+        return list(self.KEYS)
+
+    def values(self):
+        return [self[key] for key in self.KEYS]
+
+    def items(self):
+        return [(key, self[key]) for key in self.KEYS]
+
+    def __repr__(self):
+        return "LayerRecord({}:{})".format(self.workspace, self.name)
@@ -0,0 +1,192 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Log setup
+# Purpose:      Hand log records over to a background thread writing the
+#               log file and the console, as text or JSON lines
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import atexit
+import json
+import logging
+import os
+import threading
+from logging.handlers import RotatingFileHandler
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+# Python 3 backported
+from collections import OrderedDict
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+LOG_FORMAT = "%(asctime)s || %(levelname)s || %(module)s || %(message)s"
+CONSOLE_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+
+# attributes of every record: the others come from extra=
+RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+# listener of the current setup, see setup_logging
+_listener = None
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object by record: time, level, module, message, the fields
+    given with extra= and the exception, if any."""
+
+    def format(self, record):
+        entry = OrderedDict([("time", self.formatTime(record, "%Y-%m-%dT%H:%M:%S")),
+                             ("level", record.levelname),
+                             ("module", record.module),
+                             ("message", record.getMessage())])
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class QueueHandler(logging.Handler):
+    """Put records into a queue: the calling thread neither formats nor
+    writes them (see QueueListener).
+
+    Messages are formatted by the listener thread, so their arguments must
+    not change once logged: strings and numbers, as in this package. In a
+    forked process (sync_mode = process), which has no listener thread,
+    records are passed to the handlers directly.
+
+    queue = queue read by the QueueListener
+    handlers = handlers of the QueueListener
+    """
+
+    def __init__(self, queue, handlers=()):
+        logging.Handler.__init__(self)
+        self.queue = queue
+        self.handlers = handlers
+        self.pid = os.getpid()
+        self._forked = None
+
+    def emit(self, record):
+        if os.getpid() != self.pid:
+            # locks may have been copied held by another thread at fork
+            if self._forked != os.getpid():
+                self._forked = os.getpid()
+                for handler in self.handlers:
+                    handler.createLock()
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            return
+        try:
+            # tracebacks hold the frames: rendered now
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self.queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+
+class QueueListener(object):
+    """Thread passing the records of a queue to handlers, each one with
+    its own level and formatter."""
+
+    def __init__(self, queue, handlers):
+        super(QueueListener, self).__init__()
+        self.queue = queue
+        self.handlers = handlers
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._monitor,
+                                        name="log-listener")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Write the records still queued, then close the handlers."""
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+    def _monitor(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def setup_logging(log_path="LOG_i2gs.log", level="INFO", json_lines=False,
+                  max_bytes=5000000, backup_count=1, console=True):
+    """Send the records of every logger through a queue to a background
+    thread writing the log file and the console. Return the QueueListener,
+    stopped (queue flushed) at exit or by a next setup.
+
+    log_path = rotating log file (none if empty)
+    level = name of the minimum level: DEBUG shows a line per layer
+    json_lines = if True, the log file is written as JSON lines
+    max_bytes = size of the log file triggering a rotation
+    backup_count = number of rotated files kept
+    console = if True, records are printed on stderr too
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener:
+        _listener.stop()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+
+    handlers = []
+    if log_path:
+        logfile = RotatingFileHandler(log_path, "a", int(max_bytes), int(backup_count))
+        logfile.setFormatter(JsonFormatter() if json_lines else logging.Formatter(LOG_FORMAT))
+        handlers.append(logfile)
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(stream)
+
+    queue = Queue()
+    _listener = QueueListener(queue, handlers)
+    _listener.start()
+    atexit.register(_listener.stop)
+    root.addHandler(QueueHandler(queue, handlers))
+    root.setLevel(getattr(logging, "{}".format(level).upper(), logging.INFO))
+    logging.captureWarnings(True)
+    return _listener
@@ -0,0 +1,290 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Matching table
+# Purpose:      Load the GeoServer layers <=> Isogeo metadata matching file
+#               (XLSX or CSV) into an index cached on disk
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import csv
+import hashlib
+import io
+import json
+import logging
+import re
+import sys
+from os import makedirs, path
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+PY2 = sys.version_info[0] == 2
+
+# columns of the matching file (see README)
+COL_WORKSPACE = 0
+COL_NAME = 4
+COL_UUID = 6
+
+# bump when the cache content changes
+CACHE_VERSION = 2
+
+# normalized UUID version 4 (see normalize_uuid)
+UUID4_HEX = re.compile(r"^[0-9a-f]{12}4[0-9a-f]{3}[89ab][0-9a-f]{15}$")
+
+# rows named in the validation summary, by problem
+SUMMARY_SAMPLE = 5
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class MatchingTable(dict):
+    """GeoServer layer name => valid Isogeo UUID (32 lowercase hex chars)
+    or None, plus the same for "workspace:layer" keys.
+
+    UUIDs are checked once here: invalid ones are stored as None, so that
+    readers only have to look layers up. The hyphenated form of each valid
+    UUID is kept too, for the CSW links.
+
+    rows = list of (workspace, layer name, UUID) as read from the file
+    validated = content of the table built from the same rows (see
+                validated), which are then neither checked nor indexed
+    """
+
+    def __init__(self, rows, validated=None):
+        super(MatchingTable, self).__init__()
+        self.rows = rows
+        if validated:
+            self.update(validated.get("index"))
+            self.hyphenated = validated.get("hyphenated")
+            self.invalid = validated.get("invalid")
+            self.duplicates = validated.get("duplicates")
+            return
+        self.hyphenated = {}
+        self.invalid = []
+        self.duplicates = []
+        seen = set()
+        for workspace, name, uuid in rows:
+            if uuid and uuid not in self.hyphenated:
+                if is_uuid_hex(uuid):
+                    self.hyphenated[uuid] = hyphenate(uuid)
+                else:
+                    self.invalid.append(name)
+                    uuid = None
+            key = "{}:{}".format(workspace, name) if workspace else name
+            if key in seen:
+                self.duplicates.append(key)
+            else:
+                seen.add(key)
+            self[name] = uuid
+            if workspace:
+                self[key] = uuid
+
+    def validated(self):
+        """Serializable content of the table, rows checked and indexed."""
+        return {"index": dict(self),
+                "hyphenated": self.hyphenated,
+                "invalid": self.invalid,
+                "duplicates": self.duplicates}
+
+    def lookup(self, name, workspace=None):
+        """UUID of a layer, the workspace-qualified row first."""
+        if workspace:
+            qualified = "{}:{}".format(workspace, name)
+            if qualified in self:
+                return self.get(qualified)
+        return self.get(name)
+
+    def orphans(self, layers):
+        """Rows matching none of the GeoServer layers, given as (workspace,
+        name): a row with a workspace only matches the layer of this
+        workspace, a row without matches the name in any workspace."""
+        layers = list(layers)
+        names = set(name for workspace, name in layers)
+        qualified = set("{}:{}".format(workspace, name) for workspace, name in layers)
+        return [(workspace, name, uuid) for workspace, name, uuid in self.rows
+                if ("{}:{}".format(workspace, name) not in qualified if workspace
+                    else name not in names)]
+
+    def summary(self, layers=None):
+        """Log the problems of the table in one line and return their
+        counts: invalid UUIDs, rows repeated and, if the GeoServer layers
+        are given as (workspace, name), orphan rows (see orphans)."""
+        dict_problems = {"invalid": self.invalid, "duplicate": self.duplicates}
+        if layers is not None:
+            dict_problems["orphan"] = ["{}:{}".format(workspace, name) if workspace else name
+                                       for workspace, name, uuid in self.orphans(layers)]
+        counts = {problem: len(names) for problem, names in dict_problems.items()}
+        if any(counts.values()):
+            logging.warning("Matching - {} rows, {}".format(
+                len(self.rows),
+                ", ".join("{} {} ({}{})".format(len(names), problem,
+                                                ", ".join(names[:SUMMARY_SAMPLE]),
+                                                "..." if len(names) > SUMMARY_SAMPLE else "")
+                          for problem, names in sorted(dict_problems.items())
+                          if names)))
+        else:
+            logging.info("Matching - {} rows, all valid".format(len(self.rows)))
+        return counts
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def is_uuid_hex(value):
+    """True if value is a normalized UUID version 4, see normalize_uuid.
+    Same result as Utils.is_uuid, without building an UUID."""
+    return bool(value) and UUID4_HEX.match(value) is not None
+
+
+def hyphenate(uuid):
+    """8-4-4-4-12 form of a normalized UUID."""
+    return "{}-{}-{}-{}-{}".format(uuid[:8], uuid[8:12], uuid[12:16],
+                                   uuid[16:20], uuid[20:])
+
+
+def normalize_uuid(value):
+    """Lowercase hex string without hyphens, braces nor spaces. None stays
+    None. Validity is checked later."""
+    if value is None:
+        return None
+    value = "{}".format(value).strip().lower()
+    return value.replace("-", "").strip("{}") or None
+
+
+def load_matching(in_path, cache_dir=None):
+    """Return the MatchingTable of a matching file (.xlsx or .csv).
+
+    If cache_dir is set, the validated table is cached there and reused as
+    long as the file has the same size and modification date or, failing
+    that, the same content hash.
+    """
+    in_path = path.normpath(in_path)
+    stat = path.getsize(in_path), path.getmtime(in_path)
+    cache_path = digest = None
+    if cache_dir:
+        key = hashlib.sha1(path.abspath(in_path).encode("utf-8")).hexdigest()
+        cache_path = path.join(cache_dir, "matching_{}.json".format(key))
+        cached = _read_cache(cache_path)
+        if cached and [cached.get("size"), cached.get("mtime")] == list(stat):
+            logging.info("Matching - loaded from cache: {}".format(cache_path))
+            return _cached_table(cached)
+
+        digest = _file_hash(in_path)
+        if cached and cached.get("sha1") == digest:
+            logging.info("Matching - file touched but unchanged, cache reused")
+            table = _cached_table(cached)
+            _write_cache(cache_path, stat, digest, table)
+            return table
+
+    if in_path.lower().endswith(".csv"):
+        rows = list(_read_csv(in_path))
+    else:
+        rows = list(_read_xlsx(in_path))
+    logging.info("Matching - {} rows read from {}".format(len(rows), in_path))
+
+    table = MatchingTable(rows)
+    if cache_path:
+        _write_cache(cache_path, stat, digest, table)
+    return table
+
+
+def _read_xlsx(in_path):
+    """Yield (workspace, name, uuid) from the first sheet of a workbook."""
+    from openpyxl import load_workbook
+    wb = load_workbook(filename=in_path,
+                       read_only=True,
+                       data_only=True)
+    ws = wb.worksheets[0]  # first sheet
+    for row in ws.iter_rows(min_row=2):
+        values = [cell.value for cell in row]
+        if len(values) > COL_UUID and values[COL_NAME] is not None:
+            yield (values[COL_WORKSPACE],
+                   values[COL_NAME],
+                   normalize_uuid(values[COL_UUID]))
+
+
+def _read_csv(in_path):
+    """Yield (workspace, name, uuid) from a CSV file with a header line,
+    delimited by semicolons or commas."""
+    with io.open(in_path, "rb") as in_csv:
+        raw = in_csv.read()
+    text = raw.decode("utf-8-sig")
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=str(";,\t"))
+    except csv.Error:
+        dialect = csv.excel
+    if PY2:
+        lines = (line.encode("utf-8") for line in text.splitlines())
+    else:
+        lines = text.splitlines()
+
+    reader = csv.reader(lines, dialect)
+    next(reader, None)  # headers
+    for values in reader:
+        if PY2:
+            values = [v.decode("utf-8") for v in values]
+        values = [v.strip() or None for v in values]
+        if len(values) > COL_UUID and values[COL_NAME] is not None:
+            yield (values[COL_WORKSPACE],
+                   values[COL_NAME],
+                   normalize_uuid(values[COL_UUID]))
+
+
+def _file_hash(in_path):
+    """SHA1 of a file content."""
+    sha1 = hashlib.sha1()
+    with io.open(in_path, "rb") as in_file:
+        for chunk in iter(lambda: in_file.read(1024 * 1024), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _read_cache(cache_path):
+    """Return the cache content or None if missing, outdated or corrupted."""
+    if not path.isfile(cache_path):
+        return None
+    try:
+        with io.open(cache_path, "r", encoding="utf-8") as in_json:
+            cached = json.load(in_json)
+    except ValueError:
+        logging.warning("Matching - corrupted cache ignored: {}".format(cache_path))
+        return None
+    if cached.get("version") != CACHE_VERSION:
+        return None
+    return cached
+
+
+def _cached_table(cached):
+    """MatchingTable stored in a cache, see _write_cache."""
+    return MatchingTable([tuple(row) for row in cached.get("rows")],
+                         validated=cached.get("table"))
+
+
+def _write_cache(cache_path, stat, digest, table):
+    """Store the rows and the validated table with the file signature."""
+    if not path.isdir(path.dirname(cache_path)):
+        makedirs(path.dirname(cache_path))
+    cached = {"version": CACHE_VERSION,
+              "size": stat[0],
+              "mtime": stat[1],
+              "sha1": digest,
+              "rows": table.rows,
+              "table": table.validated()}
+    with io.open(cache_path, "wb") as out_json:
+        out_json.write(json.dumps(cached).encode("utf-8"))
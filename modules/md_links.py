@@ -0,0 +1,268 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Metadata links writer
+# Purpose:      Set Isogeo metadata links on GeoServer resources, only
+#               when they differ from the ones already stored, inline or
+#               through a rate-limited write queue
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+import logging
+import threading
+import time
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+# Python 3 backported
+from collections import OrderedDict
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class MetadataLinksWriter(object):
+    """Compare the expected metadata links of GeoServer resources with the
+    existing ones and PUT only those which differ.
+
+    With write_workers, saves are queued and applied in background threads
+    while the reading goes on. Updates of a resource still waiting in the
+    queue are coalesced: only the last one is written.
+
+    cat = GeoServer Catalog used to fetch and save resources
+    dry_run = if True, nothing is written: only the change plan is built
+    write_workers = threads saving resources. If 0: saved inline
+    write_rate = maximum of saves by second (0 = unlimited)
+    connect = function returning a new Catalog, one by write thread since
+              the GeoServer client is not thread-safe (default: cat)
+    on_done = function called with the resource name and the status of
+              each update once it is over, queued saves included
+    """
+    WRITTEN = "written"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+    PLANNED = "planned"
+    # returned by update() until the write thread saves the resource
+    QUEUED = "queued"
+
+    def __init__(self, cat, dry_run=False, write_workers=0, write_rate=0,
+                 connect=None, on_done=None):
+        super(MetadataLinksWriter, self).__init__()
+        self.cat = cat
+        self.dry_run = dry_run
+        self.plan = []
+        self.counts = OrderedDict([(self.WRITTEN, 0),
+                                   (self.SKIPPED, 0),
+                                   (self.FAILED, 0),
+                                   (self.PLANNED, 0)])
+        # resource name => last status
+        self.outcomes = OrderedDict()
+        self.coalesced = 0
+        # time spent saving, summed over the write threads
+        self.write_seconds = 0
+        self.on_done = on_done
+        self._lock = threading.Lock()
+
+        # -- WRITE QUEUE ------------------------------------------------------
+        self.connect = connect
+        self.limiter = RateLimiter(write_rate)
+        self._queue = Queue()
+        self._pending = {}
+        self._workers = [threading.Thread(target=self._write_worker,
+                                          name="md-links-writer-{}".format(i))
+                         for i in range(0 if dry_run else int(write_workers))]
+        for worker in self._workers:
+            worker.daemon = True
+            worker.start()
+
+    @staticmethod
+    def expected_links(srv_link_html, srv_link_xml):
+        """Return the metadata links list expected on a GeoServer resource."""
+        return [('text/html', 'ISO19115:2003', srv_link_html),
+                ('text/xml', 'ISO19115:2003', srv_link_xml),
+                ('text/html', 'TC211', srv_link_html),
+                ('text/xml', 'TC211', srv_link_xml)]
+
+    @staticmethod
+    def normalize(links):
+        """Make links comparable whatever the GeoServer client returned."""
+        return [tuple(link) for link in links or []]
+
+    def update(self, lyr_name, store_name, links, resource=None):
+        """Set links on the resource if they are not already the same.
+
+        lyr_name = name of the GeoServer layer/resource
+        store_name = name of the store containing the resource
+        links = expected metadata links (see expected_links)
+        resource = resource already fetched, to spare a REST call
+        """
+        try:
+            if resource is None:
+                resource = self.cat.get_resource(lyr_name, store=store_name)
+            current = self.normalize(resource.metadata_links)
+        except Exception as e:
+            logging.error("Metadata links - reading {} failed: {}"
+                          .format(lyr_name, e))
+            return self._track(lyr_name, store_name, None, links, self.FAILED)
+
+        if current == self.normalize(links):
+            return self._track(lyr_name, store_name, current, links, self.SKIPPED)
+        if self.dry_run:
+            return self._track(lyr_name, store_name, current, links, self.PLANNED)
+        if self._workers:
+            return self._enqueue(lyr_name, store_name, current, links, resource)
+
+        return self._save(self.cat, lyr_name, store_name, current, links, resource)
+
+    def close(self):
+        """Wait for the queued saves, then stop the write threads."""
+        if not self._workers:
+            return
+        self._queue.join()
+        for worker in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def summary(self):
+        """Log and return the counts by status, then each failed resource."""
+        logging.info("Metadata links - {}".format(
+                     " | ".join("{}: {}".format(k, v)
+                                for k, v in self.counts.items())))
+        if self.coalesced:
+            logging.info("Metadata links - {} updates coalesced"
+                         .format(self.coalesced))
+        for lyr_name, status in self.outcomes.items():
+            if status == self.FAILED:
+                logging.warning("Metadata links - not set on {}".format(lyr_name))
+        return self.counts
+
+    def save_plan(self, dest_path):
+        """Store the changes (planned, written or failed) into a JSON file."""
+        return save_plan(self.plan, dest_path)
+
+    def _save(self, cat, lyr_name, store_name, current, links, resource):
+        """PUT the links on the resource and return the status."""
+        start = time.time()
+        try:
+            resource.metadata_links = links
+            cat.save(resource)
+        except Exception as e:
+            logging.error("Metadata links - saving {} failed: {}"
+                          .format(lyr_name, e))
+            return self._track(lyr_name, store_name, current, links, self.FAILED)
+        finally:
+            with self._lock:
+                self.write_seconds += time.time() - start
+
+        return self._track(lyr_name, store_name, current, links, self.WRITTEN)
+
+    def _enqueue(self, lyr_name, store_name, current, links, resource):
+        """Queue a save, replacing the one of the same resource not yet
+        taken by a write thread."""
+        key = getattr(resource, "href", None) or "{}:{}".format(store_name,
+                                                                lyr_name)
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+                logging.debug("Metadata links - coalesced: %s", lyr_name)
+            else:
+                self._queue.put(key)
+            self._pending[key] = (lyr_name, store_name, current, links, resource)
+        return self.QUEUED
+
+    def _write_worker(self):
+        """Save queued resources until a None key is received."""
+        cat = None
+        while True:
+            key = self._queue.get()
+            try:
+                if key is None:
+                    return
+                with self._lock:
+                    lyr_name, store_name, current, links, resource = self._pending.pop(key)
+                try:
+                    if cat is None:
+                        cat = self.connect() if self.connect else self.cat
+                    resource.catalog = cat
+                    self.limiter.wait()
+                except Exception as e:
+                    # the next items are still taken, or close() would wait forever
+                    logging.error("Metadata links - saving {} failed: {}"
+                                  .format(lyr_name, e))
+                    self._track(lyr_name, store_name, current, links, self.FAILED)
+                    continue
+                self._save(cat, lyr_name, store_name, current, links, resource)
+            finally:
+                self._queue.task_done()
+
+    def _track(self, lyr_name, store_name, current, links, status):
+        """Store the outcome of an update and return its status."""
+        with self._lock:
+            self.counts[status] += 1
+            self.outcomes[lyr_name] = status
+            if status != self.SKIPPED:
+                self.plan.append({"layer": lyr_name,
+                                  "store": store_name,
+                                  "status": status,
+                                  "current": current,
+                                  "expected": self.normalize(links)})
+        if self.on_done:
+            self.on_done(lyr_name, status)
+        if status != self.SKIPPED:
+            logging.debug("Metadata links - %s: %s (%s)", status, lyr_name, store_name)
+        return status
+
+
+class RateLimiter(object):
+    """Space out calls to wait() so that at most rate of them return by
+    second, whatever the number of threads calling it.
+
+    rate = maximum of calls by second (0 = unlimited)
+    """
+
+    def __init__(self, rate=0):
+        super(RateLimiter, self).__init__()
+        self.interval = 1.0 / float(rate) if rate else 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def save_plan(plan, dest_path):
+    """Store a list of metadata links changes into a JSON file."""
+    with io.open(dest_path, "wb") as out_json:
+        out_json.write(json.dumps(plan, indent=2).encode("utf-8"))
+    return dest_path
@@ -0,0 +1,334 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Run metrics
+# Purpose:      Time the phases of a run, measure HTTP requests by endpoint
+#               family and report them as JSON or Prometheus textfile
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+# Python 3 backported
+from collections import OrderedDict
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# GeoServer REST collections, kept in endpoint families: other path
+# segments are names (workspaces, stores, layers...)
+REST_COLLECTIONS = frozenset(["about", "coverages", "coveragestores",
+                              "datastores", "featuretypes", "layergroups",
+                              "layers", "namespaces", "reload", "reset",
+                              "services", "settings", "styles", "version",
+                              "wmslayers", "wmsstores", "workspaces"])
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class HttpStats(object):
+    """Requests count, errors, bytes and latencies by endpoint family.
+    Plain data, so the stats of other threads or processes can be merged."""
+
+    def __init__(self):
+        super(HttpStats, self).__init__()
+        self.families = {}
+        self._lock = threading.Lock()
+
+    def record(self, family, seconds, nbytes=0, status=200):
+        with self._lock:
+            stats = self.families.setdefault(family, {"count": 0,
+                                                      "errors": 0,
+                                                      "bytes": 0,
+                                                      "latencies": []})
+            stats["count"] += 1
+            stats["bytes"] += nbytes or 0
+            stats["latencies"].append(seconds)
+            if not status or status >= 400:
+                stats["errors"] += 1
+
+    def merge(self, families):
+        """Add the families of another HttpStats (see as_dict)."""
+        with self._lock:
+            for family, other in families.items():
+                stats = self.families.setdefault(family, {"count": 0,
+                                                          "errors": 0,
+                                                          "bytes": 0,
+                                                          "latencies": []})
+                for key in ("count", "errors", "bytes"):
+                    stats[key] += other.get(key)
+                stats["latencies"].extend(other.get("latencies"))
+
+    def as_dict(self):
+        with self._lock:
+            return dict((family, dict(stats, latencies=list(stats["latencies"])))
+                        for family, stats in self.families.items())
+
+    def summary(self):
+        """Count, errors, bytes and latency percentiles by family."""
+        summary = OrderedDict()
+        for family, stats in sorted(self.as_dict().items()):
+            latencies = sorted(stats.get("latencies"))
+            summary[family] = OrderedDict([
+                ("count", stats.get("count")),
+                ("errors", stats.get("errors")),
+                ("bytes", stats.get("bytes")),
+                ("seconds", round(sum(latencies), 3))])
+            for q in QUANTILES:
+                summary[family]["p{:g}".format(q * 100)] = round(percentile(latencies, q), 4)
+        return summary
+
+
+class InstrumentedHttp(object):
+    """Wrap an httplib2.Http-like client (the `http` attribute of a gsconfig
+    Catalog) to record each request into HttpStats.
+
+    http = client to wrap
+    stats = HttpStats to fill
+    """
+
+    def __init__(self, http, stats):
+        super(InstrumentedHttp, self).__init__()
+        self.http = http
+        self.stats = stats
+
+    def __getattr__(self, name):
+        """Everything else (credentials, cache stats...) is delegated."""
+        if name == "http":
+            raise AttributeError(name)
+        return getattr(self.http, name)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        """Same signature and return as httplib2.Http.request."""
+        start = time.time()
+        status = None
+        content = b""
+        try:
+            response, content = self.http.request(uri, method, body, headers, **kwargs)
+            status = response.status
+            return response, content
+        finally:
+            self.stats.record(endpoint_family(uri, method),
+                              time.time() - start,
+                              len(content or b"") + len(body or b""),
+                              status)
+
+
+class RunMetrics(object):
+    """Wall and CPU time of the phases of a run, HTTP stats and peak memory.
+
+    name = name of the run, used as Prometheus job label
+    """
+
+    def __init__(self, name="isogeo2geoserver"):
+        super(RunMetrics, self).__init__()
+        self.name = name
+        self.started = time.time()
+        self.phases = OrderedDict()
+        self.http = HttpStats()
+        self.counters = OrderedDict()
+        # stages of a run may record at the same time (see Stages)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Time the block as phase name. Repeated phases are summed. CPU
+        time is the one of the whole process: phases run at the same time
+        count the CPU of each other."""
+        wall, cpu = time.time(), cpu_time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.time() - wall, cpu_time() - cpu)
+
+    def add_phase(self, name, wall, cpu=0):
+        with self._lock:
+            phase = self.phases.setdefault(name, {"wall": 0, "cpu": 0, "count": 0})
+            phase["wall"] += wall
+            phase["cpu"] += cpu
+            phase["count"] += 1
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def wrap_call(self, func, family):
+        """Return func recording each of its calls as a request of family:
+        for clients whose HTTP layer can not be wrapped (Isogeo SDK)."""
+        def wrapped(*args, **kwargs):
+            start = time.time()
+            status = None
+            try:
+                result = func(*args, **kwargs)
+                status = 200
+                return result
+            finally:
+                self.http.record(family, time.time() - start, 0, status)
+        return wrapped
+
+    def report(self):
+        """Run report, ready to be dumped as JSON."""
+        with self._lock:
+            phases = OrderedDict((name, OrderedDict([("wall", round(p["wall"], 3)),
+                                                     ("cpu", round(p["cpu"], 3)),
+                                                     ("count", p["count"])]))
+                                 for name, p in self.phases.items())
+            counters = OrderedDict(self.counters)
+        return OrderedDict([
+            ("name", self.name),
+            ("started", datetime.fromtimestamp(self.started).isoformat()),
+            ("wall", round(time.time() - self.started, 3)),
+            ("cpu", round(cpu_time(), 3)),
+            ("peak_memory", peak_memory()),
+            ("phases", phases),
+            ("counters", counters),
+            ("http", self.http.summary())])
+
+    def save_json(self, dest_path):
+        """Store the run report into a JSON file."""
+        with io.open(dest_path, "wb") as out_json:
+            out_json.write(json.dumps(self.report(), indent=2).encode("utf-8"))
+        return dest_path
+
+    def save_prometheus(self, dest_path):
+        """Store the run report for the node_exporter textfile collector.
+        The file is replaced at once, never read half-written."""
+        report = self.report()
+        job = prom_label(self.name)
+        lines = ["# TYPE i2gs_run_timestamp_seconds gauge",
+                 'i2gs_run_timestamp_seconds{{job="{}"}} {}'.format(job, self.started),
+                 "# TYPE i2gs_run_wall_seconds gauge",
+                 'i2gs_run_wall_seconds{{job="{}"}} {}'.format(job, report["wall"]),
+                 "# TYPE i2gs_run_cpu_seconds gauge",
+                 'i2gs_run_cpu_seconds{{job="{}"}} {}'.format(job, report["cpu"])]
+        if report["peak_memory"] is not None:
+            lines += ["# TYPE i2gs_peak_memory_bytes gauge",
+                      'i2gs_peak_memory_bytes{{job="{}"}} {}'.format(job, report["peak_memory"])]
+
+        for metric, key in (("i2gs_phase_wall_seconds", "wall"),
+                            ("i2gs_phase_cpu_seconds", "cpu")):
+            lines.append("# TYPE {} gauge".format(metric))
+            for name, phase in report["phases"].items():
+                lines.append('{}{{job="{}",phase="{}"}} {}'
+                             .format(metric, job, prom_label(name), phase[key]))
+
+        lines.append("# TYPE i2gs_counter gauge")
+        for name, value in report["counters"].items():
+            lines.append('i2gs_counter{{job="{}",name="{}"}} {}'
+                         .format(job, prom_label(name), value))
+
+        for metric, key in (("i2gs_http_requests", "count"),
+                            ("i2gs_http_errors", "errors"),
+                            ("i2gs_http_bytes", "bytes")):
+            lines.append("# TYPE {} gauge".format(metric))
+            for family, stats in report["http"].items():
+                lines.append('{}{{job="{}",family="{}"}} {}'
+                             .format(metric, job, prom_label(family), stats[key]))
+        lines.append("# TYPE i2gs_http_latency_seconds gauge")
+        for family, stats in report["http"].items():
+            for q in QUANTILES:
+                lines.append('i2gs_http_latency_seconds{{job="{}",family="{}",quantile="{}"}} {}'
+                             .format(job, prom_label(family), q,
+                                     stats["p{:g}".format(q * 100)]))
+
+        tmp_path = dest_path + ".tmp"
+        with io.open(tmp_path, "wb") as out_prom:
+            out_prom.write("\n".join(lines + [""]).encode("utf-8"))
+        if os.name == "nt" and os.path.exists(dest_path):
+            os.remove(dest_path)
+        os.rename(tmp_path, dest_path)
+        return dest_path
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+@contextmanager
+def timed_phase(metrics, name):
+    """metrics.phase(name), doing nothing if metrics is None."""
+    if metrics is None:
+        yield
+    else:
+        with metrics.phase(name):
+            yield
+
+
+def endpoint_family(uri, method="GET"):
+    """Method and path of a request, names replaced by *:
+    GET /rest/workspaces/*/datastores/*/featuretypes/*"""
+    url = urlparse(uri)
+    segments = url.path.split("/")
+    if "rest" in segments:
+        rest = segments.index("rest")
+        family = [re.sub(r"\.(xml|json|html)$", "", segment)
+                  for segment in segments[rest + 1:]]
+        family = "/rest/" + "/".join(segment if segment in REST_COLLECTIONS else "*"
+                                     for segment in family)
+    else:
+        family = "{}/{}".format(url.netloc, segments[1] if len(segments) > 1 else "")
+    return "{} {}".format(method, family)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list, 0 if empty."""
+    if not sorted_values:
+        return 0
+    # smallest value with at least q of the values lower or equal
+    rank = max(int(math.ceil(q * len(sorted_values))), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def cpu_time():
+    """User + system CPU seconds of the process, every thread included."""
+    times = os.times()
+    return times[0] + times[1]
+
+
+def peak_memory():
+    """Peak resident memory of the process in bytes, None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def prom_label(value):
+    """Escape a Prometheus label value."""
+    return "{}".format(value).replace("\\", "\\\\").replace('"', '\\"')
@@ -0,0 +1,117 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Reconciliation
+# Purpose:      Cross the GeoServer layers, the matching table and the
+#               Isogeo metadata to list what is linked and what is not
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import logging
+
+# Python 3 backported
+from collections import OrderedDict
+
+# submodules
+from .exporter import field
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# status of a reconciliation row => meaning
+STATUSES = OrderedDict([
+    ("linked", "layer matched to a metadata of the share"),
+    ("md_not_found", "layer matched to a UUID missing from the share"),
+    ("row_without_uuid", "layer whose matching row has no valid UUID"),
+    ("layer_without_row", "layer missing from the matching table"),
+    ("orphan_row", "matching row of no GeoServer layer"),
+    ("md_without_layer", "metadata of the share matched to no layer"),
+])
+
+# output suffix => sheets as (records source, sheet title, columns)
+RECONCILE_SPEC = OrderedDict([
+    ("reconciliation", (
+        ("reconciliation", "RECONCILIATION", (
+            ("STATUT", field("status")),
+            ("GEOSERVER", field("geoserver", "")),
+            ("GS_WORKSPACE", field("workspace", "")),
+            ("GS_NOM", field("name", "")),
+            ("MD_UUID", field("md_uuid", "")),
+            ("ISOGEO_TITRE", field("md_title", "")))),
+    )),
+])
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def reconcile(li_gs_results, matching, search_results, orphans=True):
+    """Yield a reconciliation record (see RECONCILE_SPEC) by GeoServer
+    layer, then by orphan matching row and by metadata linked to no layer.
+
+    Each side is indexed once in a set or a dictionary, so the whole is
+    linear in the number of layers, rows and metadata.
+
+    li_gs_results = results of the GeoServer instances, with their "read"
+                    layers as (workspace, name, UUID) tuples
+    matching = MatchingTable
+    search_results = metadata of the Isogeo share
+    orphans = if False, matching rows are not checked against the layers
+              (some layers were not read)
+    """
+    dict_md = dict((md.get("_id"), md) for md in search_results)
+    layers = []
+    referenced = set()
+
+    for gs_result in li_gs_results:
+        for workspace, name, md_uuid in gs_result.get("read", []):
+            key = "{}:{}".format(workspace, name)
+            layers.append((workspace, name))
+            md = {}
+            if md_uuid:
+                referenced.add(md_uuid)
+                md = dict_md.get(md_uuid, {})
+                status = "linked" if md else "md_not_found"
+            elif key in matching or name in matching:
+                status = "row_without_uuid"
+            else:
+                status = "layer_without_row"
+            yield {"status": status,
+                   "geoserver": gs_result.get("name"),
+                   "workspace": workspace,
+                   "name": name,
+                   "md_uuid": md_uuid,
+                   "md_title": md.get("title")}
+
+    if orphans:
+        for workspace, name, md_uuid in matching.orphans(layers):
+            yield {"status": "orphan_row",
+                   "workspace": workspace,
+                   "name": name,
+                   "md_uuid": md_uuid}
+
+    for md in search_results:
+        if md.get("_id") not in referenced:
+            yield {"status": "md_without_layer",
+                   "md_uuid": md.get("_id"),
+                   "md_title": md.get("title")}
+
+
+def log_counts(counts):
+    """Log the number of records by status, in STATUSES order."""
+    logging.info("Reconciliation - {}".format(
+        ", ".join("{} {}".format(counts.get(status, 0), status)
+                  for status in STATUSES)))
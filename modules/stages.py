@@ -0,0 +1,124 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Stages
+# Purpose:      Run the stages of a sync concurrently, each one as soon as
+#               the stages it needs are over
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import logging
+import sys
+import threading
+import time
+
+# Python 3 backported
+from collections import OrderedDict
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class StageError(Exception):
+    """A stage was not run because a stage it needs failed."""
+
+
+class Stages(object):
+    """Stages of a run, each one in its own thread, waiting only for the
+    stages it needs: independent stages overlap, so the run lasts as long
+    as its longest chain of stages instead of the sum of all of them.
+
+        stages = Stages(concurrent=True)
+        stages.add("geoserver", read)
+        stages.add("isogeo", search)
+        stages.add("export", export, needs=("geoserver", "isogeo"))
+        results = stages.run()
+
+    A stage is called with the results of the stages it needs, in order.
+
+    concurrent = if False, stages are run one after the other in the order
+                 they were added (which must respect their needs)
+    """
+
+    def __init__(self, concurrent=True):
+        super(Stages, self).__init__()
+        self.concurrent = concurrent
+        # name => (function, names of the stages needed)
+        self.stages = OrderedDict()
+        self.results = {}
+        self.errors = OrderedDict()
+        self.seconds = {}
+        self._done = {}
+
+    def add(self, name, func, needs=()):
+        for need in needs:
+            if need not in self.stages:
+                raise ValueError("Stage {} needs {}, unknown or added after it"
+                                 .format(name, need))
+        self.stages[name] = (func, tuple(needs))
+        self._done[name] = threading.Event()
+
+    def run(self):
+        """Run every stage and return their results by name. If a stage
+        failed, its error is raised once all the others are over."""
+        if self.concurrent:
+            threads = [threading.Thread(target=self._run_stage, args=(name, ),
+                                        name="stage-{}".format(name))
+                       for name in self.stages]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            for name in self.stages:
+                self._run_stage(name)
+
+        logging.info("Stages - {}".format(" | ".join("{}: {}s".format(name, self.seconds.get(name))
+                                                     for name in self.stages
+                                                     if name in self.seconds)))
+        for name, exc_info in self.errors.items():
+            if not isinstance(exc_info[1], StageError):
+                raise_error(exc_info)
+        return self.results
+
+    def _run_stage(self, name):
+        func, needs = self.stages.get(name)
+        try:
+            for need in needs:
+                self._done.get(need).wait()
+            failed = [need for need in needs if need in self.errors]
+            if failed:
+                raise StageError("{} not run: {} failed".format(name, ", ".join(failed)))
+            start = time.time()
+            self.results[name] = func(*[self.results.get(need) for need in needs])
+            self.seconds[name] = round(time.time() - start, 3)
+        except Exception:
+            self.errors[name] = sys.exc_info()
+            logging.error("Stages - {} failed: {}".format(name, sys.exc_info()[1]))
+        finally:
+            self._done.get(name).set()
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def raise_error(exc_info):
+    """Raise again an error caught in another thread, with its traceback."""
+    if sys.version_info[0] == 2:
+        exec("raise exc_info[0], exc_info[1], exc_info[2]")
+    else:
+        raise exc_info[1].with_traceback(exc_info[2])
@@ -0,0 +1,219 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Sync state
+# Purpose:      Remember what the last successful run synchronized, so the
+#               next one only processes what changed since
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+# Python 3 backported
+from collections import OrderedDict
+
+# submodules
+from .md_links import MetadataLinksWriter
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# bump when the state content changes
+STATE_VERSION = 1
+
+# sides of a run which may be read completely or incrementally
+SIDES = ("geoserver", "isogeo")
+
+# LayerRecord attributes stored by layer, name excepted
+LAYER_KEYS = ("title", "workspace", "store_name", "store_type", "lyr_type",
+              "md_id_matching")
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class SyncState(object):
+    """State of the last successful run, stored in a JSON file:
+
+    - last_run = timestamp of the last run
+    - last_full = by side (see SIDES), timestamp of its last full run
+    - metadata = Isogeo metadata records by id, with their _modified stamp
+    - geoservers = by GeoServer instance: links signature and layers
+      (title, workspace, store, store type, source type, matched UUID)
+
+    state_path = JSON file of the state. If None, it is only kept in memory
+    """
+
+    def __init__(self, state_path):
+        super(SyncState, self).__init__()
+        self.state_path = state_path
+        self.last_run = None
+        self.last_full = {}
+        self.metadata = OrderedDict()
+        self.geoservers = {}
+        # GeoServer and Isogeo stages update it at the same time
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.state_path:
+            return
+        if not os.path.isfile(self.state_path):
+            logging.info("Sync state - none yet: {}".format(self.state_path))
+            return
+        try:
+            with io.open(self.state_path, "r", encoding="utf-8") as in_json:
+                state = json.load(in_json, object_pairs_hook=OrderedDict)
+        except ValueError:
+            logging.warning("Sync state - corrupted, ignored: {}"
+                            .format(self.state_path))
+            return
+        if state.get("version") != STATE_VERSION:
+            return
+        self.last_run = state.get("last_run")
+        self.last_full = state.get("last_full") or {}
+        # written by a single full run of both sides
+        if not isinstance(self.last_full, dict):
+            self.last_full = {side: self.last_full for side in SIDES}
+        self.metadata = state.get("metadata")
+        self.geoservers = state.get("geoservers")
+
+    def save(self, full=()):
+        """Store the state as of now. Replaced at once, never half-written.
+
+        full = sides (see SIDES) this run read completely
+        """
+        with self._lock:
+            self.last_run = time.time()
+            for side in full:
+                self.last_full[side] = self.last_run
+            if not self.state_path:
+                return
+            state = OrderedDict([("version", STATE_VERSION),
+                                 ("last_run", self.last_run),
+                                 ("last_run_date", datetime.fromtimestamp(self.last_run).isoformat()),
+                                 ("last_full", self.last_full),
+                                 ("metadata", self.metadata),
+                                 ("geoservers", self.geoservers)])
+            dump = json.dumps(state).encode("utf-8")
+        tmp_path = self.state_path + ".tmp"
+        with io.open(tmp_path, "wb") as out_json:
+            out_json.write(dump)
+        if os.name == "nt" and os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        os.rename(tmp_path, self.state_path)
+        logging.info("Sync state - saved: {}".format(self.state_path))
+
+    def needs_full(self, full_every=0, sides=SIDES):
+        """True if one of the sides had no full run within full_every hours
+        (0: never forced once a full run exists)."""
+        for side in sides:
+            last_full = self.last_full.get(side)
+            if not last_full:
+                return True
+            if full_every and time.time() - last_full > full_every * 3600:
+                return True
+        return False
+
+    # -- GEOSERVER ------------------------------------------------------------
+    def known_layers(self, name, signature):
+        """Layers synchronized by the last run on a GeoServer instance, None
+        if they were synchronized with other links settings."""
+        gs_state = self.geoservers.get(name)
+        if not gs_state or gs_state.get("signature") != signature:
+            return None
+        return gs_state.get("layers")
+
+    def update_layers(self, name, signature, gs_result, merge=False,
+                      entries=None):
+        """Remember the layers of a GeoServer read, except those whose links
+        could not be written: they are processed again next time.
+
+        merge = if True, the layers read are added to the known ones (read
+                of some workspaces only) instead of replacing them
+        entries = layers read, as layer name => layer_entry, if they are not
+                  in the dico_gs of gs_result (streamed read)
+        """
+        failed = set(change.get("layer") for change in gs_result.get("plan")
+                     if change.get("status") == MetadataLinksWriter.FAILED)
+        if entries is None:
+            entries = OrderedDict((lyr_name, layer_entry(layer)) for lyr_name, layer
+                                  in gs_result.get("dico_gs").get("layers", {}).items())
+        layers = OrderedDict()
+        for lyr_name, entry in entries.items():
+            if lyr_name not in failed:
+                layers[lyr_name] = entry
+        with self._lock:
+            known = self.known_layers(name, signature)
+            if merge and known:
+                for lyr_name in failed:
+                    known.pop(lyr_name, None)
+                known.update(layers)
+                layers = known
+            self.geoservers[name] = {"signature": signature, "layers": layers}
+
+    # -- ISOGEO ---------------------------------------------------------------
+    def modified_since(self):
+        """Most recent _modified stamp of the known metadata."""
+        stamps = [md.get("_modified") for md in self.metadata.values()
+                  if md.get("_modified")]
+        return max(stamps) if stamps else None
+
+    def update_metadata(self, records):
+        """Replace the known metadata by the records of a complete search."""
+        metadata = OrderedDict((md.get("_id"), md) for md in records)
+        with self._lock:
+            self.metadata = metadata
+
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+def links_signature(url_base, csw_share):
+    """Hash of the settings links depend on: if they change, every layer
+    must be synchronized again."""
+    values = [url_base] + list(csw_share)
+    return hashlib.sha1("|".join("{}".format(v or "") for v in values)
+                        .encode("utf-8")).hexdigest()
+
+
+def layer_entry(layer):
+    """Attributes of a LayerRecord as stored in the state (see LAYER_KEYS)."""
+    return [layer.get(key) for key in LAYER_KEYS]
+
+
+def reusable_layer(known, lyr_name, dict_match_gs_md, workspace=None):
+    """Attributes (name first, see LAYER_KEYS) of a layer synchronized by
+    the last run, if its matching UUID did not change, nor its workspace
+    when the layers list gives it. Else None."""
+    entry = known.get(lyr_name)
+    if not entry:
+        return None
+    if workspace and workspace != entry[1]:
+        return None
+    workspace, md_uuid = entry[1], entry[-1]
+    current = dict_match_gs_md.lookup(lyr_name, workspace) or ""
+    if current != md_uuid:
+        return None
+    return (lyr_name, ) + tuple(entry)
@@ -0,0 +1,209 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         HTTP transport
+# Purpose:      One pooled, keep-alive HTTP session shared by the GeoServer
+#               catalogs and the Isogeo SDK, with proxy and retries
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import logging
+import sys
+import threading
+
+# 3rd party libraries
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+try:
+    from urllib import quote
+except ImportError:
+    from urllib.parse import quote
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+PY2 = sys.version_info[0] == 2
+text_type = unicode if PY2 else str  # noqa: F821
+
+# only reads are retried: a write may have been applied before the failure
+RETRY_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# one transport by options, shared by every thread of the process
+_transports = {}
+_transports_lock = threading.Lock()
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class HttpResponse(dict):
+    """httplib2-like response: lowercase headers, status and reason."""
+
+    def __init__(self, response):
+        super(HttpResponse, self).__init__((k.lower(), v)
+                                           for k, v in response.headers.items())
+        self.status = response.status_code
+        self.reason = response.reason
+        self.fromcache = False
+        self["status"] = str(response.status_code)
+
+
+class Httplib2Client(object):
+    """httplib2.Http replacement plugged on a Transport session, so gsconfig
+    catalogs send their requests through the shared connection pools.
+
+    transport = Transport to use
+    username = user for HTTP basic authentication
+    password = password for HTTP basic authentication
+    verify = False to disable the SSL certificate validation
+    """
+
+    def __init__(self, transport, username=None, password=None, verify=True):
+        super(Httplib2Client, self).__init__()
+        self.transport = transport
+        self.auth = (username, password) if username else None
+        self.verify = verify
+
+    def add_credentials(self, username, password, domain=""):
+        self.auth = (username, password)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        """Same signature and return as httplib2.Http.request."""
+        if isinstance(body, text_type):
+            body = body.encode("utf-8")
+        response = self.transport.session.request(method,
+                                                  uri,
+                                                  data=body,
+                                                  headers=headers,
+                                                  auth=self.auth,
+                                                  verify=self.verify,
+                                                  timeout=self.transport.timeout)
+        return HttpResponse(response), response.content
+
+
+class Transport(object):
+    """Shared requests session: keep-alive connections pooled by host, proxy,
+    idempotent requests retried with an exponential backoff.
+
+    proxies = dictionary of scheme => proxy URL (see proxy_settings)
+    pool_size = maximum of connections kept open by host
+    max_retries = retries of a failed read
+    backoff = backoff factor: waits are backoff * 2 ** (retry - 1) seconds
+    timeout = seconds before a request is abandoned
+    """
+
+    def __init__(self, proxies=None, pool_size=10, max_retries=3, backoff=0.5,
+                 timeout=60):
+        super(Transport, self).__init__()
+        self.proxies = proxies or {}
+        self.timeout = timeout
+
+        retry_opts = {"total": max_retries,
+                      "backoff_factor": backoff,
+                      "status_forcelist": RETRY_STATUSES,
+                      "raise_on_status": False}
+        # renamed in urllib3 1.26
+        if hasattr(Retry, "DEFAULT_ALLOWED_METHODS"):
+            retry_opts["allowed_methods"] = RETRY_METHODS
+        else:
+            retry_opts["method_whitelist"] = RETRY_METHODS
+        # pool_block: threads wait for a free connection rather than opening
+        # (and handshaking) throwaway ones above the limit
+        self.adapter = HTTPAdapter(pool_connections=pool_size,
+                                   pool_maxsize=pool_size,
+                                   pool_block=True,
+                                   max_retries=Retry(**retry_opts))
+
+        self.session = requests.Session()
+        self.mount(self.session)
+
+    def mount(self, session):
+        """Plug the pooled adapter and the proxy on a requests session."""
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        session.proxies.update(self.proxies)
+
+    def httplib2(self, username=None, password=None, verify=True):
+        """Return an httplib2-like client using this transport."""
+        return Httplib2Client(self, username, password, verify)
+
+    def configure_isogeo(self, isogeo):
+        """Apply the transport to an Isogeo SDK instance, as far as the SDK
+        allows it: the pooled adapter if it is a requests session (SDK 3+),
+        the proxy only with earlier versions."""
+        if isinstance(isogeo, requests.Session):
+            self.mount(isogeo)
+        elif self.proxies:
+            isogeo.proxies = self.proxies
+        return isogeo
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def get_transport(proxies=None, **kwargs):
+    """Return the transport of the process matching these options, created
+    on first use. Options are plain values, so they can be sent to other
+    processes which build their own transport."""
+    key = (tuple(sorted((proxies or {}).items())), tuple(sorted(kwargs.items())))
+    with _transports_lock:
+        if key not in _transports:
+            _transports[key] = Transport(proxies=proxies, **kwargs)
+        return _transports[key]
+
+
+def install_transport(cat, transport, username=None, password=None, verify=True):
+    """Send the requests of a gsconfig Catalog through a transport."""
+    cat.http = transport.httplib2(username, password, verify)
+    return cat
+
+
+def proxy_settings(proxy):
+    """Dictionary of scheme => proxy URL from the [proxy] section, None if
+    no proxy is needed."""
+    if not proxy or proxy.get("proxy_needed", "0") != "1":
+        return None
+    if proxy.get("proxy_user"):
+        credentials = "{}:{}@".format(quote(proxy.get("proxy_user"), safe=""),
+                                      quote(proxy.get("proxy_pswd", ""), safe=""))
+    else:
+        credentials = ""
+    url = "{}://{}{}:{}".format(proxy.get("proxy_prot", "http"),
+                                credentials,
+                                proxy.get("proxy_server"),
+                                proxy.get("proxy_port"))
+    logging.info("Proxy - {}:{}".format(proxy.get("proxy_server"),
+                                        proxy.get("proxy_port")))
+    return {"http": url, "https": url}
+
+
+def transport_settings(settings):
+    """Transport options from the [proxy] and [http] sections."""
+    http = settings.get("http", {})
+    return {"proxies": proxy_settings(settings.get("proxy")),
+            "pool_size": int(http.get("pool_size", 10)),
+            "max_retries": int(http.get("max_retries", 3)),
+            "backoff": float(http.get("backoff", 0.5)),
+            "timeout": float(http.get("timeout", 60))}
+
+
+def ssl_off(value):
+    """True if the gs_ssl_off setting disables the certificate validation."""
+    return "{}".format(value).strip().lower() in ("1", "true", "yes", "on")
@@ -18,8 +18,15 @@ from __future__ import (absolute_import, print_function, unicode_literals)
 # ################################
 
 # Standard library
+import logging
 from uuid import UUID
 
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+logger = logging.getLogger(__name__)
+
 # ############################################################################
 # ######### Classes #############
 # ###############################
@@ -30,8 +37,10 @@ class Utils(object):
         u"""DicoGIS specific utilities"""
         super(Utils, self).__init__()
 
+    @staticmethod
     def tunning_worksheets(li_worksheets):
         """CLEAN UP & TUNNING worksheets list."""
+        from openpyxl.utils import get_column_letter
         for sheet in li_worksheets:
             # Freezing panes
             c_freezed = sheet['B2']
@@ -53,6 +62,7 @@ class Utils(object):
                                                 sheet.max_row)
         pass
 
+    @staticmethod
     def is_uuid(uuid_string, version=4):
         """Si uuid_string est un code hex valide mais pas un uuid valid,
         UUID() va quand même le convertir en uuid valide. Pour se prémunir
@@ -0,0 +1,65 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests fixtures
+# Purpose:      Make the tool modules and the benchmark stand-in servers
+#               importable, and serve a small generated GeoServer catalog
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import sys
+from os import path
+
+# 3rd party libraries
+import pytest
+
+# the tool modules and the stand-in servers, from the repository root
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+for folder in (ROOT, path.join(ROOT, "benchmarks")):
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+URL_BASE = "https://portal.example.com"
+
+# ############################################################################
+# ######### Fixtures ############
+# ###############################
+
+
+@pytest.fixture
+def geoserver():
+    """GeoServer stand-in serving 40 layers in 4 workspaces. Yield the
+    FakeCatalog and the REST URL."""
+    from mock_servers import FakeCatalog, start_geoserver
+    catalog = FakeCatalog(40, nb_workspaces=4)
+    server, url = start_geoserver(catalog)
+    yield catalog, url
+    server.shutdown()
+    server.server_close()
+
+
+def gs_job(name, url, matching=None, **opts):
+    """Job of a GeoServer stand-in instance for gs_sync, like those built
+    from the settings (see geoserver_job).
+
+    matching = MatchingTable of the layers whose metadata links are set
+    """
+    from modules.gs_sync import geoserver_job
+    opts.update(gs_url=url, gs_user="admin", gs_pswd="geoserver",
+                gs_ssl_off=False)
+    return geoserver_job(name, opts, URL_BASE, dict_match_gs_md=matching)
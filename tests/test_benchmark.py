@@ -0,0 +1,57 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the benchmark
+# Purpose:      Every phase runs against the local stand-ins and the runs
+#               are appended to the results file
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+import logging
+
+# 3rd party libraries
+import pytest
+
+pytest.importorskip("geoserver.catalog")
+pytest.importorskip("requests")
+
+# submodules
+from run_benchmark import main
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_phases_recorded(tmpdir, caplog):
+    output = str(tmpdir.join("results.json"))
+    argv = ["--layers", "20", "--latency", "0", "--formats", "csv",
+            "--output", output]
+    phases = main(argv).get("results").get("20")
+    assert list(phases) == ["matching", "read", "write", "resync", "search",
+                            "export", "total"]
+    # links written by the first sync only
+    assert phases.get("read").get("geoserver_writes") is None
+    assert phases.get("write").get("geoserver_writes") > 0
+    assert phases.get("resync").get("geoserver_writes") is None
+    assert phases.get("search").get("isogeo_requests") > 0
+
+    main(argv)
+    with io.open(output, "r", encoding="utf-8") as in_json:
+        assert len(json.load(in_json)) == 2
+    # results are not reported as warnings
+    assert set(record.levelno for record in caplog.records
+               if record.name == "benchmark") == {logging.INFO}
@@ -0,0 +1,83 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the streaming exports
+# Purpose:      CSV, JSON Lines and Parquet tables follow the same spec as
+#               the workbooks
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+
+# Python 3 backported
+from collections import OrderedDict
+
+# 3rd party libraries
+import pytest
+
+# submodules
+from modules.exporter import Exporter, field, template
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+SPEC = OrderedDict([
+    ("md", (
+        ("metadata", "METADATA", (("UUID", field("_id")),
+                                  ("TITLE", template("Voir - {title}")))),
+    )),
+])
+
+RECORDS = [{"_id": "a1", "title": "Réseau; routier"},
+           {"_id": "b2", "title": "Rivières"}]
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def export(tmpdir, formats):
+    exporter = Exporter(str(tmpdir.join("out")), formats=formats, spec=SPEC)
+    for rec in RECORDS:
+        exporter.write("metadata", rec)
+    return exporter.close()
+
+
+def test_csv_and_json_lines(tmpdir):
+    li_dest = export(tmpdir, ("csv", "jsonl"))
+    assert li_dest == [str(tmpdir.join("out_md.csv")), str(tmpdir.join("out_md.jsonl"))]
+
+    with io.open(li_dest[0], "r", encoding="utf-8") as in_csv:
+        assert in_csv.read().splitlines() == ["UUID;TITLE",
+                                              'a1;"Voir - Réseau; routier"',
+                                              "b2;Voir - Rivières"]
+    with io.open(li_dest[1], "r", encoding="utf-8") as in_jsonl:
+        lines = [json.loads(line, object_pairs_hook=OrderedDict) for line in in_jsonl]
+    assert lines == [OrderedDict([("UUID", "a1"), ("TITLE", "Voir - Réseau; routier")]),
+                     OrderedDict([("UUID", "b2"), ("TITLE", "Voir - Rivières")])]
+
+
+def test_parquet(tmpdir):
+    pq = pytest.importorskip("pyarrow.parquet")
+    li_dest = export(tmpdir, ("parquet", ))
+    table = pq.read_table(li_dest[0])
+    assert table.column_names == ["UUID", "TITLE"]
+    assert table.to_pydict().get("UUID") == ["a1", "b2"]
+
+
+def test_unknown_format(tmpdir):
+    with pytest.raises(ValueError):
+        export(tmpdir, ("ods", ))
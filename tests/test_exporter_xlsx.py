@@ -0,0 +1,70 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the XLSX export
+# Purpose:      Workbooks are written in one pass from a declarative spec
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Python 3 backported
+from collections import OrderedDict
+
+# 3rd party libraries
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+# submodules
+from modules.exporter import Exporter, const, field, table_name, template
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+SPEC = OrderedDict([
+    ("links", (
+        ("layers", "LINKS - WMS", (("NAME", field("name")),
+                                   ("LABEL", template("WMS - {name}")),
+                                   ("KIND", const("wms")))),
+        ("layers", "LINKS - WFS", (("NAME", field("name")),
+                                   ("KIND", const("wfs")))),
+    )),
+])
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_workbook_from_spec(tmpdir):
+    exporter = Exporter(str(tmpdir.join("out")), formats=("xlsx", ), spec=SPEC)
+    for name in ("roads", "rivers"):
+        exporter.write("layers", {"name": name})
+    exporter.write("metadata", {"name": "ignored"})
+    li_dest = exporter.close()
+    assert li_dest == [str(tmpdir.join("out_links.xlsx"))]
+
+    wb = openpyxl.load_workbook(li_dest[0])
+    assert wb.sheetnames == ["LINKS - WMS", "LINKS - WFS"]
+    ws = wb["LINKS - WMS"]
+    assert [[cell.value for cell in row] for row in ws.iter_rows()] == [
+        ["NAME", "LABEL", "KIND"],
+        ["roads", "WMS - roads", "wms"],
+        ["rivers", "WMS - rivers", "wms"]]
+    assert ws.auto_filter.ref == "A1:C3"
+    assert ws.freeze_panes == "B2"
+
+
+def test_table_names():
+    assert table_name("gs_full", "GEOSERVER - FULL", 1) == "gs_full"
+    assert table_name("mapfish", "MAPFISH - WMS", 2) == "mapfish_wms"
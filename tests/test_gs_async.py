@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the asyncio GeoServer reader
+# Purpose:      The REST JSON API is read with many requests in flight and
+#               metadata links are written only where they changed
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       3.7+ (asyncio, aiohttp)
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import sys
+import uuid
+
+# 3rd party libraries
+import pytest
+
+if sys.version_info < (3, 7):
+    pytest.skip("the async read engine requires Python 3.7+", allow_module_level=True)
+pytest.importorskip("aiohttp")
+
+# submodules
+from conftest import gs_job
+from modules.gs_sync import read_geoserver
+from modules.matching import MatchingTable
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_reads_and_links_once(geoserver):
+    catalog, url = geoserver
+    linked = list(catalog.layers.items())[:10]
+    matching = MatchingTable([(ws, name, uuid.UUID(int=i + 1, version=4).hex)
+                              for i, (name, (ws, store, res_class)) in enumerate(linked)])
+    job = gs_job("async", url, matching, read_engine="async", async_concurrency=8)
+
+    first = read_geoserver(job)
+    assert first.get("error") is None
+    layers = first.get("dico_gs").get("layers")
+    assert list(layers) == list(catalog.layers)
+    assert [layers.get(name).get("workspace") for name in layers] == \
+        [ws for ws, store, res_class in catalog.layers.values()]
+    assert first.get("counts").get("written") == 10
+    assert sorted(catalog.links) == sorted(name for name, attrs in linked)
+
+    second = read_geoserver(job)
+    assert second.get("counts").get("written") == 0
+    assert second.get("counts").get("skipped") == 10
@@ -0,0 +1,109 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the GeoServer reader
+# Purpose:      Layers resolved by a pool of threads or from listed stores
+#               come in the same order and with the same attributes as
+#               when resolved one by one
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import threading
+
+# 3rd party libraries
+import pytest
+
+pytest.importorskip("geoserver.catalog")
+
+# submodules
+from conftest import gs_job
+from modules.gs_reader import WINDOW, ReadGeoServer
+from modules.gs_sync import read_geoserver
+from modules.sync_state import layer_entry
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class PoolOnly(ReadGeoServer):
+    """Reader with its pool of threads only, nothing read at init."""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def layers_of(result):
+    """Attributes of the layers read, in the read order."""
+    assert result.get("error") is None
+    return [(lyr_name, layer.get("title"), layer.get("workspace"),
+             layer.get("store_name"), layer.get("lyr_type"))
+            for lyr_name, layer in result.get("dico_gs").get("layers").items()]
+
+
+def requests_of(result):
+    """Number of REST requests sent to read an instance."""
+    return sum(stats.get("count") for stats in result.get("http").values())
+
+
+def test_pool_keeps_layers_order(geoserver):
+    catalog, url = geoserver
+    sequential = layers_of(read_geoserver(gs_job("seq", url, max_workers=1)))
+    threaded = layers_of(read_geoserver(gs_job("pool", url, max_workers=4)))
+    assert threaded == sequential
+    assert [layer[0] for layer in threaded] == list(catalog.layers)
+
+
+def test_bulk_listing_same_layers_fewer_requests(geoserver):
+    catalog, url = geoserver
+    by_layer = read_geoserver(gs_job("catalog", url))
+    bulk = read_geoserver(gs_job("bulk", url, read_engine="bulk"))
+    assert layers_of(bulk) == layers_of(by_layer)
+    assert requests_of(bulk) < requests_of(by_layer)
+
+
+def test_moved_layer_not_reused(geoserver):
+    catalog, url = geoserver
+    first = read_geoserver(gs_job("bulk", url, read_engine="bulk"))
+    known = dict((lyr_name, layer_entry(layer))
+                 for lyr_name, layer in first.get("dico_gs").get("layers").items())
+    # stored by the last run in another workspace
+    moved = list(catalog.layers)[0]
+    known[moved][1] = "archive"
+
+    name, gs_axx, kwargs = gs_job("bulk", url, read_engine="bulk")
+    kwargs.update(known=known)
+    layers = read_geoserver((name, gs_axx, kwargs)).get("dico_gs").get("layers")
+    assert layers.get(moved).get("workspace") == catalog.layers.get(moved)[0]
+    assert layers_of(read_geoserver((name, gs_axx, kwargs))) == layers_of(first)
+
+
+def test_pool_reads_ahead_within_window():
+    reader = PoolOnly(max_workers=2)
+    started = []
+    lock = threading.Lock()
+
+    def func(item):
+        with lock:
+            started.append(item)
+        return item
+
+    results = reader._map(func, list(range(100)))
+    assert next(results) == 0
+    assert len(started) <= reader.max_workers * WINDOW
+    assert [0] + list(results) == list(range(100))
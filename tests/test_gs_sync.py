@@ -0,0 +1,114 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the GeoServer instances sync
+# Purpose:      Several GeoServer instances are read concurrently, each one
+#               with its own isolated results, or streamed layer by layer
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import threading
+import time
+
+# 3rd party libraries
+import pytest
+
+# submodules
+from conftest import gs_job
+from modules import gs_sync
+from modules.gs_sync import geoservers_settings, stream_geoservers, sync_geoservers
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+# streamed instance job => (name, number of layers, seconds by layer)
+SLOW = ("slow", 20, 0.02)
+FAST = ("fast", 200, 0)
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_instances_inherit_default_options():
+    settings = {"geoserver": {"gs_url": "http://a/rest", "gs_user": "admin"},
+                "geoserver.b": {"gs_url": "http://b/rest"},
+                "isogeo": {"app_id": "x"}}
+    servers = geoservers_settings(settings)
+    assert list(servers) == ["default", "b"]
+    assert servers.get("b") == {"gs_url": "http://b/rest", "gs_user": "admin"}
+
+
+def test_failed_instance_isolated(geoserver):
+    pytest.importorskip("geoserver.catalog")
+    catalog, url = geoserver
+    jobs = [gs_job("down", "http://127.0.0.1:1/geoserver/rest"),
+            gs_job("up", url, max_workers=2)]
+    results = sync_geoservers(jobs, mode="thread")
+    assert [result.get("name") for result in results] == ["down", "up"]
+    assert results[0].get("error")
+    assert results[1].get("error") is None
+    assert list(results[1].get("dico_gs").get("layers")) == list(catalog.layers)
+
+
+def fake_stream(job, put):
+    """stream_geoserver reading generated layers at the pace of the job."""
+    name, nb_layers, delay = job
+    for i in range(nb_layers):
+        time.sleep(delay)
+        put("lyr{}".format(i), {"i": i})
+    if name == "broken":
+        raise ValueError("GeoServer down")
+    return {"name": name, "dico_gs": {}, "error": None}
+
+
+def test_streams_mixed_by_one_queue(monkeypatch):
+    monkeypatch.setattr(gs_sync, "stream_geoserver", fake_stream)
+    items = list(stream_geoservers([SLOW, FAST], buffer_size=10))
+    # the fast instance is not held behind the slow one
+    ends = [name for name, lyr_name, item in items if lyr_name is None]
+    assert ends == ["fast", "slow"]
+    for name, nb_layers, delay in (SLOW, FAST):
+        assert [item.get("i") for item_name, lyr_name, item in items
+                if item_name == name and lyr_name] == list(range(nb_layers))
+
+
+def test_failed_instance_streamed_as_result(monkeypatch):
+    monkeypatch.setattr(gs_sync, "stream_geoserver", fake_stream)
+    results = dict((name, item) for name, lyr_name, item
+                   in stream_geoservers([("broken", 2, 0), FAST])
+                   if lyr_name is None)
+    assert results.get("broken").get("error") == "GeoServer down"
+    assert results.get("fast").get("error") is None
+
+
+def test_dead_reader_raises(monkeypatch):
+    monkeypatch.setattr(gs_sync, "stream_geoserver", fake_stream)
+
+    def failed_result(*args):
+        raise RuntimeError("no result")
+
+    monkeypatch.setattr(gs_sync, "failed_result", failed_result)
+    with pytest.raises(RuntimeError):
+        list(stream_geoservers([("broken", 1, 0)]))
+
+
+def test_consumer_leaving_stops_readers(monkeypatch):
+    monkeypatch.setattr(gs_sync, "stream_geoserver", fake_stream)
+    before = threading.active_count()
+    stream = stream_geoservers([("long", 10000, 0), FAST], buffer_size=5)
+    next(stream)
+    stream.close()
+    assert threading.active_count() <= before
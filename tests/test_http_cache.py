@@ -0,0 +1,127 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the HTTP cache
+# Purpose:      GET responses are revalidated or served from the disk cache
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import threading
+
+# submodules
+from modules.http_cache import HttpCache
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+RESOURCE = "/workspaces/ws/datastores/pg/featuretypes/roads.xml"
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class Response(dict):
+    """httplib2-like response."""
+
+    def __init__(self, status, headers=None):
+        super(Response, self).__init__(headers or {})
+        self.status = status
+
+
+class Http(object):
+    """httplib2-like client answering from a dictionary of URL => (ETag,
+    body), 304 when the ETag sent is the current one."""
+
+    def __init__(self, pages):
+        super(Http, self).__init__()
+        self.pages = pages
+        self.requests = []
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append((method, uri, headers.get("If-None-Match")))
+        etag, content = self.pages.get(uri)
+        if etag and headers.get("If-None-Match") == etag:
+            return Response(304), b""
+        return Response(200, {"etag": etag} if etag else {}), content
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_revalidated_with_etag(tmpdir):
+    http = Http({"/layers": ("v1", b"<layers/>")})
+    cache = HttpCache(http, str(tmpdir))
+    assert cache.request("/layers")[1] == b"<layers/>"
+    response, content = cache.request("/layers")
+    assert response.fromcache and content == b"<layers/>"
+    assert http.requests[-1] == ("GET", "/layers", "v1")
+    assert cache.stats() == {"hits": 0, "revalidated": 1, "misses": 1}
+
+
+def test_served_within_ttl_without_validator(tmpdir):
+    http = Http({"/about": (None, b"<about/>")})
+    cache = HttpCache(http, str(tmpdir), ttl=300)
+    cache.request("/about")
+    assert cache.request("/about")[1] == b"<about/>"
+    assert len(http.requests) == 1
+    assert cache.stats().get("hits") == 1
+
+
+def test_resources_fetched_within_ttl(tmpdir):
+    # their metadata links may have changed on the server
+    http = Http({RESOURCE: (None, b"<featureType/>")})
+    cache = HttpCache(http, str(tmpdir), ttl=300)
+    cache.request(RESOURCE)
+    http.pages[RESOURCE] = (None, b"<featureType><metadataLinks/></featureType>")
+    assert cache.request(RESOURCE)[1] == b"<featureType><metadataLinks/></featureType>"
+    assert cache.stats() == {"hits": 0, "revalidated": 0, "misses": 2}
+
+
+def test_counts_shared_by_threads(tmpdir):
+    http = Http({"/about": (None, b"<about/>")})
+    cache = HttpCache(http, str(tmpdir), ttl=300)
+    cache.request("/about")
+
+    def read():
+        for i in range(200):
+            cache.request("/about")
+
+    threads = [threading.Thread(target=read) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats() == {"hits": 1600, "revalidated": 0, "misses": 1}
+
+
+def test_write_invalidates(tmpdir):
+    http = Http({"/layers/a": (None, b"<a/>")})
+    cache = HttpCache(http, str(tmpdir))
+    cache.request("/layers/a")
+    cache.request("/layers/a", "PUT", b"<a/>")
+    cache.request("/layers/a")
+    assert [method for method, uri, etag in http.requests] == ["GET", "PUT", "GET"]
+
+
+def test_least_recently_used_evicted(tmpdir):
+    http = Http(dict(("/{}".format(i), (None, b"x" * 10)) for i in range(3)))
+    cache = HttpCache(http, str(tmpdir), max_size=20)
+    for i in range(3):
+        cache.request("/{}".format(i))
+    assert cache._get("/0") is None
+    assert cache._get("/2") is not None
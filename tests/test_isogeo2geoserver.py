@@ -0,0 +1,220 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the tool
+# Purpose:      Commands and sync cycles of the watch mode against the
+#               GeoServer and Isogeo stand-ins
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+import subprocess
+import sys
+import threading
+import time
+from os import path
+
+# 3rd party libraries
+import pytest
+
+pytest.importorskip("geoserver.catalog")
+requests = pytest.importorskip("requests")
+
+# submodules
+import isogeo2geoserver
+from conftest import ROOT
+from mock_servers import FakeIsogeo, IsogeoClient, start_isogeo
+from modules.isogeo_token import TokenStore
+from run_benchmark import write_matching
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+SETTINGS = """[isogeo]
+app_id = test
+csw_share_id = share
+csw_share_token = token
+[geoserver]
+gs_url = {gs_url}
+gs_user = admin
+gs_pswd = geoserver
+gs_ssl_off = 0
+[output]
+out_prefix = {out_dir}/out
+url_base = https://portal.example.com
+out_formats = csv
+[sync]
+full_every = 24
+[input]
+in_matching = {matching}
+"""
+
+# ############################################################################
+# ######### Fixtures ############
+# ###############################
+
+
+@pytest.fixture
+def stand_ins(tmpdir, geoserver):
+    """Settings of a tool reading the GeoServer stand-in and searching the
+    Isogeo stand-in. Yield the settings path, the Isogeo API URL, the
+    FakeCatalog and the FakeIsogeo."""
+    catalog, gs_url = geoserver
+    matching = str(tmpdir.join("matching.csv"))
+    share = FakeIsogeo(len(catalog.layers), write_matching(catalog, matching))
+    server, isogeo_url = start_isogeo(share)
+    settings_path = str(tmpdir.join("settings.ini"))
+    with io.open(settings_path, "w", encoding="utf-8") as out_ini:
+        out_ini.write(SETTINGS.format(gs_url=gs_url, out_dir=str(tmpdir),
+                                      matching=matching))
+    yield settings_path, isogeo_url, catalog, share
+    server.shutdown()
+    server.server_close()
+
+
+def connect_stand_in(i2gs, isogeo_url):
+    """Replace the Isogeo SDK by a client of the stand-in."""
+    i2gs.isogeo = IsogeoClient(isogeo_url, requests.Session())
+    i2gs.token_store = TokenStore("test", isogeo_url)
+    return i2gs
+
+
+def run_command(monkeypatch, stand_ins, *argv):
+    """Run the command line on the stand-ins, logging left as set by pytest."""
+    settings_path, isogeo_url = stand_ins[:2]
+
+    def connect_isogeo(i2gs):
+        if i2gs.isogeo is None:
+            connect_stand_in(i2gs, isogeo_url)
+        return i2gs.isogeo
+
+    monkeypatch.setattr(isogeo2geoserver, "setup_logging", lambda *args, **kwargs: None)
+    monkeypatch.setattr(isogeo2geoserver.IsogeoToGeoServer, "connect_isogeo", connect_isogeo)
+    return isogeo2geoserver.main(["--settings", settings_path] + list(argv))
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_watch_cycles_apply_changes_only(stand_ins):
+    settings_path, isogeo_url, catalog, share = stand_ins
+    i2gs = connect_stand_in(isogeo2geoserver.IsogeoToGeoServer(settings_path),
+                            isogeo_url)
+    assert i2gs.sync(stream=False)
+    written = dict(catalog.links)
+    matching = i2gs.matching()
+
+    # nothing changed: no link written, exports not regenerated
+    assert i2gs.sync(stream=False) == []
+    assert catalog.links == written
+    assert i2gs.matching() is matching
+
+    share.metadata[0]["_modified"] = "2018-01-01T00:00:00+00:00"
+    assert i2gs.sync(stream=False)
+
+
+def test_watch_stops(stand_ins):
+    settings_path, isogeo_url, catalog, share = stand_ins
+    i2gs = connect_stand_in(isogeo2geoserver.IsogeoToGeoServer(settings_path),
+                            isogeo_url)
+    cycles = []
+
+    def sync(**kwargs):
+        cycles.append(kwargs)
+        if len(cycles) == 1:
+            raise RuntimeError("GeoServer down")
+
+    i2gs.sync = sync
+    watcher = threading.Thread(target=i2gs.watch, args=(0.01, True))
+    watcher.start()
+    deadline = time.time() + 5
+    while len(cycles) < 3 and time.time() < deadline:
+        watcher.join(0.01)
+    i2gs.stop()
+    watcher.join(5)
+    assert not watcher.is_alive()
+    # a failed cycle does not stop the watch, only the first one is full
+    assert len(cycles) >= 3
+    assert [cycle.get("full") for cycle in cycles[:3]] == [True, False, False]
+
+
+def test_watch_dry_run_writes_nothing(monkeypatch, stand_ins):
+    settings_path, isogeo_url, catalog, share = stand_ins
+    sync = isogeo2geoserver.IsogeoToGeoServer.sync
+    cycles = []
+
+    def two_cycles(i2gs, **kwargs):
+        cycles.append(kwargs)
+        if len(cycles) == 2:
+            i2gs.stop()
+        return sync(i2gs, **kwargs)
+
+    monkeypatch.setattr(isogeo2geoserver.IsogeoToGeoServer, "sync", two_cycles)
+    # in a thread: the watch mode would take the signals of pytest
+    watcher = threading.Thread(target=run_command,
+                               args=(monkeypatch, stand_ins, "sync", "--watch", "--dry-run",
+                                     "--resume", "--interval", "0"))
+    watcher.daemon = True
+    watcher.start()
+    watcher.join(30)
+    assert not watcher.is_alive()
+    assert catalog.links == {}
+    assert [(cycle.get("dry_run"), cycle.get("resume")) for cycle in cycles] == \
+        [(True, True), (True, False)]
+
+
+def test_read_writes_nothing(monkeypatch, stand_ins):
+    settings_path, isogeo_url, catalog, share = stand_ins
+    run_command(monkeypatch, stand_ins, "read")
+    assert catalog.links == {}
+    plan_path = path.join(path.dirname(settings_path), "out_default_md_links_plan.json")
+    with io.open(plan_path, "r", encoding="utf-8") as in_json:
+        assert set(change.get("status") for change in json.load(in_json)) == {"planned"}
+
+
+def test_link_one_workspace(monkeypatch, stand_ins):
+    settings_path, isogeo_url, catalog, share = stand_ins
+    run_command(monkeypatch, stand_ins, "link", "--workspace", "ws01")
+    assert catalog.links
+    assert set(catalog.layers.get(name)[0] for name in catalog.links) == {"ws01"}
+
+
+def test_search_output(monkeypatch, stand_ins, tmpdir):
+    settings_path, isogeo_url, catalog, share = stand_ins
+    output = str(tmpdir.join("md.json"))
+    run_command(monkeypatch, stand_ins, "search", "--output", output)
+    with io.open(output, "r", encoding="utf-8") as in_json:
+        assert [md.get("_id") for md in json.load(in_json)] == \
+            [md.get("_id") for md in share.metadata]
+
+
+def test_sync_exports(monkeypatch, stand_ins):
+    li_paths = run_command(monkeypatch, stand_ins, "sync")
+    assert li_paths and all(path.isfile(li_path) for li_path in li_paths)
+
+
+def test_unknown_command(monkeypatch, stand_ins):
+    with pytest.raises(SystemExit):
+        run_command(monkeypatch, stand_ins, "publish")
+
+
+def test_heavy_libraries_imported_by_steps_only():
+    code = ("import sys, isogeo2geoserver; "
+            "print(sorted(set(['geoserver', 'isogeo_pysdk', 'openpyxl', 'requests'])"
+            " & set(sys.modules)))")
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT)
+    assert output.strip() == b"[]"
@@ -0,0 +1,135 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the Isogeo search
+# Purpose:      Every page of the share is fetched and merged in order, or
+#               only the metadata modified since the last search
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import copy
+import threading
+
+# Python 3 backported
+from collections import OrderedDict
+
+# submodules
+from mock_servers import FakeIsogeo
+from modules.isogeo_search import search_all, search_since
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class Isogeo(object):
+    """Isogeo SDK answering pages of a list of metadata, sorted by
+    descending _modified when asked, and recording the searches."""
+
+    def __init__(self, metadata, max_page_size=100):
+        super(Isogeo, self).__init__()
+        self.metadata = metadata
+        self.max_page_size = max_page_size
+        self.searches = []
+        self._lock = threading.Lock()
+
+    def search(self, token, page_size=100, offset=0, order_by=None,
+               order_dir="desc", **kwargs):
+        with self._lock:
+            self.searches.append(dict(kwargs, offset=offset, page_size=page_size))
+        page_size = min(page_size, self.max_page_size)
+        metadata = self.metadata
+        if order_by:
+            metadata = sorted(metadata, key=lambda md: md.get(order_by),
+                              reverse=order_dir == "desc")
+        return {"total": len(metadata),
+                "results": metadata[offset:offset + page_size]}
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_every_page_merged_in_order():
+    share = FakeIsogeo(250).metadata
+    isogeo = Isogeo(share)
+    results = search_all(isogeo, "token", page_size=100, max_workers=3)
+    assert [md.get("_id") for md in results] == [md.get("_id") for md in share]
+    assert sorted(search.get("offset") for search in isogeo.searches) == [0, 100, 200]
+    # the SDK must not fetch the whole share by itself
+    assert all(search.get("whole_share") is False for search in isogeo.searches)
+
+
+def test_pages_shorter_than_requested():
+    share = FakeIsogeo(250).metadata
+    isogeo = Isogeo(share, max_page_size=40)
+    results = search_all(isogeo, "token", page_size=100)
+    assert [md.get("_id") for md in results] == [md.get("_id") for md in share]
+    assert sorted(search.get("offset") for search in isogeo.searches) == list(range(0, 250, 40))
+
+
+def test_page_size_capped():
+    isogeo = Isogeo(FakeIsogeo(150).metadata, max_page_size=150)
+    assert len(search_all(isogeo, "token", page_size=500)) == 150
+    assert [search.get("page_size") for search in isogeo.searches] == [100, 100]
+
+
+def test_moved_records_kept_once():
+    share = FakeIsogeo(150).metadata
+    isogeo = Isogeo(share)
+    original = isogeo.search
+
+    def shifted(token, page_size=100, offset=0, **kwargs):
+        # a metadata added at the top pushes the last record of page 1
+        page = original(token, page_size, offset, **kwargs)
+        if offset:
+            page["results"] = [share[offset - 1]] + page.get("results")
+        return page
+
+    isogeo.search = shifted
+    results = search_all(isogeo, "token", page_size=100)
+    assert [md.get("_id") for md in results] == [md.get("_id") for md in share]
+
+
+def known_share(nb_metadata=250):
+    """Metadata of a share and the same as stored by the last search."""
+    share = FakeIsogeo(nb_metadata).metadata
+    known = OrderedDict((md.get("_id"), md) for md in copy.deepcopy(share))
+    return share, known
+
+
+def test_since_only_modified_requested():
+    share, known = known_share()
+    share[120]["_modified"] = "2017-07-01T00:00:00+00:00"
+    share[120]["title"] = "Renamed"
+    isogeo = Isogeo(share)
+    results = search_since(isogeo, "token", known, "2017-06-01T00:00:00+00:00")
+    assert len(isogeo.searches) == 1
+    assert [md.get("_id") for md in results] == list(known)
+    assert results[120].get("title") == "Renamed"
+    assert results[119] == known.get(share[119].get("_id"))
+
+
+def test_since_added_needs_complete_search():
+    share, known = known_share()
+    added = dict(share[0], _id="f" * 32, _modified="2017-07-01T00:00:00+00:00")
+    # the count does not change if another one was unshared meanwhile
+    share[-1] = added
+    assert search_since(Isogeo(share), "token", known, "2017-06-01T00:00:00+00:00") is None
+
+
+def test_since_deleted_needs_complete_search():
+    share, known = known_share()
+    del share[10]
+    assert search_since(Isogeo(share), "token", known, "2017-06-01T00:00:00+00:00") is None
@@ -0,0 +1,125 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the Isogeo token store
+# Purpose:      Tokens are reused across runs until they expire
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+from datetime import datetime, timedelta
+
+# 3rd party libraries
+import pytest
+
+# submodules
+from modules.isogeo_token import TokenStore, is_unauthorized
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class Isogeo(object):
+    """Isogeo SDK counting its connections."""
+
+    def __init__(self, dated=False):
+        super(Isogeo, self).__init__()
+        self.dated = dated
+        self.connections = 0
+
+    def connect(self):
+        self.connections += 1
+        token = "token-{}".format(self.connections)
+        if self.dated:
+            return token, datetime.now() + timedelta(hours=1)
+        return token
+
+
+class Response(object):
+    """requests-like response."""
+
+    def __init__(self, status_code):
+        super(Response, self).__init__()
+        self.status_code = status_code
+
+
+class HttpError(Exception):
+    """requests-like HTTP error of the SDK."""
+
+    def __init__(self, message, status_code):
+        super(HttpError, self).__init__(message)
+        self.response = Response(status_code)
+
+
+class TokenExpiredError(Exception):
+    """oauthlib-like error of an expired token."""
+    error = "token_expired"
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_reused_by_next_run(tmpdir):
+    cache_path = str(tmpdir.join("token.json"))
+    isogeo = Isogeo()
+    assert TokenStore("app", "api", cache_path).get(isogeo) == "token-1"
+    assert TokenStore("app", "api", cache_path).get(isogeo) == "token-1"
+    assert isogeo.connections == 1
+    # another application has its own token
+    assert TokenStore("other", "api", cache_path).get(isogeo) == "token-2"
+
+
+def test_renewed_before_expiry(tmpdir):
+    cache_path = str(tmpdir.join("token.json"))
+    isogeo = Isogeo()
+    TokenStore("app", "api", cache_path, margin=60, ttl=30).get(isogeo)
+    TokenStore("app", "api", cache_path, margin=60, ttl=30).get(isogeo)
+    assert isogeo.connections == 2
+
+
+def test_dated_token_kept_as_tuple(tmpdir):
+    cache_path = str(tmpdir.join("token.json"))
+    first = TokenStore("app", "api", cache_path).get(Isogeo(dated=True))
+    second = TokenStore("app", "api", cache_path).get(Isogeo(dated=True))
+    assert second[0] == first[0] == "token-1"
+    assert abs((second[-1] - first[-1]).total_seconds()) < 1
+
+
+def test_rejected_token_renewed_once(tmpdir):
+    store = TokenStore("app", "api", str(tmpdir.join("token.json")))
+    isogeo = Isogeo()
+    calls = []
+
+    def func(token):
+        calls.append(token)
+        if token == "token-1":
+            raise HttpError("Unauthorized", 401)
+        return token
+
+    assert store.with_token(isogeo, func) == "token-2"
+    assert calls == ["token-1", "token-2"]
+    assert is_unauthorized(TokenExpiredError())
+
+
+def test_other_errors_not_retried(tmpdir):
+    store = TokenStore("app", "api", str(tmpdir.join("token.json")))
+    isogeo = Isogeo()
+
+    def func(token):
+        raise HttpError("Not found: offset 401", 404)
+
+    with pytest.raises(HttpError):
+        store.with_token(isogeo, func)
+    assert isogeo.connections == 1
@@ -0,0 +1,73 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the run journal
+# Purpose:      A run stopped midway is resumed from the layers journaled
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import os
+
+# submodules
+from modules.journal import RunJournal, clear_journal
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+ROADS = ["Roads", "transport", "pg", "postgis", "vector", ""]
+RIVERS = ["Rivers", "water", "pg", "postgis", "vector", ""]
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_resumed_after_torn_line(tmpdir):
+    journal_path = str(tmpdir.join("journal.jsonl"))
+    journal = RunJournal(journal_path)
+    journal.layer_done("roads", ROADS)
+    journal.close()
+    # the process died while writing the next line
+    with io.open(journal_path, "ab") as out_journal:
+        out_journal.write(b'{"layer": "rivers", "attrs": ["Riv')
+
+    journal = RunJournal(journal_path, resume=True)
+    assert list(journal.done) == ["roads"]
+    journal.layer_done("rivers", RIVERS)
+    journal.close()
+
+    journal = RunJournal(journal_path, resume=True)
+    assert journal.done == {"roads": ROADS, "rivers": RIVERS}
+    journal.close()
+
+
+def test_started_again_without_resume(tmpdir):
+    journal_path = str(tmpdir.join("journal.jsonl"))
+    journal = RunJournal(journal_path)
+    journal.layer_done("roads", ROADS)
+    journal.close()
+    RunJournal(journal_path).close()
+    journal = RunJournal(journal_path, resume=True)
+    assert not journal.done
+    journal.close()
+
+
+def test_cleared_at_the_end(tmpdir):
+    journal_path = str(tmpdir.join("journal.jsonl"))
+    RunJournal(journal_path).close()
+    clear_journal(journal_path)
+    assert not os.path.exists(journal_path)
+    clear_journal(journal_path)
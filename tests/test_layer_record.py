@@ -0,0 +1,72 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the layer records
+# Purpose:      Slotted records behave like the former layer dictionaries
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# 3rd party libraries
+import pytest
+
+# submodules
+from modules.layer_record import LayerRecord, LinkTemplates
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+UUID = "0f1e2d3c4b5a49788796a5b4c3d2e1f0"
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def record(name="roads", uuid=UUID):
+    templates = LinkTemplates("https://portal.example.com", "share", "tok")
+    # names built at run time, as when parsed from GeoServer answers
+    return LayerRecord(templates, name, "Roads - 2017", "".join(["trans", "port"]),
+                       "".join(["p", "g"]), "postgis", "vector", uuid)
+
+
+def test_used_as_a_dictionary():
+    rec = record()
+    assert len(dict(rec)) == len(LayerRecord.KEYS)
+    assert rec["workspace"] == rec.get("workspace") == "transport"
+    assert "md_link_oc_wms" in rec
+    assert rec.get("unknown", "x") == "x"
+    with pytest.raises(KeyError):
+        rec["unknown"]
+    with pytest.raises(AttributeError):
+        rec.extra = 1
+
+
+def test_links_computed_on_access():
+    rec = record()
+    assert rec["md_link_oc_wms"] == ("https://portal.example.com/geoserver/transport"
+                                     "/wms?layers=transport:roads")
+    assert rec["srv_link_html"].endswith("?uuid={}".format(UUID))
+    assert "uuid:0f1e2d3c-4b5a-4978-8796-a5b4c3d2e1f0&" in rec["srv_link_xml"]
+
+
+def test_no_metadata_links_without_uuid():
+    rec = record(uuid=None)
+    assert rec["md_id_matching"] == ""
+    assert rec["srv_link_html"] == rec["srv_link_xml"] == ""
+
+
+def test_repeated_names_shared():
+    first, second = record("roads"), record("rivers")
+    assert first.workspace is second.workspace
+    assert first.store_name is second.store_name
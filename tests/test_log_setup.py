@@ -0,0 +1,147 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the log setup
+# Purpose:      Records go through a queue to the listener thread, written
+#               as text or JSON lines
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+import logging
+import sys
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+# 3rd party libraries
+import pytest
+
+# submodules
+from modules import log_setup
+from modules.log_setup import JsonFormatter, QueueHandler, QueueListener, setup_logging
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class Collector(logging.Handler):
+    """Keep the messages handled, to be checked."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+        self.closed = False
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+    def close(self):
+        self.closed = True
+        logging.Handler.close(self)
+
+# ############################################################################
+# ######### Fixtures ############
+# ###############################
+
+
+@pytest.fixture
+def root_logger():
+    """Root logger set back as pytest left it after the test."""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield root
+    if log_setup._listener:
+        log_setup._listener.stop()
+        log_setup._listener = None
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    logging.captureWarnings(False)
+
+
+def make_record(message, **extra):
+    record = logging.LogRecord("i2gs", logging.WARNING, __file__, 1, message, (), None)
+    record.__dict__.update(extra)
+    return record
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_json_line_with_extra_fields():
+    entry = json.loads(JsonFormatter().format(make_record("Layer read", layer="roads",
+                                                          workspace="transport")))
+    assert entry.get("level") == "WARNING"
+    assert entry.get("message") == "Layer read"
+    assert entry.get("layer") == "roads"
+    assert entry.get("workspace") == "transport"
+    assert "exception" not in entry
+
+
+def test_json_line_with_exception():
+    try:
+        raise ValueError("GeoServer down")
+    except ValueError:
+        record = make_record("Read failed")
+        record.exc_info = sys.exc_info()
+    entry = json.loads(JsonFormatter().format(record))
+    assert "ValueError: GeoServer down" in entry.get("exception")
+
+
+def test_queue_flushed_at_stop():
+    collector = Collector()
+    queue = Queue()
+    listener = QueueListener(queue, [collector])
+    listener.start()
+    handler = QueueHandler(queue, [collector])
+    for i in range(200):
+        handler.handle(make_record("layer {}".format(i)))
+    listener.stop()
+    assert collector.messages == ["layer {}".format(i) for i in range(200)]
+    assert collector.closed
+    # stopped twice at exit
+    listener.stop()
+
+
+def test_traceback_rendered_by_caller():
+    queue = Queue()
+    try:
+        raise ValueError("GeoServer down")
+    except ValueError:
+        record = make_record("Read failed")
+        record.exc_info = sys.exc_info()
+    QueueHandler(queue).handle(record)
+    queued = queue.get_nowait()
+    assert queued.exc_info is None
+    assert "ValueError: GeoServer down" in queued.exc_text
+
+
+def test_json_log_file(root_logger, tmpdir):
+    log_path = str(tmpdir.join("i2gs.log"))
+    setup_logging(log_path, level="DEBUG", json_lines=True, console=False)
+    listener = setup_logging(log_path, level="DEBUG", json_lines=True, console=False)
+    assert len([handler for handler in root_logger.handlers
+                if isinstance(handler, QueueHandler)]) == 1
+
+    logging.getLogger("i2gs").debug("Layer read", extra={"layer": "roads"})
+    listener.stop()
+    with io.open(log_path, "r", encoding="utf-8") as in_log:
+        entries = [json.loads(line) for line in in_log]
+    assert [(entry.get("message"), entry.get("layer")) for entry in entries] == \
+        [("Layer read", "roads")]
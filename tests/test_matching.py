@@ -0,0 +1,86 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the matching table
+# Purpose:      UUIDs are validated once at load, then layers are only
+#               looked up
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import uuid
+
+# submodules
+from modules.matching import MatchingTable, hyphenate, is_uuid_hex
+from modules.utils import Utils
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+UUID = "0f1e2d3c4b5a49788796a5b4c3d2e1f0"
+OTHER_UUID = "1f1e2d3c4b5a49788796a5b4c3d2e1f0"
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_uuid_validation():
+    assert is_uuid_hex(UUID)
+    assert is_uuid_hex(uuid.uuid4().hex)
+    # version 1, uppercase, hyphenated, too short
+    for value in (uuid.uuid1().hex, UUID.upper(), hyphenate(UUID), UUID[:-1], None, ""):
+        assert not is_uuid_hex(value)
+    assert hyphenate(UUID) == str(uuid.UUID(UUID))
+
+
+def test_same_validation_as_utils():
+    utils = Utils()
+    for value in (UUID, uuid.uuid1().hex, UUID[:-1], "z" * 32):
+        assert is_uuid_hex(value) == bool(utils.is_uuid(value))
+
+
+def test_lookup_qualified_row_first():
+    table = MatchingTable([("transport", "roads", UUID),
+                           ("archive", "roads", OTHER_UUID),
+                           (None, "rivers", UUID)])
+    assert table.lookup("roads", "archive") == OTHER_UUID
+    assert table.lookup("roads", "transport") == UUID
+    assert table.lookup("rivers", "water") == UUID
+    assert table.lookup("lakes") is None
+    assert table.hyphenated == {UUID: hyphenate(UUID), OTHER_UUID: hyphenate(OTHER_UUID)}
+
+
+def test_orphans_qualified_by_workspace():
+    table = MatchingTable([("transport", "roads", UUID),
+                           (None, "rivers", UUID),
+                           (None, "lakes", None)])
+    # same layer name in another workspace
+    layers = [("archive", "roads"), ("water", "rivers")]
+    assert table.orphans(layers) == [("transport", "roads", UUID), (None, "lakes", None)]
+    assert table.summary(layers).get("orphan") == 2
+
+
+def test_invalid_and_repeated_rows():
+    table = MatchingTable([("transport", "roads", "not-an-uuid"),
+                           ("transport", "roads", UUID),
+                           (None, "rivers", "0" * 32)])
+    assert table.invalid == ["roads", "rivers"]
+    assert table.duplicates == ["transport:roads"]
+    # invalid UUIDs are stored as None, the last row wins
+    assert "rivers" in table and table.lookup("rivers") is None
+    assert table.lookup("roads", "transport") == UUID
+    assert table.summary(layers=[("transport", "roads")]) == \
+        {"invalid": 2, "duplicate": 1, "orphan": 1}
+    assert table.summary() == {"invalid": 2, "duplicate": 1}
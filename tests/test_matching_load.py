@@ -0,0 +1,102 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the matching table loader
+# Purpose:      The matching file is read once, then from its cached index
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import os
+
+# submodules
+from modules import matching
+from modules.matching import load_matching, normalize_uuid
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+HEADERS = ["GS_WORKSPACE", "GS_DATASTORE_NAME", "GS_DATASTORE_TYPE",
+           "GS_SOURCE_TYPE", "GS_NOM", "GS_TITRE", "ISOGEO_UUID"]
+
+UUID = "0f1e2d3c4b5a49788796a5b4c3d2e1f0"
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def write_csv(dest_path, rows, delimiter=";"):
+    with io.open(dest_path, "w", encoding="utf-8") as out_csv:
+        for row in [HEADERS] + rows:
+            out_csv.write(delimiter.join(row) + "\n")
+    return dest_path
+
+
+def test_csv_delimiters(tmpdir):
+    row = ["transport", "pg", "postgis", "vector", "roads", "Routes",
+           "{0F1E2D3C-4B5A-4978-8796-A5B4C3D2E1F0}"]
+    for delimiter in (";", ","):
+        in_path = write_csv(str(tmpdir.join("m.csv")), [row], delimiter)
+        table = load_matching(in_path)
+        assert table.rows == [("transport", "roads", UUID)]
+        assert table.lookup("roads", "transport") == UUID
+
+
+def test_normalize_uuid():
+    assert normalize_uuid(" {0F1E2D3C-4B5A-4978-8796-A5B4C3D2E1F0} ") == UUID
+    assert normalize_uuid(None) is None
+    assert normalize_uuid("  ") is None
+
+
+def test_cached_index_reused(tmpdir, monkeypatch):
+    in_path = write_csv(str(tmpdir.join("m.csv")),
+                        [["ws", "", "", "", "roads", "", UUID]])
+    cache_dir = str(tmpdir.join("cache"))
+    load_matching(in_path, cache_dir)
+
+    def unread(*args):
+        raise AssertionError("file read or validated again")
+
+    monkeypatch.setattr(matching, "_read_csv", unread)
+    monkeypatch.setattr(matching, "is_uuid_hex", unread)
+    table = load_matching(in_path, cache_dir)
+    assert table.rows == [("ws", "roads", UUID)]
+    assert table.lookup("roads", "ws") == UUID
+    assert table.hyphenated.get(UUID) == "0f1e2d3c-4b5a-4978-8796-a5b4c3d2e1f0"
+    # touched but unchanged: the content hash is enough
+    stat = os.stat(in_path)
+    os.utime(in_path, (stat.st_atime, stat.st_mtime + 10))
+    assert load_matching(in_path, cache_dir).rows == [("ws", "roads", UUID)]
+
+
+def test_not_hashed_without_cache(tmpdir, monkeypatch):
+    in_path = write_csv(str(tmpdir.join("m.csv")),
+                        [["ws", "", "", "", "roads", "", "not-an-uuid"]])
+
+    def unhashed(in_path):
+        raise AssertionError("file hashed")
+
+    monkeypatch.setattr(matching, "_file_hash", unhashed)
+    assert load_matching(in_path).invalid == ["roads"]
+
+
+def test_changed_file_read_again(tmpdir):
+    in_path = write_csv(str(tmpdir.join("m.csv")),
+                        [["ws", "", "", "", "roads", "", UUID]])
+    cache_dir = str(tmpdir.join("cache"))
+    load_matching(in_path, cache_dir)
+    write_csv(in_path, [["ws", "", "", "", "rivers", "", UUID]])
+    assert load_matching(in_path, cache_dir).rows == [("ws", "rivers", UUID)]
@@ -0,0 +1,137 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the metadata links writer
+# Purpose:      Only the resources whose links differ are saved
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import threading
+
+# submodules
+from modules.md_links import MetadataLinksWriter
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+LINKS = MetadataLinksWriter.expected_links("https://portal/md", "https://csw/md")
+
+# ############################################################################
+# ######### Classes #############
+# ###############################
+
+
+class Resource(object):
+    """GeoServer resource with its metadata links."""
+
+    def __init__(self, name, links=None):
+        super(Resource, self).__init__()
+        self.name = name
+        self.href = "/resources/{}".format(name)
+        self.metadata_links = links
+        self.catalog = None
+
+
+class Catalog(object):
+    """GeoServer catalog recording the saved resources."""
+
+    def __init__(self, resources=()):
+        super(Catalog, self).__init__()
+        self.resources = dict((resource.name, resource) for resource in resources)
+        self.saved = []
+
+    def get_resource(self, name, store=None):
+        return self.resources[name]
+
+    def save(self, resource):
+        self.saved.append((resource.name, list(resource.metadata_links)))
+
+
+class BlockedCatalog(Catalog):
+    """Catalog whose first save waits for the release event."""
+
+    def __init__(self, resources=()):
+        super(BlockedCatalog, self).__init__(resources)
+        self.saving = threading.Event()
+        self.release = threading.Event()
+
+    def save(self, resource):
+        if not self.saving.is_set():
+            self.saving.set()
+            self.release.wait(5)
+        super(BlockedCatalog, self).save(resource)
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_unchanged_links_are_skipped():
+    cat = Catalog([Resource("same", list(LINKS)), Resource("other")])
+    writer = MetadataLinksWriter(cat)
+    assert writer.update("same", "store", LINKS) == MetadataLinksWriter.SKIPPED
+    assert writer.update("other", "store", LINKS) == MetadataLinksWriter.WRITTEN
+    assert cat.saved == [("other", LINKS)]
+    assert writer.counts.get(MetadataLinksWriter.SKIPPED) == 1
+    assert [change.get("layer") for change in writer.plan] == ["other"]
+
+
+def test_dry_run_only_plans():
+    cat = Catalog([Resource("other")])
+    writer = MetadataLinksWriter(cat, dry_run=True)
+    assert writer.update("other", "store", LINKS) == MetadataLinksWriter.PLANNED
+    assert cat.saved == []
+    assert writer.plan[0].get("current") == []
+    assert writer.plan[0].get("expected") == [tuple(link) for link in LINKS]
+
+
+def test_read_failure_is_tracked():
+    writer = MetadataLinksWriter(Catalog())
+    assert writer.update("missing", "store", LINKS) == MetadataLinksWriter.FAILED
+    assert writer.outcomes == {"missing": MetadataLinksWriter.FAILED}
+
+
+def test_queued_updates_are_coalesced():
+    cat = BlockedCatalog([Resource("first"), Resource("second")])
+    writer = MetadataLinksWriter(cat, write_workers=1)
+    assert writer.update("first", "store", LINKS) == MetadataLinksWriter.QUEUED
+    # the write thread is busy: the second resource waits in the queue
+    assert cat.saving.wait(5)
+    old_links = MetadataLinksWriter.expected_links("https://old/md", "https://old/csw")
+    writer.update("second", "store", old_links)
+    writer.update("second", "store", LINKS)
+    cat.release.set()
+    writer.close()
+    assert writer.coalesced == 1
+    assert cat.saved == [("first", LINKS), ("second", LINKS)]
+    assert writer.counts.get(MetadataLinksWriter.WRITTEN) == 2
+
+
+def test_failed_connection_does_not_stop_the_queue():
+    cat = Catalog([Resource(name) for name in ("first", "second", "third")])
+
+    def connect():
+        raise IOError("GeoServer down")
+
+    writer = MetadataLinksWriter(cat, write_workers=1, connect=connect)
+    for name in ("first", "second", "third"):
+        writer.update(name, "store", LINKS)
+    closing = threading.Thread(target=writer.close)
+    closing.daemon = True
+    closing.start()
+    closing.join(5)
+    assert not closing.is_alive()
+    assert writer.counts.get(MetadataLinksWriter.FAILED) == 3
+    assert cat.saved == []
@@ -0,0 +1,79 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the run metrics
+# Purpose:      Phases, HTTP stats by endpoint family and run reports
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+
+# submodules
+from modules.metrics import (HttpStats, RunMetrics, endpoint_family,
+                             percentile)
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_endpoint_families():
+    assert endpoint_family("http://gs/geoserver/rest/workspaces/ws1/datastores/pg.xml") == \
+        "GET /rest/workspaces/*/datastores/*"
+    assert endpoint_family("http://gs/geoserver/rest/layers/ws1:roads.json", "PUT") == \
+        "PUT /rest/layers/*"
+    assert endpoint_family("https://api.isogeo.com/resources/search") == \
+        "GET api.isogeo.com/resources"
+
+
+def test_percentiles():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([1, 2, 3], 0.5) == 2
+    assert percentile([1, 2, 3], 0.9) == 3
+    assert percentile([], 0.5) == 0
+
+
+def test_http_stats_merged():
+    stats, other = HttpStats(), HttpStats()
+    stats.record("GET /rest/layers", 0.1, 100)
+    other.record("GET /rest/layers", 0.3, 50, status=500)
+    stats.merge(other.as_dict())
+    summary = stats.summary().get("GET /rest/layers")
+    assert (summary.get("count"), summary.get("errors"), summary.get("bytes")) == (2, 1, 150)
+    assert summary.get("seconds") == 0.4
+
+
+def test_report(tmpdir):
+    metrics = RunMetrics("test run")
+    with metrics.phase("read"):
+        pass
+    with metrics.phase("read"):
+        pass
+    metrics.count("layers", 40)
+    metrics.http.record("GET /rest/layers", 0.1, 100)
+
+    with io.open(metrics.save_json(str(tmpdir.join("run.json"))), "r",
+                 encoding="utf-8") as in_json:
+        report = json.load(in_json)
+    assert report.get("phases").get("read").get("count") == 2
+    assert report.get("counters") == {"layers": 40}
+
+    with io.open(metrics.save_prometheus(str(tmpdir.join("run.prom"))), "r",
+                 encoding="utf-8") as in_prom:
+        lines = in_prom.read().splitlines()
+    assert 'i2gs_counter{job="test run",name="layers"} 40' in lines
+    assert 'i2gs_http_requests{job="test run",family="GET /rest/layers"} 1' in lines
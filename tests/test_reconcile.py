@@ -0,0 +1,76 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the reconciliation
+# Purpose:      Each GeoServer layer, matching row and metadata gets the
+#               status telling where the link is missing
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# submodules
+from modules.matching import MatchingTable
+from modules.reconcile import STATUSES, reconcile
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+UUID = "0f1e2d3c4b5a49788796a5b4c3d2e1f0"
+MISSING_UUID = "1f1e2d3c4b5a49788796a5b4c3d2e1f0"
+UNLINKED_UUID = "2f1e2d3c4b5a49788796a5b4c3d2e1f0"
+
+MATCHING = MatchingTable([("transport", "roads", UUID),
+                          ("transport", "rails", MISSING_UUID),
+                          ("water", "rivers", "not-an-uuid"),
+                          (None, "lakes", UUID)])
+
+SHARE = [{"_id": UUID, "title": "Roads"},
+         {"_id": UNLINKED_UUID, "title": "Buildings"}]
+
+# GeoServer layers as read, UUIDs already looked up in the matching table
+GS_RESULTS = [{"name": "default",
+               "read": [("transport", "roads", UUID),
+                        ("transport", "rails", MISSING_UUID),
+                        ("water", "rivers", None),
+                        ("water", "wells", None)]}]
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_each_status():
+    records = list(reconcile(GS_RESULTS, MATCHING, SHARE))
+    assert [(record.get("status"), record.get("name") or record.get("md_uuid"))
+            for record in records] == [("linked", "roads"),
+                                       ("md_not_found", "rails"),
+                                       ("row_without_uuid", "rivers"),
+                                       ("layer_without_row", "wells"),
+                                       ("orphan_row", "lakes"),
+                                       ("md_without_layer", UNLINKED_UUID)]
+    assert set(record.get("status") for record in records) == set(STATUSES)
+    assert records[0].get("md_title") == "Roads"
+    assert records[0].get("geoserver") == "default"
+
+
+def test_orphan_rows_qualified_by_workspace():
+    # same layer name in another workspace
+    gs_results = [{"name": "default", "read": [("archive", "roads", None)]}]
+    orphans = [record.get("workspace") for record in reconcile(gs_results, MATCHING, [])
+               if record.get("status") == "orphan_row"]
+    assert orphans == ["transport", "transport", "water", None]
+
+
+def test_orphans_not_checked_on_partial_read():
+    records = list(reconcile(GS_RESULTS[:0], MATCHING, SHARE, orphans=False))
+    assert [record.get("status") for record in records] == ["md_without_layer"] * 2
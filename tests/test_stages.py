@@ -0,0 +1,91 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the stages
+# Purpose:      Independent stages overlap, the others get the results of
+#               the stages they need
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import threading
+
+# 3rd party libraries
+import pytest
+
+# submodules
+from modules.stages import StageError, Stages
+
+# ############################################################################
+# ######### Functions ###########
+# ###############################
+
+
+def meeting_stages(concurrent):
+    """Two independent stages, each one waiting a moment for the other."""
+    started = {"geoserver": threading.Event(), "isogeo": threading.Event()}
+
+    def stage(name, other):
+        def func():
+            started.get(name).set()
+            return started.get(other).wait(1)
+        return func
+
+    stages = Stages(concurrent=concurrent)
+    stages.add("geoserver", stage("geoserver", "isogeo"))
+    stages.add("isogeo", stage("isogeo", "geoserver"))
+    return stages
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_independent_stages_overlap():
+    assert meeting_stages(concurrent=True).run() == {"geoserver": True, "isogeo": True}
+
+
+def test_sequential_stages():
+    # the first stage is over before the second one starts
+    assert not meeting_stages(concurrent=False).run().get("geoserver")
+
+
+def test_results_given_by_need():
+    stages = Stages()
+    stages.add("geoserver", lambda: ["roads"])
+    stages.add("isogeo", lambda: {"md": 1})
+    stages.add("export", lambda layers, md: (layers, md), needs=("geoserver", "isogeo"))
+    assert stages.run().get("export") == (["roads"], {"md": 1})
+    assert set(stages.seconds) == {"geoserver", "isogeo", "export"}
+
+
+def test_unknown_need():
+    stages = Stages()
+    with pytest.raises(ValueError):
+        stages.add("export", lambda layers: layers, needs=("geoserver", ))
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_failed_stage(concurrent):
+    def read():
+        raise IOError("GeoServer down")
+
+    stages = Stages(concurrent=concurrent)
+    stages.add("geoserver", read)
+    stages.add("isogeo", lambda: "md")
+    stages.add("export", lambda layers: layers, needs=("geoserver", ))
+    with pytest.raises(IOError, match="GeoServer down"):
+        stages.run()
+    # the other stages are over before the error is raised
+    assert stages.results == {"isogeo": "md"}
+    assert isinstance(stages.errors.get("export")[1], StageError)
@@ -0,0 +1,95 @@
+# -*- coding: UTF-8 -*-
+#!/usr/bin/env python
+from __future__ import (absolute_import, print_function, unicode_literals)
+# ----------------------------------------------------------------------------
+# Name:         Tests of the sync state
+# Purpose:      The state of the last run tells which layers can be reused
+#               and which side needs a full run
+#
+# Author:       Julien Moura (@geojulien)
+#
+# Python:       2.7.x
+#
+# Licence:      GPL 3
+# ----------------------------------------------------------------------------
+
+# ############################################################################
+# ######## Libraries #############
+# ################################
+
+# Standard library
+import io
+import json
+import time
+
+# Python 3 backported
+from collections import OrderedDict
+
+# submodules
+from modules.matching import MatchingTable
+from modules.sync_state import STATE_VERSION, SyncState, reusable_layer
+
+# ############################################################################
+# ######### Globals #############
+# ###############################
+
+UUID = "0f1e2d3c4b5a49788796a5b4c3d2e1f0"
+OTHER_UUID = "1f1e2d3c4b5a49788796a5b4c3d2e1f0"
+
+# layer name => attributes, see LAYER_KEYS
+KNOWN = {"roads": ["Roads", "transport", "pg", "postgis", "vector", UUID],
+         "rivers": ["Rivers", "water", "pg", "postgis", "vector", ""]}
+
+# ############################################################################
+# ######### Tests ###############
+# ###############################
+
+
+def test_reusable_while_matching_unchanged():
+    matching = MatchingTable([("transport", "roads", UUID)])
+    assert reusable_layer(KNOWN, "roads", matching) == ("roads", ) + tuple(KNOWN.get("roads"))
+    assert reusable_layer(KNOWN, "rivers", matching) is not None
+    assert reusable_layer(KNOWN, "lakes", matching) is None
+
+
+def test_not_reusable_once_changed():
+    assert reusable_layer(KNOWN, "roads", MatchingTable([("transport", "roads", OTHER_UUID)])) is None
+    assert reusable_layer(KNOWN, "rivers", MatchingTable([("water", "rivers", UUID)])) is None
+    # moved to another workspace
+    matching = MatchingTable([("transport", "roads", UUID)])
+    assert reusable_layer(KNOWN, "roads", matching, workspace="mobility") is None
+
+
+def test_full_runs_by_side(tmpdir):
+    state_path = str(tmpdir.join("state.json"))
+    state = SyncState(state_path)
+    assert state.needs_full()
+    state.save(full=("geoserver", ))
+
+    state = SyncState(state_path)
+    assert not state.needs_full(sides=("geoserver", ))
+    assert state.needs_full(sides=("isogeo", ))
+    state.last_full["geoserver"] = time.time() - 3 * 3600
+    assert state.needs_full(full_every=2, sides=("geoserver", ))
+    assert not state.needs_full(full_every=4, sides=("geoserver", ))
+
+
+def test_single_full_run_stamp_migrated(tmpdir):
+    state_path = str(tmpdir.join("state.json"))
+    with io.open(state_path, "wb") as out_json:
+        out_json.write(json.dumps({"version": STATE_VERSION, "last_full": time.time(),
+                                   "metadata": {}, "geoservers": {}}).encode("utf-8"))
+    assert not SyncState(state_path).needs_full()
+
+
+def test_failed_layers_not_remembered():
+    state = SyncState(None)
+    gs_result = {"plan": [{"layer": "rivers", "status": "failed"}]}
+    state.update_layers("default", "sign", gs_result, entries=OrderedDict(KNOWN.items()))
+    assert list(state.known_layers("default", "sign")) == ["roads"]
+    assert state.known_layers("default", "other links") is None
+
+    # read of some workspaces only
+    lakes = OrderedDict([("lakes", ["Lakes", "water", "pg", "postgis", "vector", ""])])
+    state.update_layers("default", "sign", {"plan": []}, merge=True, entries=lakes)
+    assert sorted(state.known_layers("default", "sign")) == ["lakes", "roads"]